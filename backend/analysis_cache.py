@@ -0,0 +1,115 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from response_cache import ResponseCache
+
+
+def normalize_code(code: str) -> str:
+    """Drop differences that cannot change the analysis: line endings,
+    trailing whitespace and blank lines at the end"""
+    lines = code.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).rstrip('\n')
+
+
+def content_key(code: str, ruleset_version: str) -> str:
+    return hashlib.sha256(f'{ruleset_version}\0{code}'.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+class AnalysisCache:
+    """Memoizes analysis results by content hash.
+
+    A bounded in-memory LRU sits in front of an optional SQLite table, so
+    results for resubmitted code survive restarts and are shared by every
+    worker using the same file.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS analysis (
+            key TEXT PRIMARY KEY,
+            result TEXT NOT NULL,
+            created REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_analysis_created ON analysis (created);
+    """
+
+    def __init__(self, max_entries: int = 512, path: Optional[str] = None,
+                 max_disk_entries: int = 100000):
+        self.memory = ResponseCache(max_entries=max_entries)
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self.disk_hits = 0
+        self.disk_writes = 0
+        self.disk_errors = 0
+        self._conn = None
+        self._disk_lock = threading.Lock()
+
+        if path:
+            self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(self._SCHEMA)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Dict]) -> Dict:
+        return self.memory.get_or_compute(('analysis', key), lambda: self._load_or_compute(key, compute))
+
+    def _load_or_compute(self, key: str, compute: Callable[[], Dict]) -> Dict:
+        if self._conn is None:
+            return compute()
+
+        result = self._load(key)
+        if result is not None:
+            self.disk_hits += 1
+            return result
+
+        result = compute()
+        self._store(key, result)
+        return result
+
+    def _load(self, key: str) -> Optional[Dict]:
+        try:
+            with self._disk_lock:
+                row = self._conn.execute('SELECT result FROM analysis WHERE key = ?', (key,)).fetchone()
+        except sqlite3.Error:
+            self.disk_errors += 1
+            return None
+        return json.loads(row[0]) if row else None
+
+    def _store(self, key: str, result: Dict):
+        try:
+            with self._disk_lock, self._conn:
+                self._conn.execute('INSERT OR REPLACE INTO analysis (key, result, created) VALUES (?, ?, ?)',
+                                   (key, json.dumps(result), time.time()))
+                self.disk_writes += 1
+                # Trim the oldest rows now and then rather than on every write
+                if self.disk_writes % 1000 == 0:
+                    self._conn.execute(
+                        'DELETE FROM analysis WHERE key IN '
+                        '(SELECT key FROM analysis ORDER BY created DESC LIMIT -1 OFFSET ?)',
+                        (self.max_disk_entries,))
+        except sqlite3.Error:
+            self.disk_errors += 1
+
+    def clear(self):
+        self.memory.invalidate('analysis')
+        if self._conn is not None:
+            with self._disk_lock, self._conn:
+                self._conn.execute('DELETE FROM analysis')
+
+    def close(self):
+        if self._conn is not None:
+            with self._disk_lock:
+                self._conn.close()
+
+    def stats(self) -> Dict:
+        stats = self.memory.stats()
+        stats['disk'] = {
+            'path': self.path,
+            'hits': self.disk_hits,
+            'writes': self.disk_writes,
+            'errors': self.disk_errors
+        } if self.path else None
+        return stats
@@ -0,0 +1,405 @@
+import ast
+import hashlib
+import io
+import threading
+import time
+import tokenize
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+LOOP_NODES = (ast.For, ast.AsyncFor, ast.While)
+TRY_NODES = (ast.Try,) + ((ast.TryStar,) if hasattr(ast, 'TryStar') else ())
+BRACKET_PAIRS = {')': '(', ']': '[', '}': '{'}
+# Issues listed in one report; the rest are counted but not listed
+MAX_CATEGORY_ISSUES = 50
+MAX_REPORT_ISSUES = 100
+
+
+# (category, line, column, message); column is 0-based like the ast
+Finding = Tuple[str, int, int, str]
+
+
+def empty_issues() -> Dict[str, List[str]]:
+    return {
+        'syntax_errors': [],
+        'style_issues': [],
+        'performance_issues': [],
+        'security_issues': []
+    }
+
+
+def format_issues(findings: Iterable[Finding], line_offset: int = 0) -> Dict[str, List[str]]:
+    """Group findings into the issues dict used by reports and the API,
+    each category in source order.
+
+    Past MAX_CATEGORY_ISSUES in a category or MAX_REPORT_ISSUES in all,
+    findings are only counted, per category, under issues['suppressed'].
+    """
+    issues = empty_issues()
+    suppressed: Dict[str, int] = {}
+    shown = 0
+    for category, line, col, message in sorted(findings, key=lambda finding: (finding[1], finding[2])):
+        entries = issues[category]
+        if len(entries) < MAX_CATEGORY_ISSUES and shown < MAX_REPORT_ISSUES:
+            entries.append(f"Line {line + line_offset}, col {col + 1}: {message}")
+            shown += 1
+        else:
+            suppressed[category] = suppressed.get(category, 0) + 1
+    if suppressed:
+        issues['suppressed'] = suppressed
+    return issues
+
+
+def count_issues(issues: Dict) -> Dict[str, int]:
+    """Issues per category, counting suppressed ones"""
+    suppressed = issues.get('suppressed', {})
+    return {category: len(issues[category]) + suppressed.get(category, 0) for category in empty_issues()}
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+def _unlimited():
+    pass
+
+
+class Budget:
+    """CPU time allowance for an analysis.
+
+    The engine checks it every CHECK_INTERVAL lines, tokens or nodes and
+    stops early once it is spent. cancel() lets another thread stop the
+    analysis at its next check.
+    """
+
+    CHECK_INTERVAL = 256
+
+    def __init__(self, cpu_seconds: Optional[float] = None):
+        self.cpu_seconds = cpu_seconds
+        self.cancelled = False
+        self.context: Optional['AnalysisContext'] = None
+        self._start: Optional[float] = None
+
+    def start(self, ctx: 'AnalysisContext'):
+        self.context = ctx
+        # Several runs sharing one budget (incremental blocks) draw from it together
+        if self._start is None:
+            self._start = time.thread_time()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def check(self):
+        if self.cancelled or (self.cpu_seconds is not None
+                              and time.thread_time() - self._start > self.cpu_seconds):
+            raise BudgetExceeded()
+
+
+class Rule:
+    """A check and the nodes, tokens or lines it wants to see.
+
+    `nodes` are ast node classes; `tokens` are operator strings such as ';'
+    or tokenize token types such as tokenize.COMMENT. Line rules get every
+    source line. Reports go to `category`, which is an issues key or
+    'suggestions'.
+    """
+
+    def __init__(self, name: str, category: str, check: Callable,
+                 nodes: Iterable[type] = (), tokens: Iterable = (), lines: bool = False):
+        self.name = name
+        self.category = category
+        self.check = check
+        self.nodes = tuple(nodes)
+        self.tokens = tuple(tokens)
+        self.lines = lines
+        self.enabled = True
+        self.index = 0
+        self.calls = 0
+        self.hits = 0
+        self.seconds = 0.0
+
+    def copy(self) -> 'Rule':
+        return Rule(self.name, self.category, self.check, self.nodes, self.tokens, self.lines)
+
+    def stats(self) -> Dict:
+        return {
+            'category': self.category,
+            'enabled': self.enabled,
+            'calls': self.calls,
+            'hits': self.hits,
+            'total_ms': round(self.seconds * 1e3, 3),
+            'mean_us': round(self.seconds / self.calls * 1e6, 3) if self.calls else 0.0
+        }
+
+
+class RuleRegistry:
+    """Ordered collection of rules, filled with the `rule` decorator.
+
+    Bump `version` whenever a rule's behaviour or message changes, so
+    memoized results from the old rules are not reused.
+    """
+
+    def __init__(self, version: str = '1'):
+        self.version = version
+        self.rules: Dict[str, Rule] = {}
+
+    def rule(self, name: str, category: str, nodes: Iterable[type] = (),
+             tokens: Iterable = (), lines: bool = False):
+        def decorator(check):
+            if name in self.rules:
+                raise ValueError(f"Rule '{name}' is already registered")
+            self.rules[name] = Rule(name, category, check, nodes, tokens, lines)
+            return check
+        return decorator
+
+    def __iter__(self) -> Iterator[Rule]:
+        return iter(self.rules.values())
+
+
+class AnalysisContext:
+    """Per-analysis state handed to every rule"""
+
+    __slots__ = ('findings', 'suggestions', 'rule', 'parent', 'loop_depth', 'try_depth',
+                 'calls', 'hits', 'seconds', 'partial')
+
+    def __init__(self, rule_count: int):
+        self.findings: List[Finding] = []
+        # Set when the budget ran out before every rule had run
+        self.partial = False
+        self.suggestions: List[str] = []
+        self.rule: Optional[Rule] = None
+        self.parent: Optional[ast.AST] = None
+        self.loop_depth = 0
+        self.try_depth = 0
+        # Per-rule counters, merged into the engine when the analysis ends
+        self.calls = [0] * rule_count
+        self.hits = [0] * rule_count
+        self.seconds = [0.0] * rule_count
+
+    @property
+    def issues(self) -> Dict[str, List[str]]:
+        return format_issues(self.findings)
+
+    def report(self, line: int, col: int, message: str):
+        self.findings.append((self.rule.category, line, col, message))
+        self.hits[self.rule.index] += 1
+
+    def suggest(self, message: str):
+        if message not in self.suggestions:
+            self.suggestions.append(message)
+            self.hits[self.rule.index] += 1
+
+
+class AnalysisEngine:
+    """Analyzes code with one tokenizer pass and one walk of the syntax tree.
+
+    Each rule only sees the nodes, tokens or lines it registered for; its
+    calls, hits and time are recorded so expensive rules can be found and
+    disabled.
+    """
+
+    def __init__(self, registry: RuleRegistry, disabled: Iterable[str] = ()):
+        self.registry_version = registry.version
+        self.rules: Dict[str, Rule] = {}
+        for index, rule in enumerate(registry):
+            rule = rule.copy()
+            rule.index = index
+            self.rules[rule.name] = rule
+        self.analyses = 0
+        self._lock = threading.Lock()
+
+        for name in disabled:
+            self._get_rule(name).enabled = False
+        self._build_dispatch()
+
+    def _get_rule(self, name: str) -> Rule:
+        if name not in self.rules:
+            raise ValueError(f"Unknown analysis rule '{name}'")
+        return self.rules[name]
+
+    def _build_dispatch(self):
+        node_rules: Dict[type, List[Rule]] = {}
+        token_rules: Dict[object, List[Rule]] = {}
+        line_rules: List[Rule] = []
+
+        for rule in self.rules.values():
+            if not rule.enabled:
+                continue
+            for node_type in rule.nodes:
+                node_rules.setdefault(node_type, []).append(rule)
+            for token in rule.tokens:
+                token_rules.setdefault(token, []).append(rule)
+            if rule.lines:
+                line_rules.append(rule)
+
+        # Replaced in one assignment so a running analysis keeps its tables
+        self._dispatch = (node_rules, token_rules, line_rules)
+
+        # Identifies what the enabled rules can report, for result caching
+        enabled = ','.join(name for name, rule in self.rules.items() if rule.enabled)
+        self.version = hashlib.sha1(f'{self.registry_version}:{enabled}'.encode()).hexdigest()[:12]
+
+    def set_enabled(self, name: str, enabled: bool):
+        self._get_rule(name).enabled = enabled
+        self._build_dispatch()
+
+    def analyze(self, code: str) -> Dict[str, List[str]]:
+        return self.run(code).issues
+
+    def run(self, code: str, budget: Optional[Budget] = None) -> AnalysisContext:
+        """Collect issues and suggestions for `code` in a single pass.
+
+        With a `budget`, the analysis stops when it is spent and the
+        findings so far are returned with `partial` set.
+        """
+        node_rules, token_rules, line_rules = self._dispatch
+        ctx = AnalysisContext(len(self.rules))
+        check = _unlimited
+        if budget is not None:
+            budget.start(ctx)
+            check = budget.check
+
+        # The tree walk runs most rules, so it goes first and a partial
+        # result still covers them
+        try:
+            check()
+            try:
+                tree = ast.parse(code)
+                syntax_error = None
+            except SyntaxError as e:
+                tree, syntax_error = None, e
+            except (RecursionError, MemoryError):
+                # The parser gives up on very deeply nested expressions
+                tree = None
+                syntax_error = SyntaxError('Code is nested too deeply to parse')
+
+            if tree is not None:
+                self._walk(tree, node_rules, ctx, check)
+            bracket_errors = self._scan_tokens(code, token_rules, ctx, check)
+            # Bracket problems are reported with better locations than the parser's
+            if syntax_error is not None and not bracket_errors:
+                ctx.findings.append(('syntax_errors', syntax_error.lineno or 1,
+                                     (syntax_error.offset or 1) - 1, syntax_error.msg))
+            if line_rules:
+                self._scan_lines(code, line_rules, ctx, check)
+        except BudgetExceeded:
+            ctx.partial = True
+
+        # Drop the references to the rules and the tree; results may be
+        # pickled back from a worker process
+        ctx.rule = ctx.parent = None
+        self._record(ctx)
+        return ctx
+
+    @staticmethod
+    def _call(rule: Rule, ctx: AnalysisContext, target):
+        ctx.rule = rule
+        start = time.perf_counter()
+        rule.check(target, ctx)
+        ctx.seconds[rule.index] += time.perf_counter() - start
+        ctx.calls[rule.index] += 1
+
+    def _scan_lines(self, code: str, line_rules: List[Rule], ctx: AnalysisContext, check: Callable):
+        for line in enumerate(code.split('\n'), 1):
+            if not line[0] % Budget.CHECK_INTERVAL:
+                check()
+            for rule in line_rules:
+                self._call(rule, ctx, line)
+
+    def _scan_tokens(self, code: str, token_rules: Dict, ctx: AnalysisContext, check: Callable) -> bool:
+        """Match brackets and run token rules; return True if brackets are unbalanced"""
+        stack = []
+        findings = ctx.findings
+        found_bracket_error = False
+        call = self._call
+
+        try:
+            for count, token in enumerate(tokenize.generate_tokens(io.StringIO(code).readline), 1):
+                if not count % Budget.CHECK_INTERVAL:
+                    check()
+                if token.type == tokenize.OP:
+                    if token.string in '([{':
+                        stack.append(token)
+                    elif token.string in BRACKET_PAIRS:
+                        if stack and stack[-1].string == BRACKET_PAIRS[token.string]:
+                            stack.pop()
+                        else:
+                            findings.append(('syntax_errors', *token.start, f"Unmatched '{token.string}'"))
+                            found_bracket_error = True
+                    for rule in token_rules.get(token.string, ()):
+                        call(rule, ctx, token)
+                for rule in token_rules.get(token.type, ()):
+                    call(rule, ctx, token)
+        except (tokenize.TokenError, IndentationError, SyntaxError):
+            pass
+
+        for token in stack:
+            findings.append(('syntax_errors', *token.start, f"'{token.string}' was never closed"))
+            found_bracket_error = True
+
+        return found_bracket_error
+
+    def _walk(self, tree: ast.AST, node_rules: Dict, ctx: AnalysisContext, check: Callable):
+        # Iterative walk so deeply nested submissions cannot exhaust the stack.
+        # Each entry carries its parent and how many loops and try blocks
+        # enclose it.
+        stack: List[Tuple[ast.AST, Optional[ast.AST], int, int]] = [(tree, None, 0, 0)]
+        call = self._call
+        count = 0
+
+        while stack:
+            node, parent, loop_depth, try_depth = stack.pop()
+            count += 1
+            if not count % Budget.CHECK_INTERVAL:
+                check()
+
+            rules = node_rules.get(type(node))
+            if rules:
+                ctx.parent = parent
+                ctx.loop_depth = loop_depth
+                ctx.try_depth = try_depth
+                for rule in rules:
+                    call(rule, ctx, node)
+
+            if isinstance(node, LOOP_NODES):
+                loop_depth += 1
+            elif isinstance(node, TRY_NODES):
+                try_depth += 1
+            children = list(ast.iter_child_nodes(node))
+            for child in reversed(children):
+                stack.append((child, node, loop_depth, try_depth))
+
+    def _record(self, ctx: AnalysisContext):
+        with self._lock:
+            self.analyses += 1
+            for rule in self.rules.values():
+                rule.calls += ctx.calls[rule.index]
+                rule.hits += ctx.hits[rule.index]
+                rule.seconds += ctx.seconds[rule.index]
+
+    def disabled(self) -> Tuple[str, ...]:
+        return tuple(name for name, rule in self.rules.items() if not rule.enabled)
+
+    def counters(self) -> Tuple[int, List[Tuple[int, int, float]]]:
+        """Analyses run and each rule's calls, hits and seconds, in rule order"""
+        with self._lock:
+            return self.analyses, [(rule.calls, rule.hits, rule.seconds) for rule in self.rules.values()]
+
+    def add_counters(self, analyses: int, rules: List[Tuple[int, int, float]]):
+        """Add counters recorded by another engine over the same rules"""
+        with self._lock:
+            self.analyses += analyses
+            for rule, (calls, hits, seconds) in zip(self.rules.values(), rules):
+                rule.calls += calls
+                rule.hits += hits
+                rule.seconds += seconds
+
+    def stats(self) -> Dict:
+        """Per-rule counters, most expensive rule first"""
+        with self._lock:
+            rules = {name: rule.stats() for name, rule in self.rules.items()}
+            analyses = self.analyses
+        return {
+            'analyses': analyses,
+            'ruleset_version': self.version,
+            'rules': dict(sorted(rules.items(), key=lambda item: -item[1]['total_ms']))
+        }
@@ -0,0 +1,236 @@
+import math
+import os
+import queue
+import resource
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Connection
+from typing import Callable, Dict, List, Optional, Tuple
+
+from analysis_engine import AnalysisEngine, Budget
+
+# CPU seconds a worker may use past its budget before the kernel stops it
+HARD_LIMIT_GRACE = 1.0
+
+
+class InputTooLarge(ValueError):
+    pass
+
+
+class AnalysisTimeout(Exception):
+    """The analysis did not finish within its limits and its worker was stopped"""
+
+    def __init__(self):
+        super().__init__('Analysis exceeded its time limit')
+
+
+class _Worker:
+    """A child process running the analyses sent to it over a pipe"""
+
+    def __init__(self):
+        task_read, task_write = os.pipe()
+        result_read, result_write = os.pipe()
+        try:
+            self.process = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), str(task_read), str(result_write)],
+                pass_fds=(task_read, result_write), stdin=subprocess.DEVNULL)
+        except BaseException:
+            os.close(task_write)
+            os.close(result_read)
+            raise
+        finally:
+            os.close(task_read)
+            os.close(result_write)
+        self.tasks = Connection(task_write, readable=False)
+        self.results = Connection(result_read, writable=False)
+
+    def stop(self):
+        self.process.kill()
+        self.process.wait()
+        self.tasks.close()
+        self.results.close()
+
+
+class AnalysisGuard:
+    """Runs analyses in worker processes with size and time limits.
+
+    Each analysis gets a CPU time budget that the engine checks as it
+    goes, stopping with a partial result when it is spent. Work the engine
+    cannot interrupt, such as ast.parse on hostile input, is bounded
+    outside it: the kernel stops a worker that uses HARD_LIMIT_GRACE more
+    CPU time than its budget (RLIMIT_CPU), and the guard kills one that
+    has not answered after `wall_seconds`. Either way the caller gets an
+    AnalysisTimeout and a fresh worker takes the old one's place.
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024, cpu_seconds: float = 2.0,
+                 wall_seconds: Optional[float] = None, workers: int = 4):
+        self.max_bytes = max_bytes
+        self.cpu_seconds = cpu_seconds
+        self.wall_seconds = wall_seconds or cpu_seconds * 2
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._pid = None
+        self._idle: Optional[queue.LifoQueue] = None
+        self._started: List[_Worker] = []
+        self.rejected = 0
+        self.budget_exceeded = 0
+        self.timeouts = 0
+        self.restarts = 0
+
+    def check_size(self, text: str):
+        size = len(text.encode('utf-8', 'surrogatepass'))
+        if size > self.max_bytes:
+            with self._lock:
+                self.rejected += 1
+            raise InputTooLarge(f'Code is too large to analyze ({size} > {self.max_bytes} bytes)')
+
+    def _pool(self) -> queue.Queue:
+        # Workers are started on first use, and again in a forked process:
+        # the parent's workers belong to the parent
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._started = []
+                # Most recently used first, so idle workers stay warm
+                self._idle = queue.LifoQueue()
+                for _ in range(self.workers):
+                    self._idle.put(None)
+            return self._idle
+
+    def _acquire(self, idle: queue.Queue, timeout: float) -> Optional[_Worker]:
+        try:
+            worker = idle.get(timeout=max(timeout, 0))
+        except queue.Empty:
+            return None
+        if worker is not None and worker.process.poll() is None:
+            return worker
+        try:
+            worker = _Worker()
+        except BaseException:
+            idle.put(None)
+            raise
+        with self._lock:
+            self._started.append(worker)
+        return worker
+
+    def _discard(self, idle: queue.Queue, worker: _Worker):
+        worker.stop()
+        with self._lock:
+            if worker in self._started:
+                self._started.remove(worker)
+            self.restarts += 1
+            self.timeouts += 1
+        idle.put(None)
+
+    def run(self, engine: AnalysisEngine, func: Callable, *args):
+        """Call func(worker_engine, *args, budget) in a worker process.
+
+        func and args are pickled, so func must be a module-level function
+        or a method such as AnalysisEngine.run. The worker's engine has the
+        same rules enabled as `engine`, and the rule counters it records
+        are added to `engine`. Raises AnalysisTimeout when no worker frees
+        up or the analysis does not finish within `wall_seconds`.
+        """
+        deadline = time.monotonic() + self.wall_seconds
+        idle = self._pool()
+        worker = self._acquire(idle, self.wall_seconds)
+        if worker is None:
+            with self._lock:
+                self.timeouts += 1
+            raise AnalysisTimeout()
+
+        try:
+            worker.tasks.send((engine.disabled(), func, args, self.cpu_seconds))
+            if not worker.results.poll(max(deadline - time.monotonic(), 0)):
+                raise TimeoutError()
+            status, value, counters = worker.results.recv()
+        except (OSError, EOFError):
+            # Timed out, or killed by the kernel for exceeding RLIMIT_CPU
+            self._discard(idle, worker)
+            raise AnalysisTimeout()
+        idle.put(worker)
+
+        engine.add_counters(*counters)
+        if status == 'error':
+            raise value
+        return value
+
+    def record_partial(self):
+        with self._lock:
+            self.budget_exceeded += 1
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._started = self._started, []
+        for worker in workers:
+            worker.stop()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_bytes': self.max_bytes,
+                'cpu_seconds': self.cpu_seconds,
+                'wall_seconds': self.wall_seconds,
+                'workers': self.workers,
+                'rejected': self.rejected,
+                'budget_exceeded': self.budget_exceeded,
+                'timeouts': self.timeouts,
+                'worker_restarts': self.restarts
+            }
+
+
+def _limit_cpu(cpu_seconds: float):
+    """Have the kernel stop this process if the next task overruns its budget"""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = math.ceil(usage.ru_utime + usage.ru_stime + cpu_seconds + HARD_LIMIT_GRACE)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _counters_since(before: Tuple[int, List], after: Tuple[int, List]) -> Tuple[int, List]:
+    return after[0] - before[0], [(calls - old_calls, hits - old_hits, seconds - old_seconds)
+                                  for (old_calls, old_hits, old_seconds), (calls, hits, seconds)
+                                  in zip(before[1], after[1])]
+
+
+def serve(task_fd: int, result_fd: int):
+    """Worker loop: run tasks from the guard until it closes the pipe"""
+    from analysis_rules import RULES
+
+    # A worker stopped by RLIMIT_CPU should not leave a core dump behind
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    tasks = Connection(task_fd, writable=False)
+    results = Connection(result_fd, readable=False)
+    engines: Dict[Tuple[str, ...], AnalysisEngine] = {}
+
+    while True:
+        try:
+            disabled, func, args, cpu_seconds = tasks.recv()
+        except EOFError:
+            return
+        engine = engines.get(disabled)
+        if engine is None:
+            engine = engines[disabled] = AnalysisEngine(RULES, disabled=disabled)
+
+        _limit_cpu(cpu_seconds)
+        before = engine.counters()
+        try:
+            result = ('ok', func(engine, *args, Budget(cpu_seconds)))
+        except Exception as error:
+            result = ('error', error)
+        counters = _counters_since(before, engine.counters())
+
+        try:
+            results.send(result + (counters,))
+        except Exception as error:
+            # The result or exception could not be pickled
+            results.send(('error', RuntimeError(f'Analysis failed: {error!r}'), counters))
+
+
+if __name__ == '__main__':
+    serve(int(sys.argv[1]), int(sys.argv[2]))
@@ -0,0 +1,146 @@
+"""Built-in CodeAnalyzer rules.
+
+Each rule is registered with the node types, tokens or lines it needs and
+receives them one at a time together with the AnalysisContext.
+"""
+import ast
+
+from analysis_engine import RuleRegistry
+
+MAX_LINE_LENGTH = 79
+SQL_EXECUTE_METHODS = frozenset({'execute', 'executemany', 'executescript', 'raw'})
+FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+RULES = RuleRegistry(version='2')
+
+
+def is_camel_case(name: str) -> bool:
+    stripped = name.lstrip('_')
+    return bool(stripped) and stripped[0].islower() and stripped != stripped.lower()
+
+
+def is_string_node(node: ast.AST) -> bool:
+    return isinstance(node, ast.JoinedStr) or (isinstance(node, ast.Constant) and isinstance(node.value, str))
+
+
+def is_dynamic_string(node: ast.AST) -> bool:
+    """True for strings built at runtime: concatenation, %, f-strings, .format()"""
+    if isinstance(node, ast.JoinedStr):
+        return True
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Mod)):
+        return True
+    return (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+            and node.func.attr == 'format')
+
+
+def concat_operands(node: ast.BinOp) -> list:
+    operands = []
+    while isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        operands.append(node.right)
+        node = node.left
+    operands.append(node)
+    return operands
+
+
+# Style rules
+
+@RULES.rule('line-length', 'style_issues', lines=True)
+def check_line_length(line, ctx):
+    number, text = line
+    if len(text) > MAX_LINE_LENGTH:
+        ctx.report(number, MAX_LINE_LENGTH, f"Line too long ({len(text)} > {MAX_LINE_LENGTH} characters)")
+
+
+@RULES.rule('semicolon', 'style_issues', tokens=(';',))
+def check_semicolon(token, ctx):
+    ctx.report(*token.start, "Avoid multiple statements on one line (semicolons)")
+
+
+@RULES.rule('function-name', 'style_issues', nodes=FUNCTION_NODES)
+def check_function_name(node, ctx):
+    if is_camel_case(node.name):
+        ctx.report(node.lineno, node.col_offset, f"Use snake_case for function names: '{node.name}'")
+
+
+@RULES.rule('argument-name', 'style_issues', nodes=(ast.arg,))
+def check_argument_name(node, ctx):
+    if is_camel_case(node.arg):
+        ctx.report(node.lineno, node.col_offset,
+                   f"Use snake_case for variable names (e.g., my_var not myVar): '{node.arg}'")
+
+
+@RULES.rule('variable-name', 'style_issues', nodes=(ast.Name,))
+def check_variable_name(node, ctx):
+    if isinstance(node.ctx, ast.Store) and is_camel_case(node.id):
+        ctx.report(node.lineno, node.col_offset,
+                   f"Use snake_case for variable names (e.g., my_var not myVar): '{node.id}'")
+
+
+# Performance rules
+
+@RULES.rule('nested-loop', 'performance_issues', nodes=(ast.For, ast.AsyncFor, ast.While))
+def check_nested_loop(node, ctx):
+    if ctx.loop_depth > 0:
+        ctx.report(node.lineno, node.col_offset,
+                   f"Nested loop (depth {ctx.loop_depth + 1}) - consider if it can be optimized")
+
+
+@RULES.rule('string-concatenation', 'performance_issues', nodes=(ast.BinOp,))
+def check_string_concatenation(node, ctx):
+    if not isinstance(node.op, ast.Add):
+        return
+    # Only report the outermost '+' of a chain
+    if isinstance(ctx.parent, ast.BinOp) and isinstance(ctx.parent.op, ast.Add):
+        return
+    operands = concat_operands(node)
+    if len(operands) > 3 and any(is_string_node(operand) for operand in operands):
+        ctx.report(node.lineno, node.col_offset, "Use str.join() instead of repeated '+' concatenation")
+
+
+@RULES.rule('string-concatenation-in-loop', 'performance_issues', nodes=(ast.AugAssign,))
+def check_string_augmented_assignment(node, ctx):
+    if ctx.loop_depth > 0 and isinstance(node.op, ast.Add) and is_string_node(node.value):
+        ctx.report(node.lineno, node.col_offset,
+                   "String built with '+=' inside a loop - collect parts and use str.join()")
+
+
+@RULES.rule('list-call', 'performance_issues', nodes=(ast.Call,))
+def check_list_call(node, ctx):
+    if isinstance(node.func, ast.Name) and node.func.id == 'list' and node.args:
+        ctx.report(node.lineno, node.col_offset, "Consider if list() conversion is necessary")
+
+
+# Security rules
+
+@RULES.rule('eval-exec', 'security_issues', nodes=(ast.Call,))
+def check_dangerous_call(node, ctx):
+    if isinstance(node.func, ast.Name) and node.func.id in ('eval', 'exec'):
+        ctx.report(node.lineno, node.col_offset, f"SECURITY: Avoid {node.func.id}() - it's dangerous!")
+
+
+@RULES.rule('sql-injection', 'security_issues', nodes=(ast.Call,))
+def check_sql_injection(node, ctx):
+    if (isinstance(node.func, ast.Attribute) and node.func.attr in SQL_EXECUTE_METHODS
+            and node.args and is_dynamic_string(node.args[0])):
+        ctx.report(node.lineno, node.col_offset,
+                   "SECURITY: Check for SQL injection vulnerabilities - use query parameters")
+
+
+# Suggestions
+
+@RULES.rule('docstring', 'suggestions', nodes=FUNCTION_NODES)
+def suggest_docstring(node, ctx):
+    if ast.get_docstring(node) is None:
+        ctx.suggest("Add docstrings to functions")
+
+
+@RULES.rule('type-hints', 'suggestions', nodes=FUNCTION_NODES)
+def suggest_type_hints(node, ctx):
+    if node.returns is None:
+        ctx.suggest("Add type hints to function signatures")
+
+
+@RULES.rule('file-error-handling', 'suggestions', nodes=(ast.Call,))
+def suggest_file_error_handling(node, ctx):
+    if isinstance(node.func, ast.Name) and node.func.id == 'open' and ctx.try_depth == 0:
+        ctx.suggest("Add try-except block for file operations")
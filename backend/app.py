@@ -1,21 +1,293 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
+import atexit
 import json
+import os
+import time
+import uuid
 from datetime import datetime
 from chatbot import Chatbot
-from problem_solver import ProblemSolver
 from code_analyzer import CodeAnalyzer
-from learning_resources import LearningResources
+from analysis_cache import AnalysisCache
+from analysis_guard import AnalysisGuard, InputTooLarge
+from batch_analysis import BatchAnalyzer, files_from_archive, files_from_json
+from history_store import SessionHistoryStore, SQLiteHistoryStore
+from metrics import STAGE_LATENCY, Counter, Histogram, MetricsRegistry, summarize_histogram
+from profiling import RequestProfiler
+from response_cache import ResponseCache
+from services import Services, format_memory, process_memory
 
 app = Flask(__name__)
 CORS(app)
 
-chatbot = Chatbot()
-problem_solver = ProblemSolver()
-code_analyzer = CodeAnalyzer()
-learning_resources = LearningResources()
+response_cache = ResponseCache(
+    max_entries=int(os.environ.get('RESPONSE_CACHE_SIZE', 1024)),
+    ttl=float(os.environ.get('RESPONSE_CACHE_TTL', 0)) or None
+)
+
+analysis_cache = AnalysisCache(
+    max_entries=int(os.environ.get('ANALYSIS_CACHE_SIZE', 512)),
+    path=os.environ.get('ANALYSIS_CACHE_DB') or None
+)
+atexit.register(analysis_cache.close)
+
+analysis_guard = AnalysisGuard(
+    max_bytes=int(os.environ.get('ANALYSIS_MAX_BYTES', 512 * 1024)),
+    cpu_seconds=float(os.environ.get('ANALYSIS_CPU_SECONDS', 2.0)),
+    wall_seconds=float(os.environ.get('ANALYSIS_WALL_SECONDS', 0)) or None,
+    workers=int(os.environ.get('ANALYSIS_WORKERS', 4))
+)
+atexit.register(analysis_guard.shutdown)
+
+services = Services(
+    response_cache=response_cache,
+    code_analyzer=CodeAnalyzer(
+        disabled_rules=[name.strip() for name in os.environ.get('ANALYSIS_DISABLED_RULES', '').split(',') if name.strip()],
+        cache=analysis_cache,
+        guard=analysis_guard
+    ),
+    # Poll the knowledge files and swap in changed tables (0 disables)
+    reload_interval=float(os.environ.get('KNOWLEDGE_RELOAD_SECONDS', 0))
+)
+problem_solver = services.problem_solver
+code_analyzer = services.code_analyzer
+learning_resources = services.learning_resources
+chatbot = Chatbot(services)
+
+metrics = MetricsRegistry(
+    directory=os.environ.get('METRICS_DIR') or None,
+    flush_interval=float(os.environ.get('METRICS_FLUSH_SECONDS', 1.0))
+)
+metrics.register(chatbot.conversations)
+metrics.register(problem_solver.solved)
+metrics.register(code_analyzer.issues)
+request_latency = metrics.register(
+    Histogram('http_request_duration_seconds', 'Request latency by endpoint', labelnames=('endpoint',)))
+request_count = metrics.register(
+    Counter('http_requests_total', 'Requests by endpoint and status', labelnames=('endpoint', 'status')))
+metrics.register(STAGE_LATENCY)
+
+# Opt-in: keep profiles of the PROFILE_SLOWEST slowest requests
+profiler = RequestProfiler(
+    slowest=int(os.environ.get('PROFILE_SLOWEST', 0)),
+    mode=os.environ.get('PROFILE_MODE', 'sample'),
+    directory=os.environ.get('PROFILE_DIR', 'profiles'),
+    interval=float(os.environ.get('PROFILE_INTERVAL_MS', 5)) / 1e3
+)
+
+batch_analyzer = BatchAnalyzer(code_analyzer, workers=int(os.environ.get('BATCH_WORKERS', 0)) or None)
+# Largest request body either server accepts, for archive uploads to /api/analyze-batch
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', 64 * 1024 * 1024))
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+atexit.register(batch_analyzer.shutdown)
+
+if os.environ.get('HISTORY_DB'):
+    conversation_history = SQLiteHistoryStore(os.environ['HISTORY_DB'])
+    atexit.register(conversation_history.close)
+else:
+    conversation_history = SessionHistoryStore(
+        max_sessions=int(os.environ.get('HISTORY_MAX_SESSIONS', 100000)),
+        max_bytes=int(os.environ.get('HISTORY_MAX_BYTES', 256 * 1024 * 1024)),
+        idle_ttl=float(os.environ.get('HISTORY_IDLE_TTL', 3600)),
+        max_entries_per_session=int(os.environ.get('HISTORY_SESSION_MAX_ENTRIES', 100)),
+        max_bytes_per_session=int(os.environ.get('HISTORY_SESSION_MAX_BYTES', 64 * 1024))
+    )
+
+SUGGESTIONS = [
+    "Help with Python errors",
+    "Analyze my code",
+    "Learning resources for web development",
+    "Show me a code example",
+    "Debugging tips",
+    "Performance optimization",
+    "Tell me about your features"
+]
+
+CHATBOT_FEATURES = [
+    'Problem solving (Python, Debugging, Performance, Web, Database)',
+    'Code analysis and feedback',
+    'Learning resources and tutorials',
+    'Code examples and best practices',
+    'Performance optimization tips',
+    'Error diagnosis and solutions'
+]
+
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+MAX_SESSION_ID_LENGTH = 128
+SESSION_REQUIRED = 'session_id is required'
+
+
+def new_session_id():
+    return str(uuid.uuid4())
+
+
+def get_session_id(data=None, create=False):
+    """Read the session id from the JSON body, query string or X-Session-Id header.
+
+    Without one, a new session is started when `create` is set (the id is
+    returned to the client with the reply) and None is returned otherwise,
+    so clients that send no id never share a history.
+    """
+    session_id = (data or {}).get('session_id') or request.args.get('session_id') \
+        or request.headers.get('X-Session-Id')
+    if not session_id:
+        return new_session_id() if create else None
+    return str(session_id)[:MAX_SESSION_ID_LENGTH]
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_chat_events(user_message, session_id):
+    """Yield the bot response as SSE 'chunk' events, then a 'done' event"""
+    chunks = []
+    try:
+        for chunk in chatbot.stream_response(user_message):
+            chunks.append(chunk)
+            yield sse_event('chunk', {'text': chunk})
+    except Exception as e:
+        yield sse_event('error', {'message': str(e)})
+        return
+    
+    conversation_history.append(session_id, {
+        'user': user_message,
+        'bot': ''.join(chunks),
+        'timestamp': datetime.now().isoformat()
+    })
+    
+    yield sse_event('done', {
+        'session_id': session_id,
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+def review_submission(data):
+    """Validate an /api/analyze-code body and review it; returns (payload, status).
+
+    With a `document_id` the code is kept between requests and later
+    submissions may send a unified `diff` instead of the full `code`.
+    """
+    if not data or ('code' not in data and 'diff' not in data):
+        return {'status': 'error', 'message': 'Code field is required'}, 400
+    
+    document_id = data.get('document_id')
+    
+    try:
+        if 'code' in data:
+            code = str(data.get('code', '')).strip()
+            if not code:
+                return {'status': 'error', 'message': 'Code cannot be empty'}, 400
+            result = code_analyzer.review_document(str(document_id), code=code) if document_id \
+                else code_analyzer.review(code)
+        elif not document_id:
+            return {'status': 'error', 'message': 'A diff requires a document_id'}, 400
+        else:
+            try:
+                result = code_analyzer.review_document(str(document_id), diff=str(data['diff']))
+            except KeyError:
+                return {'status': 'error', 'message': 'Unknown document; send the full code'}, 409
+            except InputTooLarge:
+                raise
+            except ValueError as e:
+                return {'status': 'error', 'message': f'{e}; send the full code'}, 409
+    except InputTooLarge as e:
+        return {'status': 'error', 'message': str(e)}, 413
+    
+    if document_id:
+        result['document_id'] = str(document_id)
+    
+    return {
+        'status': 'success',
+        **result,
+        'timestamp': datetime.now().isoformat()
+    }, 200
+
+
+def read_batch_files(content_type, body):
+    """Files to analyze from a JSON body or a raw zip/tar upload; raises ValueError"""
+    if (content_type or '').startswith('application/json'):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            raise ValueError('Invalid JSON body')
+        return files_from_json(data)
+    return files_from_archive(body)
+
+
+def batch_events(files):
+    """Yield one SSE 'file' event per analyzed file as it finishes, then a 'summary'"""
+    try:
+        for kind, payload in batch_analyzer.iter_results(files):
+            yield sse_event(kind, payload)
+    except Exception as e:
+        yield sse_event('error', {'message': str(e)})
+
+
+def record_request(endpoint, status, seconds):
+    """Count a finished request; `endpoint` is the route pattern, not the raw path"""
+    request_latency.labels(endpoint).observe(seconds)
+    request_count.labels(endpoint, status).inc()
+
+
+def collect_chatbot_info():
+    totals = metrics.aggregate()
+    return {
+        'name': chatbot.name,
+        'version': chatbot.version,
+        'features': CHATBOT_FEATURES,
+        'domains': list(problem_solver.solutions.keys()),
+        'knowledge_version': services.knowledge.version,
+        'total_messages': int(totals.get(chatbot.conversations.name, 0))
+    }
+
+
+def collect_stats():
+    # Counters are summed over every worker process, not just this one
+    totals = metrics.aggregate()
+    return {
+        'chatbot_name': chatbot.name,
+        'chatbot_version': chatbot.version,
+        'total_conversations': int(totals.get(chatbot.conversations.name, 0)),
+        'problems_solved': int(totals.get(problem_solver.solved.name, 0)),
+        'code_analyses': int(totals.get(code_analyzer.issues.name, 0)),
+        'available_domains': list(problem_solver.solutions.keys()),
+        'knowledge_version': services.knowledge.version,
+        'history': conversation_history.stats(),
+        'response_cache': response_cache.stats(),
+        'code_analysis': code_analyzer.stats(),
+        'batch_analysis': batch_analyzer.stats(),
+        'knowledge': services.knowledge_stats(),
+        'retrieval': services.retrieval.stats(),
+        'endpoints': summarize_histogram(request_latency.name, totals),
+        'stages': summarize_histogram(STAGE_LATENCY.name, totals),
+        'profiler': profiler.stats(),
+        'processes': metrics.processes(),
+        'memory': process_memory()
+    }
+
+
+@app.before_request
+def start_request_timer():
+    metrics.start()
+    services.watch()
+    g.request_start = time.perf_counter()
+    g.profile = profiler.begin()
+
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        seconds = time.perf_counter() - start
+        record_request(endpoint, response.status_code, seconds)
+        profiler.end(g.pop('profile', None), endpoint, seconds)
+    return response
 
-conversation_history = []
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -28,6 +300,7 @@ def health_check():
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
+    start = time.perf_counter()
     try:
         data = request.get_json()
         
@@ -45,9 +318,10 @@ def chat():
                 'message': 'Message cannot be empty'
             }), 400
         
+        session_id = get_session_id(data, create=True)
         bot_response = chatbot.get_response(user_message)
         
-        conversation_history.append({
+        conversation_history.append(session_id, {
             'user': user_message,
             'bot': bot_response,
             'timestamp': datetime.now().isoformat()
@@ -55,8 +329,10 @@ def chat():
         
         return jsonify({
             'status': 'success',
+            'session_id': session_id,
             'user_message': user_message,
             'bot_response': bot_response,
+            'response_time_ms': chatbot.utils.get_response_time(start),
             'timestamp': datetime.now().isoformat()
         }), 200
         
@@ -67,16 +343,59 @@ def chat():
         }), 500
 
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    try:
+        data = request.get_json()
+        
+        if not data or 'message' not in data:
+            return jsonify({
+                'status': 'error',
+                'message': 'Message field is required'
+            }), 400
+        
+        user_message = data.get('message', '').strip()
+        
+        if not user_message:
+            return jsonify({
+                'status': 'error',
+                'message': 'Message cannot be empty'
+            }), 400
+        
+        events = stream_chat_events(user_message, get_session_id(data, create=True))
+        
+        return Response(stream_with_context(events), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
 @app.route('/api/history', methods=['GET'])
 def get_history():
     try:
-        limit = request.args.get('limit', default=50, type=int)
-        history = conversation_history[-limit:]
+        # At least one entry, so a full page always has a next_before_id
+        limit = max(request.args.get('limit', default=50, type=int), 1)
+        before_id = request.args.get('before_id', default=None, type=int)
+        session_id = get_session_id()
+        if session_id is None:
+            return jsonify({
+                'status': 'error',
+                'message': SESSION_REQUIRED
+            }), 400
+        history = conversation_history.recent(session_id, limit, before_id)
         
         return jsonify({
             'status': 'success',
+            'session_id': session_id,
             'history': history,
-            'total': len(conversation_history)
+            'total': conversation_history.count(session_id),
+            'next_before_id': history[0]['id'] if len(history) == limit else None
         }), 200
         
     except Exception as e:
@@ -89,8 +408,13 @@ def get_history():
 @app.route('/api/clear', methods=['POST'])
 def clear_history():
     try:
-        global conversation_history
-        conversation_history = []
+        session_id = get_session_id(request.get_json(silent=True))
+        if session_id is None:
+            return jsonify({
+                'status': 'error',
+                'message': SESSION_REQUIRED
+            }), 400
+        conversation_history.clear(session_id)
         
         return jsonify({
             'status': 'success',
@@ -106,39 +430,16 @@ def clear_history():
 
 @app.route('/api/suggestions', methods=['GET'])
 def get_suggestions():
-    suggestions = [
-        "Help with Python errors",
-        "Analyze my code",
-        "Learning resources for web development",
-        "Show me a code example",
-        "Debugging tips",
-        "Performance optimization",
-        "Tell me about your features"
-    ]
-    
     return jsonify({
         'status': 'success',
-        'suggestions': suggestions
+        'suggestions': SUGGESTIONS
     }), 200
 
 
 @app.route('/api/chatbot-info', methods=['GET'])
 def get_chatbot_info():
     try:
-        info = {
-            'name': chatbot.name,
-            'version': chatbot.version,
-            'features': [
-                'Problem solving (Python, Debugging, Performance, Web, Database)',
-                'Code analysis and feedback',
-                'Learning resources and tutorials',
-                'Code examples and best practices',
-                'Performance optimization tips',
-                'Error diagnosis and solutions'
-            ],
-            'domains': list(problem_solver.solutions.keys()),
-            'total_messages': chatbot.conversation_count
-        }
+        info = collect_chatbot_info()
         
         return jsonify({
             'status': 'success',
@@ -191,34 +492,46 @@ def solve_problem():
 @app.route('/api/analyze-code', methods=['POST'])
 def analyze_code():
     try:
-        data = request.get_json()
-        
-        if not data or 'code' not in data:
-            return jsonify({
-                'status': 'error',
-                'message': 'Code field is required'
-            }), 400
-        
-        code = data.get('code', '').strip()
+        payload, status = review_submission(request.get_json())
+        return jsonify(payload), status
         
-        if not code:
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/api/analyze-batch', methods=['POST'])
+def analyze_batch():
+    try:
+        # Checked before the body is read; chunked bodies are cut off at
+        # MAX_CONTENT_LENGTH while they are read
+        if (request.content_length or 0) > MAX_UPLOAD_BYTES:
+            raise RequestEntityTooLarge()
+        
+        try:
+            upload = request.files.get('archive')
+            if upload is not None:
+                files = files_from_archive(upload.read())
+            else:
+                files = read_batch_files(request.content_type, request.get_data())
+        except ValueError as e:
             return jsonify({
                 'status': 'error',
-                'message': 'Code cannot be empty'
+                'message': str(e)
             }), 400
         
-        issues = code_analyzer.analyze_code(code)
-        report = code_analyzer.format_report(issues)
-        suggestions = code_analyzer.get_suggestions(code)
+        return Response(stream_with_context(batch_events(files)), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
         
+    except RequestEntityTooLarge:
         return jsonify({
-            'status': 'success',
-            'issues': issues,
-            'report': report,
-            'suggestions': suggestions,
-            'timestamp': datetime.now().isoformat()
-        }), 200
-        
+            'status': 'error',
+            'message': 'Request body too large'
+        }), 413
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -303,14 +616,7 @@ def get_code_example():
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     try:
-        stats = {
-            'chatbot_name': chatbot.name,
-            'chatbot_version': chatbot.version,
-            'total_conversations': chatbot.conversation_count,
-            'problems_solved': problem_solver.problems_solved,
-            'code_analyses': code_analyzer.issues_found,
-            'available_domains': list(problem_solver.solutions.keys())
-        }
+        stats = collect_stats()
         
         return jsonify({
             'status': 'success',
@@ -325,6 +631,11 @@ def get_stats():
         }), 500
 
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.exposition(), content_type=METRICS_CONTENT_TYPE)
+
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({
@@ -341,7 +652,14 @@ def internal_error(error):
     }), 500
 
 
+# Everything shared is built by now. Keep later collections away from it so
+# workers forked from this process (gunicorn --preload) share it copy-on-write.
+if os.environ.get('GC_FREEZE', '1') != '0':
+    services.freeze()
+
+
 if __name__ == '__main__':
     print(f"Starting {chatbot.name} (v{chatbot.version}) on http://localhost:5000")
     print("Features: Problem Solving, Code Analysis, Learning Resources, Error Detection")
+    print(format_memory(process_memory()))
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,497 @@
+"""ASGI entry point serving the same API as app.py with async handlers.
+
+Run with an ASGI server, for example:
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+Handlers share the chatbot, knowledge services and history store built in
+app.py. Each connection costs a coroutine instead of a thread, so slow or
+idle keep-alive clients do not tie up workers. Anything that computes an
+answer (the chatbot, retrieval, code analysis) or touches the history
+store runs on a bounded thread pool so it cannot stall the event loop.
+"""
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Generator, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from app import (
+    MAX_SESSION_ID_LENGTH, MAX_UPLOAD_BYTES, METRICS_CONTENT_TYPE, SESSION_REQUIRED, SUGGESTIONS,
+    batch_analyzer, batch_events, chatbot, collect_chatbot_info, collect_stats,
+    conversation_history, learning_resources, metrics, new_session_id, problem_solver, profiler, read_batch_files,
+    record_request, review_submission, services, sse_event, stream_chat_events
+)
+from profiling import carry, current_profile
+from services import format_memory, process_memory
+
+MAX_BODY_BYTES = int(os.environ.get('ASGI_MAX_BODY_BYTES', 1024 * 1024))
+# Archive uploads to the batch endpoint may be larger, up to MAX_UPLOAD_BYTES
+UPLOAD_PATHS = {'/api/analyze-batch'}
+
+executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('ASGI_EXECUTOR_WORKERS', min(32, (os.cpu_count() or 1) + 4))),
+    thread_name_prefix='asgi-worker'
+)
+
+CORS_HEADERS = [
+    (b'access-control-allow-origin', b'*'),
+    (b'access-control-allow-headers', b'Content-Type, X-Session-Id'),
+    (b'access-control-allow-methods', b'GET, POST, OPTIONS'),
+]
+
+
+class Request:
+
+    def __init__(self, scope: Dict, body: bytes):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.args = {key: values[-1] for key, values in parse_qs(scope.get('query_string', b'').decode()).items()}
+        self.headers = {key.decode('latin-1').lower(): value.decode('latin-1') for key, value in scope.get('headers', [])}
+        self.body = body
+
+    def get_json(self) -> Optional[Dict]:
+        if not self.body:
+            return None
+        try:
+            data = json.loads(self.body)
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+
+    def get_int_arg(self, name: str, default=None):
+        try:
+            return int(self.args[name])
+        except (KeyError, ValueError):
+            return default
+
+    def session_id(self, data: Optional[Dict] = None, create: bool = False) -> Optional[str]:
+        """The client's session id; see app.get_session_id"""
+        session_id = (data or {}).get('session_id') or self.args.get('session_id') \
+            or self.headers.get('x-session-id')
+        if not session_id:
+            return new_session_id() if create else None
+        return str(session_id)[:MAX_SESSION_ID_LENGTH]
+
+
+Response = Tuple[Dict, int]
+
+
+class EventStream:
+    """Handler result streamed to the client as text/event-stream.
+
+    Producing an event may compute (the chatbot) or wait (batch worker
+    processes), so each event is pulled on the executor. The generator is
+    closed when the stream ends, including when the client disconnects.
+    """
+
+    def __init__(self, events: Generator[str, None, None]):
+        self.events = events
+
+
+class PlainText:
+    """Handler result sent as a non-JSON body"""
+
+    def __init__(self, body: str, content_type: str):
+        self.body = body
+        self.content_type = content_type
+
+
+routes: Dict[Tuple[str, str], Callable] = {}
+
+
+def route(path: str, methods=('GET',)):
+    def decorator(handler):
+        for method in methods:
+            routes[(method, path)] = handler
+        return handler
+    return decorator
+
+
+async def run_blocking(func, *args):
+    """Run CPU-bound work on the bounded executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, carry(func), *args)
+
+
+def error(message: str, status: int) -> Response:
+    return {'status': 'error', 'message': message}, status
+
+
+@route('/api/health')
+async def health_check(request: Request) -> Response:
+    return {
+        'status': 'success',
+        'message': 'Chatbot API is running',
+        'timestamp': datetime.now().isoformat()
+    }, 200
+
+
+def answer_message(session_id: str, user_message: str) -> str:
+    """Answer a chat message and record the exchange; runs on the executor"""
+    bot_response = chatbot.get_response(user_message)
+    conversation_history.append(session_id, {
+        'user': user_message,
+        'bot': bot_response,
+        'timestamp': datetime.now().isoformat()
+    })
+    return bot_response
+
+
+def history_page(session_id: str, limit: int, before_id: Optional[int]) -> Tuple[List[Dict], int]:
+    """A page of a session's history and its total length; runs on the executor"""
+    return conversation_history.recent(session_id, limit, before_id), conversation_history.count(session_id)
+
+
+@route('/api/chat', methods=('POST',))
+async def chat(request: Request) -> Response:
+    start = time.perf_counter()
+    data = request.get_json()
+
+    if not data or 'message' not in data:
+        return error('Message field is required', 400)
+
+    user_message = str(data.get('message', '')).strip()
+
+    if not user_message:
+        return error('Message cannot be empty', 400)
+
+    session_id = request.session_id(data, create=True)
+    bot_response = await run_blocking(answer_message, session_id, user_message)
+
+    return {
+        'status': 'success',
+        'session_id': session_id,
+        'user_message': user_message,
+        'bot_response': bot_response,
+        'response_time_ms': chatbot.utils.get_response_time(start),
+        'timestamp': datetime.now().isoformat()
+    }, 200
+
+
+@route('/api/chat/stream', methods=('POST',))
+async def chat_stream(request: Request):
+    data = request.get_json()
+
+    if not data or 'message' not in data:
+        return error('Message field is required', 400)
+
+    user_message = str(data.get('message', '')).strip()
+
+    if not user_message:
+        return error('Message cannot be empty', 400)
+
+    return EventStream(stream_chat_events(user_message, request.session_id(data, create=True)))
+
+
+@route('/api/history')
+async def get_history(request: Request) -> Response:
+    # At least one entry, so a full page always has a next_before_id
+    limit = max(request.get_int_arg('limit', 50), 1)
+    before_id = request.get_int_arg('before_id')
+    session_id = request.session_id()
+    if session_id is None:
+        return error(SESSION_REQUIRED, 400)
+    history, total = await run_blocking(history_page, session_id, limit, before_id)
+
+    return {
+        'status': 'success',
+        'session_id': session_id,
+        'history': history,
+        'total': total,
+        'next_before_id': history[0]['id'] if len(history) == limit else None
+    }, 200
+
+
+@route('/api/clear', methods=('POST',))
+async def clear_history(request: Request) -> Response:
+    session_id = request.session_id(request.get_json())
+    if session_id is None:
+        return error(SESSION_REQUIRED, 400)
+    await run_blocking(conversation_history.clear, session_id)
+
+    return {
+        'status': 'success',
+        'message': 'Conversation history cleared'
+    }, 200
+
+
+@route('/api/suggestions')
+async def get_suggestions(request: Request) -> Response:
+    return {
+        'status': 'success',
+        'suggestions': SUGGESTIONS
+    }, 200
+
+
+@route('/api/chatbot-info')
+async def get_chatbot_info(request: Request) -> Response:
+    return {
+        'status': 'success',
+        'info': await run_blocking(collect_chatbot_info),
+        'timestamp': datetime.now().isoformat()
+    }, 200
+
+
+@route('/api/solve-problem', methods=('POST',))
+async def solve_problem(request: Request) -> Response:
+    data = request.get_json()
+
+    if not data or 'problem' not in data:
+        return error('Problem field is required', 400)
+
+    problem = str(data.get('problem', '')).strip()
+    domain = data.get('domain', None)
+
+    if not problem:
+        return error('Problem cannot be empty', 400)
+
+    return {
+        'status': 'success',
+        'problem': problem,
+        'solution': await run_blocking(problem_solver.solve_problem, problem, domain),
+        'timestamp': datetime.now().isoformat()
+    }, 200
+
+
+@route('/api/analyze-code', methods=('POST',))
+async def analyze_code(request: Request) -> Response:
+    return await run_blocking(review_submission, request.get_json())
+
+
+@route('/api/analyze-batch', methods=('POST',))
+async def analyze_batch(request: Request):
+    try:
+        files = read_batch_files(request.headers.get('content-type'), request.body)
+    except ValueError as e:
+        return error(str(e), 400)
+
+    return EventStream(batch_events(files))
+
+
+@route('/api/learning-resources')
+async def get_learning_resources(request: Request) -> Response:
+    return {
+        'status': 'success',
+        'resources': learning_resources.list_all_resources(),
+        'timestamp': datetime.now().isoformat()
+    }, 200
+
+
+@route('/api/learning-path', methods=('POST',))
+async def get_learning_path(request: Request) -> Response:
+    data = request.get_json()
+
+    if not data or 'goal' not in data:
+        return error('Goal field is required', 400)
+
+    goal = str(data.get('goal', '')).strip()
+
+    return {
+        'status': 'success',
+        'goal': goal,
+        'learning_path': await run_blocking(learning_resources.get_learning_path, goal),
+        'timestamp': datetime.now().isoformat()
+    }, 200
+
+
+@route('/api/code-example', methods=('POST',))
+async def get_code_example(request: Request) -> Response:
+    data = request.get_json()
+
+    if not data or 'topic' not in data:
+        return error('Topic field is required', 400)
+
+    topic = str(data.get('topic', '')).strip()
+
+    return {
+        'status': 'success',
+        'topic': topic,
+        'example': await run_blocking(problem_solver.get_code_example, topic),
+        'timestamp': datetime.now().isoformat()
+    }, 200
+
+
+@route('/api/stats')
+async def get_stats(request: Request) -> Response:
+    return {
+        'status': 'success',
+        'stats': await run_blocking(collect_stats),
+        'timestamp': datetime.now().isoformat()
+    }, 200
+
+
+@route('/api/metrics')
+async def get_metrics(request: Request) -> PlainText:
+    return PlainText(await run_blocking(metrics.exposition), METRICS_CONTENT_TYPE)
+
+
+async def _read_body(receive, limit: int) -> Optional[bytes]:
+    """Read the request body, or return None if the client disconnected"""
+    chunks = []
+    size = 0
+    more_body = True
+
+    while more_body:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > limit:
+            raise ValueError('Request body too large')
+        chunks.append(chunk)
+        more_body = message.get('more_body', False)
+
+    return b''.join(chunks)
+
+
+async def _send_json(send, payload: Dict, status: int):
+    body = json.dumps(payload).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())] + CORS_HEADERS
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _send_text(send, text: 'PlainText'):
+    body = text.body.encode()
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', text.content_type.encode()), (b'content-length', str(len(body)).encode())] + CORS_HEADERS
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _send_stream(send, receive, stream: EventStream):
+    events = stream.events
+    client_left = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        client_left.set()
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    pulling = None
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache')] + CORS_HEADERS
+        })
+        while not client_left.is_set():
+            try:
+                # Shielded so a cancelled request still waits for the pull
+                # to finish before closing the generator
+                pulling = asyncio.ensure_future(run_blocking(next, events, None))
+                event = await asyncio.shield(pulling)
+            except Exception as e:
+                # The producer failed partway: report it and end the stream
+                event = sse_event('error', {'message': str(e)})
+                await send({'type': 'http.response.body', 'body': event.encode(), 'more_body': True})
+                break
+            if event is None:
+                break
+            await send({'type': 'http.response.body', 'body': event.encode(), 'more_body': True})
+        if not client_left.is_set():
+            await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        watcher.cancel()
+        if pulling is not None:
+            await asyncio.wait([pulling])
+        # Runs the producer's cleanup, such as cancelling queued batch work,
+        # when the client left or a send failed before the stream ended
+        await run_blocking(events.close)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            metrics.start()
+            services.watch()
+            print(format_memory(process_memory()), flush=True)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            executor.shutdown(wait=False)
+            batch_analyzer.shutdown()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+def _endpoint(path: str) -> str:
+    # Label unknown paths together so scans cannot create unbounded series
+    return path if any(route_path == path for _, route_path in routes) else 'unmatched'
+
+
+async def _respond(scope, receive, send) -> Optional[int]:
+    """Serve one request; returns the response status, or None if the client left"""
+    try:
+        body = await _read_body(receive, MAX_UPLOAD_BYTES if scope['path'] in UPLOAD_PATHS else MAX_BODY_BYTES)
+    except ValueError as e:
+        await _send_json(send, *error(str(e), 413))
+        return 413
+
+    if body is None:
+        return None
+
+    request = Request(scope, body)
+    handler = routes.get((request.method, request.path))
+
+    if handler is None:
+        if any(path == request.path for _, path in routes):
+            payload, status = error('Method not allowed', 405)
+        else:
+            payload, status = error('Endpoint not found', 404)
+    else:
+        try:
+            result = await handler(request)
+        except Exception as e:
+            result = error(str(e), 500)
+
+        if isinstance(result, EventStream):
+            await _send_stream(send, receive, result)
+            return 200
+
+        if isinstance(result, PlainText):
+            await _send_text(send, result)
+            return 200
+
+        payload, status = result
+
+    await _send_json(send, payload, status)
+    return status
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+
+    if scope['type'] != 'http':
+        return
+
+    if scope['method'] == 'OPTIONS':
+        await send({'type': 'http.response.start', 'status': 204, 'headers': CORS_HEADERS})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    metrics.start()
+    services.watch()
+    start = time.perf_counter()
+    # Only work handed to run_blocking is profiled: the event loop thread
+    # interleaves many requests
+    profile = profiler.begin(attach=False)
+    current_profile.set(profile)
+    status = await _respond(scope, receive, send)
+    seconds = time.perf_counter() - start
+    endpoint = _endpoint(scope['path'])
+    if status is not None:
+        record_request(endpoint, status, seconds)
+    profiler.end(profile, endpoint, seconds, detach=False)
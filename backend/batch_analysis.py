@@ -0,0 +1,181 @@
+"""Batch code analysis across a process pool.
+
+Files come from a JSON list or an uploaded zip/tar archive. Each file is
+reviewed in a worker process, so a batch uses every core instead of the
+one running the request, and results are yielded as soon as each file
+finishes.
+"""
+import io
+import os
+import tarfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from analysis_engine import count_issues
+from analysis_guard import AnalysisGuard
+from code_analyzer import CodeAnalyzer
+
+ANALYZED_EXTENSIONS = ('.py',)
+MAX_BATCH_FILES = int(os.environ.get('BATCH_MAX_FILES', 5000))
+MAX_FILE_BYTES = int(os.environ.get('BATCH_MAX_FILE_BYTES', 1024 * 1024))
+MAX_ARCHIVE_BYTES = int(os.environ.get('BATCH_MAX_ARCHIVE_BYTES', 64 * 1024 * 1024))
+
+# One analyzer per worker process, built by _init_worker
+_worker_analyzer: Optional[CodeAnalyzer] = None
+
+
+def _init_worker(disabled_rules: List[str], limits: Optional[Dict]):
+    global _worker_analyzer
+    guard = AnalysisGuard(workers=1, **limits) if limits else None
+    _worker_analyzer = CodeAnalyzer(disabled_rules=disabled_rules, guard=guard)
+
+
+def _review_file(path: str, code: str) -> Dict:
+    start = time.perf_counter()
+    result = _worker_analyzer.review(code)
+    result['path'] = path
+    result['elapsed_ms'] = round((time.perf_counter() - start) * 1e3, 3)
+    return result
+
+
+def files_from_json(data: Dict) -> List[Tuple[str, str]]:
+    """Read [{'path': ..., 'code': ...}, ...] from a request body"""
+    files = data.get('files') if isinstance(data, dict) else None
+    if not isinstance(files, list) or not files:
+        raise ValueError('files must be a non-empty list of {"path", "code"} objects')
+    if len(files) > MAX_BATCH_FILES:
+        raise ValueError(f'At most {MAX_BATCH_FILES} files per batch')
+
+    result = []
+    for index, item in enumerate(files):
+        if not isinstance(item, dict) or not isinstance(item.get('code'), str):
+            raise ValueError(f'files[{index}] needs a "code" string')
+        result.append((str(item.get('path') or f'file_{index}.py'), item['code']))
+    return result
+
+
+def _iter_archive_members(body: bytes) -> Iterator[Tuple[str, int, Callable[[], bytes]]]:
+    """Yield (name, size, read) for every regular file in a zip or tar archive"""
+    if zipfile.is_zipfile(io.BytesIO(body)):
+        archive = zipfile.ZipFile(io.BytesIO(body))
+        for info in archive.infolist():
+            if not info.is_dir():
+                yield info.filename, info.file_size, lambda info=info: archive.read(info)
+        return
+
+    try:
+        archive = tarfile.open(fileobj=io.BytesIO(body), mode='r:*')
+    except tarfile.TarError:
+        raise ValueError('Upload is not a zip or tar archive')
+    for member in archive:
+        if member.isfile():
+            yield member.name, member.size, lambda member=member: archive.extractfile(member).read()
+
+
+def files_from_archive(body: bytes) -> List[Tuple[str, str]]:
+    """Extract the Python sources of a zip or (optionally compressed) tar upload.
+
+    Sizes are checked against the archive headers before anything is
+    decompressed, so an archive bomb is rejected instead of expanded.
+    """
+    files = []
+    total = 0
+
+    for name, size, read in _iter_archive_members(body):
+        if not name.endswith(ANALYZED_EXTENSIONS) or size > MAX_FILE_BYTES:
+            continue
+        total += size
+        if total > MAX_ARCHIVE_BYTES or len(files) >= MAX_BATCH_FILES:
+            raise ValueError(f'Archive exceeds {MAX_BATCH_FILES} files or {MAX_ARCHIVE_BYTES} bytes of source')
+        files.append((name, read()[:MAX_FILE_BYTES].decode('utf-8', errors='replace')))
+
+    if not files:
+        raise ValueError('Archive contains no Python files')
+    return files
+
+
+class BatchAnalyzer:
+    """Fans CodeAnalyzer reviews out over a process pool"""
+
+    def __init__(self, analyzer: CodeAnalyzer, workers: Optional[int] = None):
+        self.analyzer = analyzer
+        self.workers = workers or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.files = 0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Started on first use so importing the app does not fork workers
+        with self._lock:
+            if self._executor is None:
+                disabled = [name for name, rule in self.analyzer.engine.rules.items() if not rule.enabled]
+                guard = self.analyzer.guard
+                limits = {
+                    'max_bytes': guard.max_bytes,
+                    'cpu_seconds': guard.cpu_seconds,
+                    'wall_seconds': guard.wall_seconds
+                } if guard else None
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=_init_worker, initargs=(disabled, limits))
+            return self._executor
+
+    def iter_results(self, files: Iterable[Tuple[str, str]]) -> Iterator[Tuple[str, Dict]]:
+        """Yield ('file', result) as each file finishes, then ('summary', totals)"""
+        start = time.perf_counter()
+        pool = self._pool()
+        futures = {pool.submit(_review_file, path, code): path for path, code in files}
+        counts = {'syntax_errors': 0, 'style_issues': 0, 'performance_issues': 0, 'security_issues': 0}
+        failed = 0
+
+        try:
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failed += 1
+                    yield 'file', {'path': futures[future], 'error': str(e)}
+                    continue
+
+                found = 0
+                for category, count in count_issues(result['issues']).items():
+                    counts[category] += count
+                    found += count
+                self.analyzer.issues.inc(found)
+                yield 'file', result
+        finally:
+            # A client that disconnects should not leave queued work behind
+            for future in futures:
+                future.cancel()
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.batches += 1
+            self.files += len(futures)
+
+        yield 'summary', {
+            'files': len(futures),
+            'failed': failed,
+            'total_issues': sum(counts.values()),
+            'issues_by_category': counts,
+            'workers': self.workers,
+            'elapsed_ms': round(elapsed * 1e3, 3),
+            'files_per_second': round(len(futures) / elapsed, 1) if elapsed else 0.0
+        }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self) -> Dict:
+        return {
+            'workers': self.workers,
+            'started': self._executor is not None,
+            'batches': self.batches,
+            'files': self.files
+        }
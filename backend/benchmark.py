@@ -0,0 +1,361 @@
+"""Microbenchmarks for the chatbot backend.
+
+Usage: python benchmark.py [name ...]
+Run without arguments to execute every benchmark.
+"""
+import os
+import random
+import string
+import sys
+import tempfile
+import timeit
+from collections.abc import Mapping, Sequence
+
+from intent_matcher import IntentMatcher
+
+
+def _time_per_call(func, repeat: int = 5, number: int = 200) -> float:
+    """Best per-call time in microseconds"""
+    best = min(timeit.repeat(func, repeat=repeat, number=number))
+    return best / number * 1e6
+
+
+def _random_word(rng: random.Random, length: int) -> str:
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def _naive_intent(responses, user_input):
+    user_input_lower = user_input.lower().strip()
+    for intent, data in responses.items():
+        for pattern in data['patterns']:
+            if pattern.lower() in user_input_lower:
+                return intent
+    return 'default'
+
+
+def bench_intents():
+    """Per-message intent lookup latency as the pattern table grows"""
+    rng = random.Random(42)
+    message = ' '.join(_random_word(rng, rng.randint(3, 8)) for _ in range(20)) + ' tell me a joke'
+
+    print(f"{'patterns':>10} {'linear scan (us)':>18} {'automaton (us)':>16} {'build (ms)':>12}")
+    for size in (10, 100, 1000, 10000):
+        responses = {}
+        for i in range(size // 10):
+            responses[f'intent_{i}'] = {
+                'patterns': [_random_word(rng, 10) for _ in range(10)],
+                'responses': ['ok']
+            }
+        responses['joke'] = {'patterns': ['tell me a joke'], 'responses': ['ha']}
+        responses['default'] = {'patterns': [], 'responses': ['hm']}
+
+        build_ms = min(timeit.repeat(lambda: IntentMatcher(responses), repeat=3, number=1)) * 1e3
+        matcher = IntentMatcher(responses)
+        assert matcher.match(message) == _naive_intent(responses, message) == 'joke'
+
+        naive = _time_per_call(lambda: _naive_intent(responses, message), number=20)
+        compiled = _time_per_call(lambda: matcher.match(message))
+        print(f"{size:>10} {naive:>18.1f} {compiled:>16.1f} {build_ms:>12.1f}")
+
+
+def bench_routing():
+    """Chatbot.get_response latency per route"""
+    from chatbot import Chatbot
+
+    bot = Chatbot()
+    messages = {
+        'problem': 'Help with AttributeError',
+        'learning': 'learning path for backend',
+        'example': 'show me decorator',
+        'tips': 'debugging tips',
+        'intent': 'hello there, how are you?',
+        'default': 'the weather is nice today',
+    }
+
+    print(f"{'route':>10} {'latency (us)':>14}")
+    for route, message in messages.items():
+        print(f"{route:>10} {_time_per_call(lambda: bot.get_response(message)):>14.1f}")
+
+
+def bench_history():
+    """History cost per /api/chat append and /api/history read, memory vs SQLite"""
+    from history_store import SessionHistoryStore, SQLiteHistoryStore
+
+    entry = {'user': 'Help with AttributeError', 'bot': 'x' * 200, 'timestamp': '2024-12-09T10:30:05'}
+    sessions = [f'session-{i}' for i in range(1000)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stores = {
+            'memory': SessionHistoryStore(),
+            'sqlite': SQLiteHistoryStore(os.path.join(tmp, 'history.db')),
+        }
+
+        print(f"{'backend':>8} {'append (us)':>12} {'last 50 (us)':>13} {'page (us)':>10}")
+        for name, store in stores.items():
+            for i in range(20000):
+                store.append(sessions[i % len(sessions)], entry)
+            if hasattr(store, 'flush'):
+                store.flush()
+
+            counter = iter(range(10 ** 9))
+            append = _time_per_call(lambda: store.append(sessions[next(counter) % len(sessions)], entry))
+            if hasattr(store, 'flush'):
+                store.flush()
+            read = _time_per_call(lambda: store.recent('session-7', 50))
+            before_id = store.recent('session-7', 50)[0]['id']
+            page = _time_per_call(lambda: store.recent('session-7', 10, before_id))
+            print(f"{name:>8} {append:>12.1f} {read:>13.1f} {page:>10.1f}")
+
+        stores['sqlite'].close()
+
+
+def bench_solutions():
+    """Error lookup latency as the number of error signatures grows"""
+    from solution_index import SolutionIndex
+
+    rng = random.Random(7)
+    problem = 'help, my script crashes with a ' + ' '.join(_random_word(rng, 6) for _ in range(30)) + ' keyerror'
+
+    print(f"{'errors':>8} {'linear scan (us)':>18} {'index (us)':>12}")
+    for size in (10, 100, 1000, 5000):
+        entries = [('python', _random_word(rng, 8).title() + 'Error', ' '.join(_random_word(rng, 5) for _ in range(20)))
+                   for _ in range(size)]
+        entries.append(('python', 'KeyError', 'Use .get() method instead.'))
+        index = SolutionIndex(entries)
+
+        def linear():
+            for _, error, _solution in entries:
+                if error.lower() in problem:
+                    return error
+
+        assert linear() == index.best(problem)[1] == 'KeyError'
+        print(f"{size:>8} {_time_per_call(linear, number=20):>18.1f} {_time_per_call(lambda: index.best(problem)):>12.1f}")
+
+
+def bench_retrieval():
+    """BM25 query latency as the knowledge base grows"""
+    from retrieval import BM25Index, Document, iter_documents
+
+    rng = random.Random(11)
+    vocabulary = [_random_word(rng, rng.randint(4, 9)) for _ in range(5000)]
+    query = 'how do I fix a missing dictionary key in my python script'
+
+    print(f"{'documents':>10} {'query (us)':>12} {'build (ms)':>12}")
+    for extra in (0, 1000, 10000):
+        documents = list(iter_documents())
+        documents += [Document('tip', f"synthetic:{i}", 'synthetic', ' '.join(rng.sample(vocabulary, 3)),
+                               ' '.join(rng.choice(vocabulary) for _ in range(25)))
+                      for i in range(extra)]
+        build_ms = min(timeit.repeat(lambda: BM25Index(documents), repeat=3, number=1)) * 1e3
+        index = BM25Index(documents)
+        assert index.best(query).key == 'KeyError'
+        print(f"{len(documents):>10} {_time_per_call(lambda: index.search(query)):>12.1f} {build_ms:>12.1f}")
+
+
+def bench_spelling():
+    """Typo lookup latency as the vocabulary grows"""
+    from spelling import SymSpell, edit_distance
+
+    rng = random.Random(13)
+    typo = 'decortor'
+
+    def pairwise(words):
+        # Every word compared with the typo, as a plain Levenshtein search would
+        distance, _, best = min((edit_distance(typo, word, 2), i, word) for i, word in enumerate(words))
+        return best if distance <= 2 else None
+
+    print(f"{'words':>8} {'pairwise (us)':>15} {'symspell (us)':>15} {'build (ms)':>12}")
+    for size in (100, 1000, 10000, 50000):
+        words = ['decorator'] + [_random_word(rng, rng.randint(4, 10)) for _ in range(size - 1)]
+        build_ms = min(timeit.repeat(lambda: SymSpell(words), repeat=1, number=1)) * 1e3
+        speller = SymSpell(words)
+        assert speller.lookup(typo) == pairwise(words) == 'decorator'
+        number = max(1, 2000 // size)
+        print(f"{size:>8} {_time_per_call(lambda: pairwise(words), repeat=3, number=number):>15.1f} "
+              f"{_time_per_call(lambda: speller.lookup(typo)):>15.1f} {build_ms:>12.1f}")
+
+
+def _sample_module(rng: random.Random, lines: int) -> str:
+    """Synthetic submission mixing the constructs the analyzer checks"""
+    blocks = []
+    for i in range(lines // 10):
+        blocks.append(
+            f"def handler_{i}(rows, userName):\n"
+            f"    total = ''\n"
+            f"    for row in rows:\n"
+            f"        for cell in row:\n"
+            f"            total += 'x'\n"
+            f"    query = 'SELECT * FROM t WHERE id = ' + str(userName)\n"
+            f"    cursor.execute(query + ';')\n"
+            f"    values = list(rows)\n"
+            f"    return total, values  # {_random_word(rng, 30)}\n"
+        )
+    return '\n'.join(blocks)
+
+
+def bench_analysis():
+    """CodeAnalyzer.analyze_code latency as submissions grow"""
+    from code_analyzer import CodeAnalyzer
+
+    analyzer = CodeAnalyzer()
+    rng = random.Random(11)
+
+    print(f"{'lines':>8} {'analyze (ms)':>14} {'us/line':>9}")
+    for lines in (500, 1000, 2000, 5000):
+        code = _sample_module(rng, lines)
+        elapsed = _time_per_call(lambda: analyzer.analyze_code(code), repeat=3, number=3)
+        print(f"{lines:>8} {elapsed / 1e3:>14.2f} {elapsed / lines:>9.2f}")
+
+
+def bench_batch():
+    """Batch analysis throughput as worker processes are added"""
+    from batch_analysis import BatchAnalyzer
+    from code_analyzer import CodeAnalyzer
+
+    rng = random.Random(13)
+    corpus = [(f'module_{i}.py', _sample_module(rng, 300)) for i in range(120)]
+    analyzer = CodeAnalyzer()
+
+    start = timeit.default_timer()
+    for _, code in corpus:
+        analyzer.review(code)
+    serial = len(corpus) / (timeit.default_timer() - start)
+
+    print(f"{'workers':>8} {'files/s':>9} {'speedup':>8}")
+    print(f"{'inline':>8} {serial:>9.1f} {1.0:>8.2f}")
+    cores = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1)))
+    for workers in counts:
+        batch = BatchAnalyzer(analyzer, workers=workers)
+        list(batch.iter_results(corpus[:workers]))  # start and warm the workers
+        start = timeit.default_timer()
+        list(batch.iter_results(corpus))
+        rate = len(corpus) / (timeit.default_timer() - start)
+        batch.shutdown()
+        print(f"{workers:>8} {rate:>9.1f} {rate / serial:>8.2f}")
+
+
+def _thaw(value):
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, Sequence) and not isinstance(value, str):
+        return [_thaw(item) for item in value]
+    return value
+
+
+def _literal_builder(table):
+    """Function that rebuilds `table` from a dict/list display on every call,
+    the way the handlers did before the tables moved to knowledge.py"""
+    namespace = {}
+    exec(f"def build():\n    return {_thaw(table)!r}", namespace)
+    return namespace['build']
+
+
+def bench_knowledge():
+    """Per-call cost of the static tables behind each endpoint: rebuilt per call vs frozen at import"""
+    import knowledge
+    from chatbot_utils import ChatbotUtils
+    from problem_solver import ProblemSolver
+    from simple_chatbot import SimpleChatbot
+
+    categories = _literal_builder(knowledge.TABLES.input_categories)
+    explanations = _literal_builder(knowledge.TABLES.error_explanations)
+    examples = _literal_builder(knowledge.TABLES.code_examples)
+    dictionary = _literal_builder(knowledge.TABLES.dictionary)
+
+    def validate_before(user_input):
+        input_lower = user_input.lower().strip()
+        for category, keywords in categories().items():
+            for keyword in keywords:
+                if keyword in input_lower:
+                    return True, category, user_input
+        return False, None, user_input
+
+    def error_before(error):
+        for error_type, explanation in explanations().items():
+            if error_type in error.lower():
+                return f"**{error}**\n{explanation}"
+        return f"**{error}**"
+
+    def example_before(topic):
+        table = examples()
+        if topic.lower() in table:
+            return f"**{topic.title()} Example:**\n```python\n{table[topic.lower()]}\n```"
+        return f"I don't have an example for '{topic}' yet."
+
+    def dictionary_before(user_input):
+        table = dictionary()
+        for word in user_input.lower().split():
+            if word in table:
+                return f"**{word.capitalize()}**: {table[word]}"
+        available = ', '.join(list(table.keys())[:10]) + '...'
+        return f"Available words: {available}\nTry asking 'definition of python' or 'what is algorithm'"
+
+    solver = ProblemSolver()
+    simple = SimpleChatbot()
+    message = 'can you give me some advice on my tutorial project'
+    cases = [
+        ('/api/chat (validate_input)', lambda: validate_before(message), lambda: ChatbotUtils.validate_input(message)),
+        ('/api/chat (error message)', lambda: error_before('RuntimeError: boom'),
+         lambda: ChatbotUtils.format_error_message('RuntimeError: boom')),
+        ('/api/code-example', lambda: example_before('decorator'),
+         lambda: ProblemSolver.get_code_example.__wrapped__(solver, 'decorator')),
+        ('/api/dictionary', lambda: dictionary_before('definition of encryption'),
+         lambda: simple.handle_dictionary('definition of encryption')),
+        ('/api/dictionary (miss)', lambda: dictionary_before('definition of nothing'),
+         lambda: simple.handle_dictionary('definition of nothing')),
+    ]
+
+    print(f"{'endpoint':>28} {'rebuilt (us)':>13} {'frozen (us)':>12} {'speedup':>8}")
+    for name, before, after in cases:
+        assert before() == after()
+        rebuilt = _time_per_call(before, number=2000)
+        frozen = _time_per_call(after, number=2000)
+        print(f"{name:>28} {rebuilt:>13.2f} {frozen:>12.2f} {rebuilt / frozen:>8.2f}")
+
+
+def bench_templates():
+    """Reply rendering: formatting each template per reply vs compiled templates"""
+    from datetime import datetime
+    from response_templates import TemplateEngine
+
+    constants = {'name': 'Alok Pradhan Chatbot', 'version': '2.0'}
+    engine = TemplateEngine(constants)
+    cases = [
+        ('greeting', "Hello! I'm {name}. How can I help you today?"),
+        ('time', 'The current time is {now:%H:%M:%S}'),
+        ('date', 'Today is {now:%A, %B %d, %Y}'),
+        ('help menu', '**{name} - Help Menu**\n' + 'Commands and Topics: ... \n' * 12),
+    ]
+
+    print(f"{'reply':>10} {'str.format (us)':>17} {'compiled (us)':>15} {'speedup':>8}")
+    for label, source in cases:
+        template = engine.compile(source)
+        now = datetime(2024, 12, 9, 10, 30)
+        assert engine.render(template, now=now) == source.format(now=now, **constants)
+        per_reply = _time_per_call(lambda: source.format(now=datetime.now(), **constants), number=2000)
+        compiled = _time_per_call(lambda: engine.render(template), number=2000)
+        print(f"{label:>10} {per_reply:>17.2f} {compiled:>15.2f} {per_reply / compiled:>8.2f}")
+
+
+BENCHMARKS = {
+    'intents': bench_intents,
+    'routing': bench_routing,
+    'history': bench_history,
+    'solutions': bench_solutions,
+    'retrieval': bench_retrieval,
+    'spelling': bench_spelling,
+    'analysis': bench_analysis,
+    'batch': bench_batch,
+    'knowledge': bench_knowledge,
+    'templates': bench_templates,
+}
+
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            sys.exit(f"Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+        print(f"\n== {name}: {BENCHMARKS[name].__doc__}")
+        BENCHMARKS[name]()
@@ -1,182 +1,199 @@
-import json
-from datetime import datetime
 import random
-from problem_solver import ProblemSolver
-from code_analyzer import CodeAnalyzer
-from learning_resources import LearningResources
-from chatbot_utils import ChatbotUtils
+from typing import Dict, NamedTuple, Optional
+from intent_matcher import IntentMatcher
+from knowledge_base import KnowledgeBase
+from retrieval import BM25Index
+from router import Router
+from services import Services
+from metrics import Counter
+from response_templates import TemplateEngine
+import knowledge
+
+
+class ChatTables(NamedTuple):
+    """One version of the reply tables and the intent matcher built from them"""
+    responses: Dict
+    intent_matcher: IntentMatcher
+    retrieval: Optional[BM25Index]
+
 
 class Chatbot:
     
-    def __init__(self):
+    def __init__(self, services: Services = None):
         self.name = "Alok Pradhan Chatbot"
         self.version = "2.0"
-        self.responses = self._load_responses()
-        self.conversation_count = 0
-        self.problem_solver = ProblemSolver()
-        self.code_analyzer = CodeAnalyzer()
-        self.learning_resources = LearningResources()
-        self.utils = ChatbotUtils()
-    
-    def _load_responses(self):
+        self.conversations = Counter('chatbot_conversations_total', 'Messages answered by the chatbot')
+        # Replies are compiled when the tables load and rendered per reply, so
+        # {now:...} shows the time of the reply
+        self.templates = TemplateEngine({'name': self.name, 'version': self.version},
+                                        {'conversations': lambda: self.conversation_count})
+        # Share the app's components so their tables and counters exist once
+        services = services or Services()
+        self.problem_solver = services.problem_solver
+        self.code_analyzer = services.code_analyzer
+        self.learning_resources = services.learning_resources
+        self.utils = services.utils
+        self.reload(services.knowledge, services.retrieval)
+        services.attach(self)
+        self.router = self._build_router()
+    
+    @property
+    def conversation_count(self):
+        return int(self.conversations.value())
+    
+    def build(self, base: KnowledgeBase = None, retrieval: BM25Index = None) -> ChatTables:
+        """Load the reply tables and compile the intent matcher without installing them"""
+        responses = self._load_responses(base)
+        return ChatTables(responses, IntentMatcher(responses), retrieval)
+    
+    def install(self, tables: ChatTables):
+        """Swap in tables from build(); calls already running finish with the old ones"""
+        self._tables = tables
+    
+    def reload(self, base: KnowledgeBase = None, retrieval: BM25Index = None):
+        self.install(self.build(base, retrieval))
+    
+    @property
+    def responses(self):
+        return self._tables.responses
+    
+    @property
+    def intent_matcher(self) -> IntentMatcher:
+        return self._tables.intent_matcher
+    
+    @property
+    def retrieval(self) -> Optional[BM25Index]:
+        return self._tables.retrieval
+    
+    def _load_responses(self, base: KnowledgeBase = None):
+        base = base or knowledge.TABLES.base
         return {
-            'greeting': {
-                'patterns': ['hello', 'hi', 'hey', 'greetings', 'good morning', 'good afternoon', 'good evening'],
-                'responses': [
-                    f'Hello! I\'m {self.name}. How can I help you today?',
-                    f'Hi there! I\'m {self.name}. What can I do for you?',
-                    f'Greetings! I\'m {self.name}. How may I assist you?',
-                    f'Hey! I\'m {self.name}. Nice to meet you. What do you need?'
-                ]
-            },
-            'farewell': {
-                'patterns': ['bye', 'goodbye', 'see you', 'farewell', 'take care', 'gotta go', 'talk to you later'],
-                'responses': [
-                    'Goodbye! Have a great day!',
-                    'See you later! Take care!',
-                    'Bye! Thanks for chatting with me!',
-                    'Farewell! Come back soon!'
-                ]
-            },
-            'gratitude': {
-                'patterns': ['thank you', 'thanks', 'thank u', 'appreciate', 'thanks so much', 'thank you so much'],
-                'responses': [
-                    'You\'re welcome! Happy to help!',
-                    'My pleasure! Anything else?',
-                    'Glad I could help! Let me know if you need anything else.',
-                    'No problem! I\'m here to help.'
-                ]
-            },
-            'how_are_you': {
-                'patterns': ['how are you', 'how\'s it going', 'how do you do', 'how\'re you', 'what\'s up'],
-                'responses': [
-                    'I\'m doing great, thanks for asking! How about you?',
-                    'I\'m good! Ready to help you with anything!',
-                    'Doing well! What can I do for you?',
-                    'All systems operational and ready to chat!'
-                ]
-            },
-            'name': {
-                'patterns': ['what\'s your name', 'who are you', 'your name', 'what do i call you'],
-                'responses': [
-                    f'I\'m {self.name} (v{self.version}), your advanced problem-solving assistant!',
-                    f'You can call me {self.name}. I solve problems and teach programming!',
-                    f'I\'m {self.name}, here to help you with coding and learning!'
-                ]
-            },
-            'help': {
-                'patterns': ['help', 'what can you do', 'capabilities', 'features', 'assist'],
-                'responses': [
-                    f'{self.name} can solve programming problems, analyze code, provide learning resources, and much more!',
-                    f'I\'m {self.name}! I can help with debugging, performance optimization, code analysis, and learning Python.',
-                    f'As {self.name}, I can assist with general conversations, solve coding problems, and teach programming!'
-                ]
-            },
-            'joke': {
-                'patterns': ['tell me a joke', 'make me laugh', 'joke', 'funny'],
-                'responses': [
-                    'Why did the programmer quit his job? Because he didn\'t get arrays!',
-                    'Why do programmers prefer dark mode? Because light attracts bugs!',
-                    'How many programmers does it take to change a light bulb? None, that\'s a hardware problem!',
-                    'Why did Python go to the gym? To get more fit in the fit() function!'
-                ]
-            },
-            'time': {
-                'patterns': ['what time is it', 'current time', 'tell me the time', 'what\'s the time'],
-                'responses': [
-                    f'The current time is {datetime.now().strftime("%H:%M:%S")}',
-                    f'It\'s {datetime.now().strftime("%I:%M %p")} right now.',
-                    f'According to my clock, it\'s {datetime.now().strftime("%H:%M")}'
-                ]
-            },
-            'date': {
-                'patterns': ['what\'s the date', 'today\'s date', 'what date is it', 'today is'],
-                'responses': [
-                    f'Today is {datetime.now().strftime("%A, %B %d, %Y")}',
-                    f'The date is {datetime.now().strftime("%m/%d/%Y")}',
-                    f'It\'s {datetime.now().strftime("%A, %B %d")}'
-                ]
-            },
-            'default': {
-                'patterns': [],
-                'responses': [
-                    'That\'s interesting! Tell me more.',
-                    'I see. Could you elaborate?',
-                    'Interesting point! How does that relate to what you\'re working on?',
-                    'I understand. What else would you like to know?',
-                    'Got it! Is there anything else I can help you with?',
-                    'That\'s great! Do you have any other questions?'
-                ]
+            intent: {
+                'patterns': list(data['patterns']),
+                'responses': [self.templates.compile(template) for template in data['responses']]
             }
+            for intent, data in base['chat_responses'].items()
         }
     
-    def _get_intent(self, user_input):
-        user_input_lower = user_input.lower().strip()
-        
-        for intent, data in self.responses.items():
-            for pattern in data['patterns']:
-                if pattern.lower() in user_input_lower:
-                    return intent
-        
-        return 'default'
+    def _get_intent(self, user_input, tables: ChatTables = None):
+        return (tables or self._tables).intent_matcher.match(user_input)
+    
+    def _build_router(self):
+        router = Router()
+        router.register('problem', ['help with', 'error', 'issue', 'problem', 'fix', 'debug'],
+                        self._route_problem, priority=10, keywords=['exception'])
+        router.register('analyze', ['analyze', 'check code', 'review'],
+                        self._route_analyze, priority=20)
+        router.register('learning', ['learn', 'teach', 'resource', 'course', 'tutorial'],
+                        self._route_learning, priority=30, keywords=['learning path', 'path for', 'resources'])
+        router.register('example', ['example', 'show me'],
+                        self._route_example, priority=40)
+        router.register('about', ['about', 'version', 'features', 'capabilities'],
+                        self._route_about, priority=50)
+        router.register('tips', ['tips', 'advice'],
+                        self._route_tips, priority=60,
+                        keywords=['learning', 'debugging', 'performance', 'optimization'])
+        router.register('menu', ['menu', 'help'],
+                        self._route_menu, priority=70, keywords=['command'])
+        router.register('intent', [], self._route_intent, priority=1000)
+        return router
+    
+    def _route_problem(self, user_input, hits):
+        if 'error' in hits or 'exception' in hits:
+            return self.problem_solver.solve_problem(user_input)
+        return None
+    
+    def _route_analyze(self, user_input, hits):
+        return "I can analyze your code. Please share the code snippet and I'll provide detailed feedback."
+    
+    def _route_learning(self, user_input, hits):
+        if 'learning path' in hits or 'path for' in hits:
+            topic = user_input.replace('learning path for', '').replace('path for', '').strip()
+            return self.learning_resources.get_learning_path(topic)
+        elif 'resources' in hits:
+            return self.learning_resources.list_all_resources()
+        else:
+            topic = user_input.replace('learn about', '').replace('teach me', '').strip()
+            return self.learning_resources.get_resource(topic)
+    
+    def _route_example(self, user_input, hits):
+        topic = user_input.replace('example of', '').replace('show me', '').strip()
+        return self.problem_solver.get_code_example(topic)
+    
+    def _route_about(self, user_input, hits):
+        if 'version' in hits:
+            return f"I'm {self.name} version {self.version}, created to help with programming problems and learning!"
+        elif 'features' in hits:
+            info = self.utils.get_chatbot_info()
+            features = '\n• '.join(info['features'])
+            return f"**{self.name} Features:**\n• {features}"
+        else:
+            return f"I'm {self.name} - an advanced chatbot designed to solve programming problems, analyze code, and provide learning resources."
+    
+    def _route_tips(self, user_input, hits):
+        if 'learning' in hits:
+            return self._domain_tips('learning')
+        elif 'debugging' in hits:
+            return self._domain_tips('debugging')
+        elif 'performance' in hits or 'optimization' in hits:
+            return self._domain_tips('performance')
+        return None
+    
+    def _domain_tips(self, domain):
+        if domain == 'debugging':
+            return self._iter_tips('Debugging Tips', self.problem_solver.solutions['debugging']['tips'])
+        elif domain == 'performance':
+            return self._iter_tips('Performance Optimization Tips', self.problem_solver.solutions['performance']['tips'])
+        return self.learning_resources.get_tips_for_learning()
+    
+    def _iter_tips(self, title, tips):
+        yield f"**{title}:**\n"
+        for i, tip in enumerate(tips):
+            yield f"\n• {tip}" if i else f"• {tip}"
+    
+    def _route_menu(self, user_input, hits):
+        if 'menu' in hits or 'command' in hits:
+            return self.utils.get_help_menu()
+        return None
+    
+    def _route_intent(self, user_input, hits):
+        tables = self._tables
+        intent = self._get_intent(user_input, tables)
+        if intent == 'default':
+            answer = self._answer_from_knowledge(user_input, tables)
+            if answer is not None:
+                return answer
+        responses = tables.responses[intent]['responses']
+        return self.templates.render(random.choice(responses))
+    
+    def _answer_from_knowledge(self, user_input, tables: ChatTables):
+        """Answer a question no keyword caught with the best knowledge base entry"""
+        if tables.retrieval is None:
+            return None
+        document = tables.retrieval.best(user_input)
+        if document is None:
+            return None
+        if document.kind == 'solution':
+            return self.problem_solver.solve_problem(document.key, document.domain)
+        elif document.kind == 'tip':
+            return self._domain_tips(document.domain)
+        elif document.kind == 'example':
+            return self.problem_solver.get_code_example(document.key)
+        elif document.kind == 'resource':
+            return self.learning_resources.get_resource(document.key)
+        return self.learning_resources.get_learning_path(document.key)
     
     def get_response(self, user_input):
+        return ''.join(self.stream_response(user_input))
+    
+    def stream_response(self, user_input):
+        """Yield the response in chunks as it is produced"""
         if not user_input or not isinstance(user_input, str):
-            return "I didn't catch that. Could you please rephrase?"
-        
-        self.conversation_count += 1
-        user_input_lower = user_input.lower()
-        
-        if any(word in user_input_lower for word in ['help with', 'error', 'issue', 'problem', 'fix', 'debug']):
-            if 'error' in user_input_lower or 'exception' in user_input_lower:
-                return self.problem_solver.solve_problem(user_input)
-        
-        if 'analyze' in user_input_lower or 'check code' in user_input_lower or 'review' in user_input_lower:
-            return "I can analyze your code. Please share the code snippet and I'll provide detailed feedback."
-        
-        if any(word in user_input_lower for word in ['learn', 'teach', 'resource', 'course', 'tutorial']):
-            if 'learning path' in user_input_lower or 'path for' in user_input_lower:
-                topic = user_input.replace('learning path for', '').replace('path for', '').strip()
-                return self.learning_resources.get_learning_path(topic)
-            elif 'resources' in user_input_lower:
-                return self.learning_resources.list_all_resources()
-            else:
-                topic = user_input.replace('learn about', '').replace('teach me', '').strip()
-                return self.learning_resources.get_resource(topic)
-        
-        if 'example' in user_input_lower or 'show me' in user_input_lower:
-            topic = user_input.replace('example of', '').replace('show me', '').strip()
-            return self.problem_solver.get_code_example(topic)
-        
-        if any(word in user_input_lower for word in ['about', 'version', 'features', 'capabilities']):
-            if 'version' in user_input_lower:
-                return f"I'm {self.name} version {self.version}, created to help with programming problems and learning!"
-            elif 'features' in user_input_lower:
-                info = self.utils.get_chatbot_info()
-                features = ', '.join(info['features'])
-                return f"**{self.name} Features:**\n• {features.replace(', ', '\n• ')}"
-            else:
-                return f"I'm {self.name} - an advanced chatbot designed to solve programming problems, analyze code, and provide learning resources."
-        
-        if 'tips' in user_input_lower or 'advice' in user_input_lower:
-            if 'learning' in user_input_lower:
-                return self.learning_resources.get_tips_for_learning()
-            elif 'debugging' in user_input_lower:
-                solutions = self.problem_solver.solutions['debugging']
-                tips = '\n'.join([f"• {tip}" for tip in solutions['tips']])
-                return f"**Debugging Tips:**\n{tips}"
-            elif 'performance' in user_input_lower or 'optimization' in user_input_lower:
-                solutions = self.problem_solver.solutions['performance']
-                tips = '\n'.join([f"• {tip}" for tip in solutions['tips']])
-                return f"**Performance Optimization Tips:**\n{tips}"
-        
-        if 'menu' in user_input_lower or ('help' in user_input_lower and 'command' in user_input_lower):
-            return self.utils.get_help_menu()
-        
-        intent = self._get_intent(user_input)
-        responses = self.responses[intent]['responses']
+            yield "I didn't catch that. Could you please rephrase?"
+            return
         
-        return random.choice(responses)
+        self.conversations.inc()
+        yield from self.utils.iter_chunks(self.router.dispatch(user_input))
 
 
 if __name__ == '__main__':
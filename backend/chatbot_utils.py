@@ -1,6 +1,7 @@
 import time
-from typing import Dict, List
-from datetime import datetime
+from typing import Dict, Iterator
+import knowledge
+from response_templates import TemplateEngine
 
 class ChatbotUtils:
     
@@ -8,6 +9,26 @@ class ChatbotUtils:
     VERSION = "2.0"
     CREATED_DATE = "December 9, 2024"
     
+    TEMPLATES = TemplateEngine({'name': CHATBOT_NAME, 'version': VERSION, 'created': CREATED_DATE})
+    HELP_MENU = TEMPLATES.compile("""
+**{name} - Help Menu**
+
+Commands and Topics:
+1️⃣ Problem Solving: "Help with [Python/Debugging/Performance/Web/Database]"
+2️⃣ Code Analysis: "Analyze code [provide code snippet]"
+3️⃣ Learning: "Learn about [topic]" or "Learning path for [goal]"
+4️⃣ Examples: "Show me example of [concept]"
+5️⃣ Tips: "Give me [learning/debugging/performance] tips"
+6️⃣ Info: "About", "Version", "Features"
+
+Example Questions:
+• "Help with AttributeError"
+• "Optimize my code"
+• "Learning resources for web development"
+• "Show me list comprehension example"
+• "Debugging tips"
+""".strip())
+    
     @staticmethod
     def format_response(content: str, response_type: str = 'normal') -> str:
         if response_type == 'success':
@@ -27,51 +48,21 @@ class ChatbotUtils:
             'name': ChatbotUtils.CHATBOT_NAME,
             'version': ChatbotUtils.VERSION,
             'created': ChatbotUtils.CREATED_DATE,
-            'features': [
-                'Real-time problem solving',
-                'Code analysis',
-                'Learning resources',
-                'Error detection',
-                'Performance suggestions'
-            ]
+            'features': list(knowledge.TABLES.chatbot_features)
         }
     
     @staticmethod
     def format_error_message(error: str) -> str:
-        explanations = {
-            'syntax': 'This is a syntax error - check your code structure',
-            'runtime': 'This error occurred while running your code',
-            'logical': 'Your code runs but produces wrong results',
-            'performance': 'Your code is too slow or uses too much memory'
-        }
-        
-        for error_type, explanation in explanations.items():
-            if error_type.lower() in error.lower():
+        error_lower = error.lower()
+        for error_type, explanation in knowledge.TABLES.error_explanations.items():
+            if error_type in error_lower:
                 return f"**{error}**\n{explanation}"
         
         return f"**{error}**"
     
     @staticmethod
     def get_help_menu() -> str:
-        menu = f"""
-**{ChatbotUtils.CHATBOT_NAME} - Help Menu**
-
-Commands and Topics:
-1️⃣ Problem Solving: "Help with [Python/Debugging/Performance/Web/Database]"
-2️⃣ Code Analysis: "Analyze code [provide code snippet]"
-3️⃣ Learning: "Learn about [topic]" or "Learning path for [goal]"
-4️⃣ Examples: "Show me example of [concept]"
-5️⃣ Tips: "Give me [learning/debugging/performance] tips"
-6️⃣ Info: "About", "Version", "Features"
-
-Example Questions:
-• "Help with AttributeError"
-• "Optimize my code"
-• "Learning resources for web development"
-• "Show me list comprehension example"
-• "Debugging tips"
-        """
-        return menu.strip()
+        return ChatbotUtils.TEMPLATES.render(ChatbotUtils.HELP_MENU)
     
     @staticmethod
     def get_chatbot_stats() -> Dict:
@@ -93,16 +84,7 @@ Example Questions:
         """Validate and categorize user input"""
         input_lower = user_input.lower().strip()
         
-        categories = {
-            'problem_solving': ['help', 'error', 'issue', 'solve', 'problem'],
-            'code_analysis': ['analyze', 'check', 'review', 'code'],
-            'learning': ['learn', 'teach', 'resource', 'course', 'tutorial'],
-            'example': ['example', 'show', 'demonstrate', 'sample'],
-            'tips': ['tip', 'advice', 'guide', 'best practice'],
-            'info': ['about', 'version', 'features', 'info']
-        }
-        
-        for category, keywords in categories.items():
+        for category, keywords in knowledge.TABLES.input_categories.items():
             for keyword in keywords:
                 if keyword in input_lower:
                     return True, category, user_input
@@ -110,9 +92,16 @@ Example Questions:
         return False, None, user_input
     
     @staticmethod
-    def get_response_time() -> float:
-        """Get response time"""
-        return time.time()
+    def get_response_time(start: float) -> float:
+        """Milliseconds elapsed since `start`, a time.perf_counter() reading"""
+        return round((time.perf_counter() - start) * 1e3, 3)
+    
+    @staticmethod
+    def iter_chunks(response) -> Iterator[str]:
+        """Split a rendered response into line chunks for streaming"""
+        if isinstance(response, str):
+            return iter(response.splitlines(keepends=True))
+        return iter(response)
     
     @staticmethod
     def format_code_block(code: str, language: str = 'python') -> str:
@@ -122,13 +111,4 @@ Example Questions:
     @staticmethod
     def get_emoji_for_domain(domain: str) -> str:
         """Get emoji for different domains"""
-        emojis = {
-            'python': '🐍',
-            'debugging': '🐛',
-            'performance': '⚡',
-            'web': '🌐',
-            'database': '💾',
-            'security': '🔒',
-            'learning': '📚'
-        }
-        return emojis.get(domain.lower(), '💡')
+        return knowledge.TABLES.domain_emojis.get(domain.lower(), '💡')
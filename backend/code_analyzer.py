@@ -1,138 +1,186 @@
-import re
-from typing import Dict, List, Tuple
+import functools
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from analysis_cache import AnalysisCache, content_key, normalize_code
+from analysis_engine import AnalysisContext, AnalysisEngine, count_issues, empty_issues
+from analysis_guard import AnalysisGuard, AnalysisTimeout
+from analysis_rules import RULES
+from incremental_analysis import IncrementalAnalyzer
+from metrics import Counter, timed
+
+PARTIAL_NOTE = "⚠️ Analysis stopped early because it exceeded its time budget; results are partial.\n\n"
+
+
+class _PartialReview(Exception):
+    """Carries a partial review past the cache so it is not stored"""
+
+    def __init__(self, result: Dict):
+        self.result = result
+
 
 class CodeAnalyzer:
     
-    def __init__(self):
+    def __init__(self, disabled_rules: Iterable[str] = (), cache: Optional[AnalysisCache] = None,
+                 max_documents: int = 1000, guard: Optional[AnalysisGuard] = None):
         self.chatbot_name = "Alok Pradhan Chatbot"
-        self.issues_found = 0
+        self.issues = Counter('code_issues_found_total', 'Issues reported by code analysis')
+        self.engine = AnalysisEngine(RULES, disabled=disabled_rules)
+        self.cache = cache
+        self.guard = guard
+        self.documents = IncrementalAnalyzer(self.engine, max_documents=max_documents,
+                                             check_text=guard.check_size if guard else None)
     
-    def analyze_code(self, code: str) -> Dict:
-        issues = {
-            'syntax_errors': [],
-            'style_issues': [],
-            'performance_issues': [],
-            'security_issues': []
-        }
-        
-        issues['syntax_errors'] = self._check_syntax(code)
-        issues['style_issues'] = self._check_style(code)
-        issues['performance_issues'] = self._check_performance(code)
-        issues['security_issues'] = self._check_security(code)
-        
-        self.issues_found += len([i for issue_list in issues.values() for i in issue_list])
-        
-        return issues
+    @property
+    def issues_found(self) -> int:
+        return int(self.issues.value())
     
-    def _check_syntax(self, code: str) -> List[str]:
-        issues = []
-        
-        if re.search(r'(if|for|while|def|class)\s+.*[^:]$', code, re.MULTILINE):
-            issues.append("Missing colon ':' after control statement")
-        
-        # Check for unmatched parentheses
-        if code.count('(') != code.count(')'):
-            issues.append("Unmatched parentheses")
-        
-        if code.count('[') != code.count(']'):
-            issues.append("Unmatched brackets")
-        
-        return issues
+    def _run(self, code: str) -> AnalysisContext:
+        """Run the engine, under the guard's size and time limits when one is set"""
+        if self.guard is None:
+            return self.engine.run(code)
+        
+        self.guard.check_size(code)
+        try:
+            result = self.guard.run(self.engine, AnalysisEngine.run, code)
+        except AnalysisTimeout:
+            # The worker was stopped with whatever it had found
+            result = AnalysisContext(len(self.engine.rules))
+            result.partial = True
+        
+        if result.partial:
+            self.guard.record_partial()
+        return result
     
-    def _check_style(self, code: str) -> List[str]:
-        issues = []
-        
-        if re.search(r'[a-z]\w*[A-Z]', code):
-            issues.append("Use snake_case for variable names (e.g., my_var not myVar)")
-        
-        # Check for multiple statements on one line
-        if code.count(';') > 0:
-            issues.append("Avoid multiple statements on one line (semicolons)")
-        
-        lines = code.split('\n')
-        for i, line in enumerate(lines):
-            if len(line) > 79:
-                issues.append(f"Line {i+1} is too long ({len(line)} > 79 characters)")
-        
-        return issues
+    @timed('code_analysis')
+    def review(self, code: str) -> Dict:
+        """Issues, report and suggestions, memoized by content hash when a cache is set.
+
+        Raises InputTooLarge when a guard is set and the code exceeds its
+        size limit. A review cut short by the time budget has `partial` set
+        and is never cached.
+        """
+        code = normalize_code(code)
+        if self.cache is None:
+            return self._review(code)
+        try:
+            return self.cache.get_or_compute(content_key(code, self.engine.version),
+                                             lambda: self._review(code, raise_partial=True))
+        except _PartialReview as e:
+            return e.result
     
-    def _check_performance(self, code: str) -> List[str]:
-        issues = []
-        
-        if code.count('for') > 1 and 'for' in code:
-            issues.append("Consider if nested loops can be optimized")
-        
-        # Check for repeated string concatenation
-        if code.count('+') > 3 and '"' in code:
-            issues.append("Use str.join() instead of repeated '+' concatenation")
-        
-        if 'list(' in code:
-            issues.append("Consider if list() conversion is necessary")
-        
-        return issues
+    @timed('code_analysis')
+    def review_document(self, document_id: str, code: Optional[str] = None, diff: Optional[str] = None) -> Dict:
+        """Review a document kept across submissions, re-analyzing only changed blocks.
+
+        Pass the full `code`, or a unified `diff` against the previous
+        submission. Raises KeyError for a diff to an unknown document and
+        ValueError for a diff that does not apply.
+        """
+        if code is not None:
+            code = normalize_code(code)
+        
+        if self.guard is None:
+            result = self.documents.update(document_id, code, diff)
+        else:
+            self.guard.check_size(code if code is not None else diff or '')
+            try:
+                result = self.documents.update(document_id, code, diff, run=functools.partial(self.guard.run, self.engine))
+            except AnalysisTimeout:
+                # Forget the document so the next submission starts from full text
+                self.documents.forget(document_id)
+                result = {'issues': empty_issues(), 'suggestions': [], 'blocks': {'total': 0, 'reanalyzed': 0},
+                          'new_findings': 0, 'partial': True}
+            if result['partial']:
+                self.guard.record_partial()
+        
+        self.issues.inc(result['new_findings'])
+        
+        review = {
+            'issues': result['issues'],
+            'report': self.format_report(result['issues'], result['partial']),
+            'suggestions': result['suggestions'],
+            'blocks': result['blocks']
+        }
+        if result['partial']:
+            review['partial'] = True
+        return review
     
-    def _check_security(self, code: str) -> List[str]:
-        issues = []
+    def _review(self, code: str, raise_partial: bool = False) -> Dict:
+        result = self._run(code)
         
-        if 'eval(' in code:
-            issues.append("SECURITY: Avoid eval() - it's dangerous!")
+        self.issues.inc(len(result.findings))
         
-        # Check for exec usage
-        if 'exec(' in code:
-            issues.append("SECURITY: Avoid exec() - it's dangerous!")
+        review = {
+            'issues': result.issues,
+            'report': self.format_report(result.issues, result.partial),
+            'suggestions': result.suggestions
+        }
+        if result.partial:
+            review['partial'] = True
+            if raise_partial:
+                raise _PartialReview(review)
+        return review
+    
+    @timed('code_analysis')
+    def analyze(self, code: str) -> Tuple[Dict, List[str]]:
+        """Issues and suggestions from a single pass over the code"""
+        result = self._run(code)
         
-        if 'query' in code and '+' in code:
-            issues.append("SECURITY: Check for SQL injection vulnerabilities")
+        self.issues.inc(len(result.findings))
         
-        return issues
+        return result.issues, result.suggestions
+    
+    def analyze_code(self, code: str) -> Dict:
+        return self.analyze(code)[0]
     
     def get_suggestions(self, code: str) -> List[str]:
-        suggestions = []
-        
-        if 'def ' in code and '"""' not in code:
-            suggestions.append("Add docstrings to functions")
-        
-        # Check for type hints
-        if 'def ' in code and '->' not in code:
-            suggestions.append("Add type hints to function signatures")
-        
-        if 'open(' in code and 'try:' not in code:
-            suggestions.append("Add try-except block for file operations")
-        
-        return suggestions
+        return self._run(code).suggestions
     
-    def format_report(self, issues: Dict) -> str:
-        report = f"**{self.chatbot_name} - Code Analysis Report**\n\n"
-        
-        total_issues = sum(len(v) for v in issues.values() if isinstance(v, list))
-        
-        if total_issues == 0:
-            report += "✅ No issues found! Your code looks good.\n"
-            return report
-        
-        if issues['syntax_errors']:
-            report += "🔴 **Syntax Errors:**\n"
-            for error in issues['syntax_errors']:
-                report += f"  • {error}\n"
-            report += "\n"
-        
-        if issues['style_issues']:
-            report += "🟡 **Style Issues:**\n"
-            for issue in issues['style_issues']:
-                report += f"  • {issue}\n"
-            report += "\n"
+    def set_rule_enabled(self, name: str, enabled: bool):
+        self.engine.set_enabled(name, enabled)
+    
+    def stats(self) -> Dict:
+        stats = self.engine.stats()
+        if self.cache is not None:
+            stats['cache'] = self.cache.stats()
+        stats['documents'] = self.documents.stats()
+        if self.guard is not None:
+            stats['guard'] = self.guard.stats()
+        return stats
+    
+    def iter_report(self, issues: Dict, partial: bool = False) -> Iterator[str]:
+        """Yield the analysis report section by section"""
+        yield f"**{self.chatbot_name} - Code Analysis Report**\n\n"
         
-        if issues['performance_issues']:
-            report += "🟠 **Performance Issues:**\n"
-            for issue in issues['performance_issues']:
-                report += f"  • {issue}\n"
-            report += "\n"
+        counts = count_issues(issues)
+        suppressed = issues.get('suppressed', {})
+        total_issues = sum(counts.values())
         
-        if issues['security_issues']:
-            report += "🔴 **Security Issues:**\n"
-            for issue in issues['security_issues']:
-                report += f"  • {issue}\n"
-            report += "\n"
+        if partial:
+            yield PARTIAL_NOTE
         
-        report += f"**Total Issues: {total_issues}**\n"
-        return report
+        if total_issues == 0:
+            if not partial:
+                yield "✅ No issues found! Your code looks good.\n"
+            return
+        
+        sections = [
+            ('syntax_errors', "🔴 **Syntax Errors:**\n"),
+            ('style_issues', "🟡 **Style Issues:**\n"),
+            ('performance_issues', "🟠 **Performance Issues:**\n"),
+            ('security_issues', "🔴 **Security Issues:**\n")
+        ]
+        
+        for key, heading in sections:
+            if counts[key]:
+                yield heading
+                for issue in issues[key]:
+                    yield f"  • {issue}\n"
+                if suppressed.get(key):
+                    yield f"  • ... {suppressed[key]} more suppressed\n"
+                yield "\n"
+        
+        yield f"**Total Issues: {total_issues}**\n"
+    
+    @timed('formatting')
+    def format_report(self, issues: Dict, partial: bool = False) -> str:
+        return ''.join(self.iter_report(issues, partial))
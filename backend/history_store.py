@@ -0,0 +1,333 @@
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import closing
+from itertools import islice
+from typing import Dict, List, Optional
+
+
+class HistoryStore:
+    """Conversation history capped by entry count and approximate memory use.
+
+    Entries live in a deque used as a ring buffer; the oldest entries are
+    evicted once either cap is exceeded.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = deque()
+        self._bytes = 0
+        self._evicted = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entry_size(entry: Dict) -> int:
+        return sys.getsizeof(entry) + sum(sys.getsizeof(v) for v in entry.values())
+
+    def append(self, entry: Dict) -> int:
+        """Add an entry and return the net change in stored bytes"""
+        size = self._entry_size(entry)
+
+        with self._lock:
+            before = self._bytes
+            self._entries.append((entry, size))
+            self._bytes += size
+
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted_size = self._entries.popleft()
+                self._bytes -= evicted_size
+                self._evicted += 1
+
+            return self._bytes - before
+
+    def recent(self, limit: int, before_id: Optional[int] = None) -> List[Dict]:
+        """Return the last `limit` entries, oldest first.
+
+        With `before_id`, only entries whose 'id' is lower are returned, so
+        callers can page backwards through the history.
+        """
+        if limit <= 0:
+            return []
+
+        with self._lock:
+            entries = (entry for entry, _ in reversed(self._entries))
+            if before_id is not None:
+                entries = (entry for entry in entries if entry.get('id', 0) < before_id)
+            newest = list(islice(entries, limit))
+
+        newest.reverse()
+        return newest
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'evicted': self._evicted
+            }
+
+
+class SessionHistoryStore:
+    """Per-session conversation histories with LRU and idle-TTL eviction.
+
+    Sessions are kept in an OrderedDict in least-recently-used order, so
+    lookups are O(1) and idle or excess sessions are always at the front.
+    """
+
+    def __init__(self, max_sessions: int = 100000, max_bytes: int = 256 * 1024 * 1024,
+                 idle_ttl: float = 3600, max_entries_per_session: int = 100,
+                 max_bytes_per_session: int = 64 * 1024):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.max_entries_per_session = max_entries_per_session
+        self.max_bytes_per_session = max_bytes_per_session
+        self._sessions = OrderedDict()
+        self._bytes = 0
+        self._evicted_sessions = 0
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float):
+        # Caller holds the lock
+        while self._sessions:
+            session_id, (store, last_seen) = next(iter(self._sessions.items()))
+            over_limit = len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes
+            if not over_limit and now - last_seen <= self.idle_ttl:
+                break
+            del self._sessions[session_id]
+            self._bytes -= store.bytes
+            self._evicted_sessions += 1
+
+    def _touch(self, session_id: str, now: float, create: bool = False):
+        # Caller holds the lock
+        item = self._sessions.get(session_id)
+        if item is None:
+            if not create:
+                return None
+            store = HistoryStore(self.max_entries_per_session, self.max_bytes_per_session)
+        else:
+            store = item[0]
+        self._sessions[session_id] = (store, now)
+        self._sessions.move_to_end(session_id)
+        return store
+
+    def append(self, session_id: str, entry: Dict):
+        now = time.monotonic()
+
+        with self._lock:
+            entry = dict(entry, id=self._next_id)
+            self._next_id += 1
+            store = self._touch(session_id, now, create=True)
+            self._bytes += store.append(entry)
+            self._evict(now)
+
+    def recent(self, session_id: str, limit: int, before_id: Optional[int] = None) -> List[Dict]:
+        now = time.monotonic()
+
+        with self._lock:
+            self._evict(now)
+            store = self._touch(session_id, now)
+
+        return store.recent(limit, before_id) if store else []
+
+    def count(self, session_id: str) -> int:
+        with self._lock:
+            item = self._sessions.get(session_id)
+        return len(item[0]) if item else 0
+
+    def clear(self, session_id: str):
+        with self._lock:
+            item = self._sessions.pop(session_id, None)
+            if item:
+                self._bytes -= item[0].bytes
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._evict(time.monotonic())
+            return {
+                'backend': 'memory',
+                'sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'idle_ttl': self.idle_ttl,
+                'evicted_sessions': self._evicted_sessions
+            }
+
+
+class SQLiteHistoryStore:
+    """Persistent per-session history in SQLite with write-behind batching.
+
+    append() only enqueues; a background thread writes queued entries in
+    batched transactions, so request threads never wait on disk. Reads use
+    per-thread connections against a WAL database, so they run concurrently
+    with the writer and with other worker processes. Entries become visible
+    to readers once their batch is committed (within `flush_interval`).
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            user TEXT NOT NULL,
+            bot TEXT NOT NULL,
+            timestamp TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_history_session ON history (session_id, id);
+    """
+
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 0.05,
+                 max_pending: int = 10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._local = threading.local()
+        self._written = 0
+        self._batches = 0
+        self._dropped = 0
+        self._errors = 0
+
+        with closing(self._connect()) as conn:
+            conn.executescript(self._SCHEMA)
+
+        self._writer = threading.Thread(target=self._write_loop, name='history-writer', daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _write_loop(self):
+        conn = self._connect()
+
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            try:
+                self._write_batch(conn, batch)
+            except sqlite3.Error:
+                self._errors += 1
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+            if any(op == 'close' for op, _ in batch):
+                conn.close()
+                return
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List):
+        rows = []
+        with conn:
+            for op, payload in batch:
+                if op == 'append':
+                    rows.append(payload)
+                    continue
+                # Keep ordering between inserts and clears for the same session
+                if rows:
+                    conn.executemany(
+                        'INSERT INTO history (session_id, user, bot, timestamp) VALUES (?, ?, ?, ?)', rows)
+                    self._written += len(rows)
+                    rows = []
+                if op == 'clear':
+                    conn.execute('DELETE FROM history WHERE session_id = ?', (payload,))
+            if rows:
+                conn.executemany(
+                    'INSERT INTO history (session_id, user, bot, timestamp) VALUES (?, ?, ?, ?)', rows)
+                self._written += len(rows)
+        self._batches += 1
+
+    def _enqueue(self, op: str, payload) -> bool:
+        try:
+            self._queue.put_nowait((op, payload))
+            return True
+        except queue.Full:
+            self._dropped += 1
+            return False
+
+    def append(self, session_id: str, entry: Dict):
+        self._enqueue('append', (session_id, entry['user'], entry['bot'], entry['timestamp']))
+
+    def recent(self, session_id: str, limit: int, before_id: Optional[int] = None) -> List[Dict]:
+        if limit <= 0:
+            return []
+
+        if before_id is None:
+            rows = self._reader().execute(
+                'SELECT id, user, bot, timestamp FROM history WHERE session_id = ? '
+                'ORDER BY id DESC LIMIT ?', (session_id, limit)).fetchall()
+        else:
+            rows = self._reader().execute(
+                'SELECT id, user, bot, timestamp FROM history WHERE session_id = ? AND id < ? '
+                'ORDER BY id DESC LIMIT ?', (session_id, before_id, limit)).fetchall()
+
+        return [{'id': row[0], 'user': row[1], 'bot': row[2], 'timestamp': row[3]} for row in reversed(rows)]
+
+    def count(self, session_id: str) -> int:
+        return self._reader().execute(
+            'SELECT COUNT(*) FROM history WHERE session_id = ?', (session_id,)).fetchone()[0]
+
+    def clear(self, session_id: str):
+        # Clears must not be dropped, so wait for queue space if needed
+        self._queue.put(('clear', session_id))
+
+    def flush(self):
+        """Block until every queued write is committed"""
+        self._queue.join()
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(('close', None))
+            self._writer.join()
+
+    def stats(self) -> Dict:
+        return {
+            'backend': 'sqlite',
+            'path': self.path,
+            'bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            'pending': self._queue.qsize(),
+            'written': self._written,
+            'batches': self._batches,
+            'dropped': self._dropped,
+            'errors': self._errors
+        }
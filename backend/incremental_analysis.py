@@ -0,0 +1,249 @@
+import ast
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from analysis_engine import AnalysisEngine, Budget, Finding, format_issues
+
+HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+
+def apply_diff(text: str, diff: str) -> str:
+    """Apply a unified diff (as produced by `diff -u` or difflib) to `text`.
+
+    Raises ValueError if the diff is malformed or its context does not
+    match, which usually means client and server disagree on the text.
+    """
+    source = text.split('\n')
+    result: List[str] = []
+    position = 0
+    lines = diff.split('\n')
+    i = 0
+
+    while i < len(lines):
+        match = HUNK_HEADER.match(lines[i])
+        i += 1
+        if not match:
+            continue
+
+        old_start = int(match.group(1))
+        # A zero-length hunk's start is the line before the insertion point
+        start = old_start if match.group(2) != '0' else old_start + 1
+        if start - 1 < position:
+            raise ValueError('Diff hunks overlap or are out of order')
+        result.extend(source[position:start - 1])
+        position = start - 1
+
+        while i < len(lines) and not lines[i].startswith('@@'):
+            line = lines[i]
+            i += 1
+            if line.startswith('\\'):
+                continue
+            marker, content = line[:1], line[1:]
+            if marker in (' ', '-'):
+                if position >= len(source) or source[position] != content:
+                    raise ValueError(f"Diff does not apply at line {position + 1}")
+                position += 1
+                if marker == ' ':
+                    result.append(content)
+            elif marker == '+':
+                result.append(content)
+            elif line == '':
+                # Trailing newline of the diff itself
+                continue
+            else:
+                raise ValueError(f"Malformed diff line: {line!r}")
+
+    result.extend(source[position:])
+    return '\n'.join(result)
+
+
+def split_blocks(code: str, tree: ast.Module) -> List[Tuple[int, str]]:
+    """Split code into (first line, text) blocks, one per top-level statement.
+
+    Comments and blank lines belong to the statement above them; anything
+    before the first statement belongs to the first block.
+    """
+    lines = code.split('\n')
+    starts = []
+    for node in tree.body:
+        decorators = getattr(node, 'decorator_list', ())
+        starts.append(min([node.lineno] + [d.lineno for d in decorators]))
+
+    if not starts:
+        return [(1, code)]
+
+    starts[0] = 1
+    ends = starts[1:] + [len(lines) + 1]
+    return [(start, '\n'.join(lines[start - 1:end - 1])) for start, end in zip(starts, ends)]
+
+
+def analyze_blocks(engine: AnalysisEngine, code: str, known: FrozenSet[str],
+                   budget: Optional[Budget] = None) -> Dict:
+    """Split code into top-level blocks and analyze those whose hash is not in `known`.
+
+    Returns the (first line, hash) of every block, or None when the code
+    does not parse and was analyzed as a whole under the key None; the
+    (findings, suggestions) of each analyzed block; and, when the budget
+    ran out, the hash of the block it ran out in, after which no more
+    blocks were analyzed. Takes and returns plain data so it can run in a
+    worker process.
+    """
+    results: Dict[Optional[str], Tuple[List[Finding], List[str]]] = {}
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, RecursionError, MemoryError):
+        result = engine.run(code, budget)
+        results[None] = (result.findings, result.suggestions)
+        return {'blocks': None, 'results': results, 'partial': result.partial, 'incomplete': None}
+
+    blocks = []
+    incomplete = None
+    for start, text in split_blocks(code, tree):
+        key = hashlib.sha1(text.encode('utf-8', 'surrogatepass')).hexdigest()
+        blocks.append((start, key))
+        if key in known or key in results or incomplete is not None:
+            continue
+        result = engine.run(text, budget)
+        results[key] = (result.findings, result.suggestions)
+        if result.partial:
+            incomplete = key
+    return {'blocks': blocks, 'results': results, 'partial': incomplete is not None, 'incomplete': incomplete}
+
+
+class Document:
+
+    __slots__ = ('text', 'ruleset_version', 'blocks')
+
+    def __init__(self, text: str, ruleset_version: str, blocks: Dict):
+        self.text = text
+        self.ruleset_version = ruleset_version
+        # block hash -> (findings relative to the block, suggestions)
+        self.blocks = blocks
+
+
+class IncrementalAnalyzer:
+    """Re-analyzes only the top-level blocks that changed since a
+    document's last submission.
+
+    Results are kept per block hash with line numbers relative to the
+    block, so a block that merely moved is reused as-is. Documents are
+    evicted least recently used first.
+    """
+
+    def __init__(self, engine: AnalysisEngine, max_documents: int = 1000,
+                 check_text: Optional[Callable[[str], None]] = None):
+        self.engine = engine
+        self.max_documents = max_documents
+        # Called with the full text after a diff is applied; may raise
+        self.check_text = check_text
+        self._documents: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.blocks_analyzed = 0
+        self.blocks_reused = 0
+
+    def update(self, document_id: str, code: Optional[str] = None, diff: Optional[str] = None,
+               run: Optional[Callable] = None) -> Dict:
+        """Analyze a document from its new text or a diff against the last one.
+
+        Returns the merged issues and suggestions, the block counts and the
+        number of findings in the blocks that were actually re-analyzed. If
+        the analysis runs out of budget, the remaining blocks are skipped
+        and the result is marked partial. `run`, when given, is called as
+        run(analyze_blocks, code, known) to analyze the blocks elsewhere,
+        such as in an AnalysisGuard worker.
+        """
+        with self._lock:
+            previous = self._documents.get(document_id)
+
+        version = self.engine.version
+        if code is None:
+            if previous is None:
+                raise KeyError(document_id)
+            code = apply_diff(previous.text, diff or '')
+            if self.check_text is not None:
+                self.check_text(code)
+
+        known = previous.blocks if previous and previous.ruleset_version == version else {}
+        if run is None:
+            analysis = analyze_blocks(self.engine, code, frozenset(known))
+        else:
+            analysis = run(analyze_blocks, code, frozenset(known))
+
+        results = analysis['results']
+        if analysis['blocks'] is None:
+            # Block boundaries are unknown until the code parses again
+            block_findings, suggestions = results[None]
+            self._store(document_id, Document(code, version, {}))
+            return {
+                'issues': format_issues(block_findings),
+                'suggestions': suggestions,
+                'blocks': {'total': 1, 'reanalyzed': 1},
+                'new_findings': len(block_findings),
+                'partial': analysis['partial']
+            }
+
+        blocks = {}
+        findings: List[Finding] = []
+        suggestions: List[str] = []
+        analyzed = set()
+        reused = 0
+
+        for start, key in analysis['blocks']:
+            if key in results and key not in analyzed:
+                analyzed.add(key)
+                cached = results[key]
+                # Incomplete results are shown but not kept for reuse
+                if key != analysis['incomplete']:
+                    blocks[key] = cached
+            else:
+                cached = blocks.get(key) or known.get(key)
+                if cached is None:
+                    # Skipped after the budget ran out
+                    continue
+                blocks[key] = cached
+                reused += 1
+
+            block_findings, block_suggestions = cached
+            offset = start - 1
+            findings.extend((category, line + offset, col, message)
+                            for category, line, col, message in block_findings)
+            for suggestion in block_suggestions:
+                if suggestion not in suggestions:
+                    suggestions.append(suggestion)
+
+        self._store(document_id, Document(code, version, blocks))
+
+        with self._lock:
+            self.blocks_analyzed += len(results)
+            self.blocks_reused += reused
+
+        return {
+            'issues': format_issues(findings),
+            'suggestions': suggestions,
+            'blocks': {'total': len(analysis['blocks']), 'reanalyzed': len(results)},
+            'new_findings': sum(len(block_findings) for block_findings, _ in results.values()),
+            'partial': analysis['partial']
+        }
+
+    def _store(self, document_id: str, document: Document):
+        with self._lock:
+            self._documents[document_id] = document
+            self._documents.move_to_end(document_id)
+            while len(self._documents) > self.max_documents:
+                self._documents.popitem(last=False)
+
+    def forget(self, document_id: str):
+        with self._lock:
+            self._documents.pop(document_id, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'documents': len(self._documents),
+                'max_documents': self.max_documents,
+                'blocks_analyzed': self.blocks_analyzed,
+                'blocks_reused': self.blocks_reused
+            }
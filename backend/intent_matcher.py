@@ -0,0 +1,120 @@
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton that finds keywords in a single pass over the text"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for keyword in keywords:
+            self._add(keyword)
+
+        self._build()
+
+    def _add(self, keyword: str) -> int:
+        # Duplicate keywords keep their first id so lower ids keep priority
+        if keyword in self._ids:
+            return self._ids[keyword]
+
+        keyword_id = len(self.keywords)
+        self.keywords.append(keyword)
+        self._ids[keyword] = keyword_id
+
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+
+        self._out[state].append(keyword_id)
+        return keyword_id
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                if fail == next_state:
+                    fail = 0
+
+                self._fail[next_state] = fail
+                self._out[next_state] = self._out[next_state] + self._out[fail]
+
+        # Lowest keyword id reachable from each state, used for priority lookups
+        no_match = len(self.keywords)
+        self._first = [min(out) if out else no_match for out in self._out]
+
+    def first(self, text: str) -> Optional[int]:
+        """Return the lowest keyword id that occurs anywhere in text"""
+        goto, fail, first = self._goto, self._fail, self._first
+        best = first[0]
+        state = 0
+
+        for char in text:
+            if best == 0:
+                break
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if first[state] < best:
+                best = first[state]
+
+        return best if best < len(self.keywords) else None
+
+    def matches(self, text: str) -> FrozenSet[str]:
+        """Return every keyword that occurs anywhere in text"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set(out[0])
+        state = 0
+
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+
+        return frozenset(self.keywords[keyword_id] for keyword_id in found)
+
+
+class IntentMatcher:
+    """Compiled intent lookup over a Chatbot responses table"""
+
+    def __init__(self, responses: Dict, default: str = 'default'):
+        self.default = default
+
+        # Patterns are added in table order, so the first intent to declare a
+        # keyword owns it and lower keyword ids mean higher priority
+        pattern_intents: Dict[str, str] = {}
+        for intent, data in responses.items():
+            for pattern in data['patterns']:
+                pattern_intents.setdefault(pattern.lower(), intent)
+
+        self._automaton = KeywordAutomaton(pattern_intents)
+        self._keyword_intents = [pattern_intents[keyword] for keyword in self._automaton.keywords]
+
+    def match(self, user_input: str) -> str:
+        keyword_id = self._automaton.first(user_input.lower().strip())
+
+        if keyword_id is None:
+            return self.default
+
+        return self._keyword_intents[keyword_id]
@@ -0,0 +1,63 @@
+"""Static knowledge tables shared by the chatbot components.
+
+The tables are edited in knowledge.json and compiled into knowledge.kb
+(see knowledge_base.py), which is recompiled on import whenever the
+source is newer. Every process memory-maps the compiled file and decodes
+the tables as read-only mappings and tuples. Components hold references
+to these tables rather than building their own copies on each call.
+
+TABLES is one immutable snapshot of every table. Services.reload()
+replaces it with the snapshot of a newer knowledge base through
+install(), in a single assignment. Read `knowledge.TABLES` once per call
+and take every table from that snapshot, so a call never mixes tables
+from two versions.
+"""
+import os
+from typing import Mapping, NamedTuple, Sequence
+
+from knowledge_base import DEFAULT_COMPILED, DEFAULT_SOURCE, KnowledgeBase, load
+
+SOURCE = os.environ.get('KNOWLEDGE_SOURCE', DEFAULT_SOURCE)
+COMPILED = os.environ.get('KNOWLEDGE_BASE', DEFAULT_COMPILED)
+
+
+class Tables(NamedTuple):
+    """Every table of one knowledge base, named as in knowledge.json"""
+    base: KnowledgeBase
+    # Problem solving
+    solutions: Mapping
+    domain_keywords: Mapping
+    code_examples: Mapping
+    # Learning resources
+    learning_resources: Mapping
+    learning_paths: Mapping
+    learning_tips: Sequence
+    # Chatbot reply templates with {name}, {version}, {conversations} and
+    # {now:<strftime format>} fields (see response_templates.py)
+    chat_responses: Mapping
+    # Chatbot utilities
+    chatbot_features: Sequence
+    input_categories: Mapping
+    error_explanations: Mapping
+    domain_emojis: Mapping
+    # Simple chatbot
+    dictionary: Mapping
+    jokes: Sequence
+    small_talk: Sequence
+    dictionary_sample: str
+
+
+def snapshot(base: KnowledgeBase) -> Tables:
+    tables = [base[name] for name in Tables._fields[1:-1]]
+    sample = ', '.join(list(base['dictionary'])[:10]) + '...'
+    return Tables(base, *tables, sample)
+
+
+def install(base: KnowledgeBase):
+    """Make `base` the knowledge base TABLES refers to"""
+    global TABLES
+    TABLES = snapshot(base)
+
+
+TABLES: Tables
+install(load(SOURCE, COMPILED))
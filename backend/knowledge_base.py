@@ -0,0 +1,257 @@
+"""Compiled, memory-mapped knowledge base.
+
+The knowledge tables are written by hand in a JSON source file and
+compiled into a binary file:
+
+    header   magic, offset and length of the index, content digest
+    entries  each table entry as compact UTF-8 JSON, back to back
+    index    per table: its type and the key, offset and length of each entry
+
+Processes open the compiled file with mmap, so its pages live in the page
+cache once and are shared by every worker. Opening reads the index and
+decodes (and freezes) the small tables into plain read-only mappings and
+tuples, which the request paths read on every call; in tables larger
+than EAGER_TABLE_BYTES an entry is only decoded the first time it is
+accessed. The digest identifies the content: every worker that loaded
+the same tables reports the same version.
+
+Usage: python knowledge_base.py [source.json] [output.kb]
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from collections.abc import Mapping, Sequence
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List, Tuple, Union
+
+MAGIC = b'CHATKB02'
+HEADER = struct.Struct('<8sQQ8s')
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SOURCE = os.path.join(HERE, 'knowledge.json')
+DEFAULT_COMPILED = os.path.join(HERE, 'knowledge.kb')
+
+# Tables up to this many encoded bytes are decoded when the file is opened
+EAGER_TABLE_BYTES = 64 * 1024
+
+
+def freeze(value: Any) -> Any:
+    """Recursively turn dicts into read-only mappings and lists into tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def compile_tables(tables: Dict[str, Any]) -> bytes:
+    """Encode a {table name: dict or list} source into the binary format"""
+    entries: List[bytes] = []
+    index = {}
+    offset = HEADER.size
+
+    for name, table in tables.items():
+        if isinstance(table, dict):
+            kind, items = 'map', list(table.items())
+        elif isinstance(table, list):
+            kind, items = 'list', [(None, item) for item in table]
+        else:
+            raise ValueError(f"Knowledge table '{name}' must be an object or an array")
+
+        spans = []
+        for key, value in items:
+            data = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            entries.append(data)
+            spans.append([key, offset, len(data)] if kind == 'map' else [offset, len(data)])
+            offset += len(data)
+        index[name] = {'type': kind, 'entries': spans}
+
+    index_data = json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    body = b''.join(entries) + index_data
+    digest = hashlib.sha256(body).digest()[:8]
+    return HEADER.pack(MAGIC, offset, len(index_data), digest) + body
+
+
+def compile_file(source_path: str = DEFAULT_SOURCE, output_path: str = DEFAULT_COMPILED) -> bytes:
+    """Compile a JSON source file; the output is replaced atomically"""
+    with open(source_path, encoding='utf-8') as f:
+        data = compile_tables(json.load(f))
+
+    directory = os.path.dirname(os.path.abspath(output_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.knowledge-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        # mkstemp creates the file private to its owner
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return data
+
+
+class LazyMapping(Mapping):
+    """Read-only table whose values are decoded on first access"""
+
+    def __init__(self, base: 'KnowledgeBase', spans: Dict[str, Tuple[int, int]]):
+        self._base = base
+        self._spans = spans
+        self._values: Dict[str, Any] = {}
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        offset, length = self._spans[key]
+        value = self._values[key] = self._base.decode(offset, length)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return key in self._spans
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._spans)
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def __repr__(self) -> str:
+        return f"LazyMapping({len(self._values)}/{len(self._spans)} decoded)"
+
+
+class LazyList(Sequence):
+    """Read-only list table whose items are decoded on first access"""
+
+    def __init__(self, base: 'KnowledgeBase', spans: List[Tuple[int, int]]):
+        self._base = base
+        self._spans = spans
+        self._values: List[Any] = [None] * len(spans)
+        self._decoded = [False] * len(spans)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self[i] for i in range(*index.indices(len(self))))
+        if index < 0:
+            index += len(self._spans)
+        if not self._decoded[index]:
+            self._values[index] = self._base.decode(*self._spans[index])
+            self._decoded[index] = True
+        return self._values[index]
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def __repr__(self) -> str:
+        return f"LazyList({sum(self._decoded)}/{len(self._spans)} decoded)"
+
+
+class KnowledgeBase:
+    """Tables of a compiled knowledge base, decoded lazily"""
+
+    def __init__(self, buffer: Union[bytes, mmap.mmap], path: str = None,
+                 eager_bytes: int = EAGER_TABLE_BYTES):
+        self._buffer = buffer
+        self.path = path
+        self.size = len(buffer)
+        self.decoded = 0
+        self._lock = threading.Lock()
+
+        magic, index_offset, index_length, digest = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path or 'buffer'} is not a compiled knowledge base")
+        self.version = digest.hex()
+        index = json.loads(bytes(buffer[index_offset:index_offset + index_length]).decode('utf-8'))
+
+        self.tables: Dict[str, Union[MappingProxyType, tuple, LazyMapping, LazyList]] = {}
+        self.lazy_tables = 0
+        for name, table in index.items():
+            entries = table['entries']
+            eager = sum(entry[-1] for entry in entries) <= eager_bytes
+            if table['type'] == 'map':
+                if eager:
+                    self.tables[name] = MappingProxyType({key: self.decode(offset, length)
+                                                          for key, offset, length in entries})
+                else:
+                    self.tables[name] = LazyMapping(self, {key: (offset, length) for key, offset, length in entries})
+            elif eager:
+                self.tables[name] = tuple(self.decode(offset, length) for offset, length in entries)
+            else:
+                self.tables[name] = LazyList(self, [(offset, length) for offset, length in entries])
+            self.lazy_tables += not eager
+
+    @classmethod
+    def open(cls, path: str) -> 'KnowledgeBase':
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer, path)
+
+    def decode(self, offset: int, length: int) -> Any:
+        value = freeze(json.loads(self._buffer[offset:offset + length].decode('utf-8')))
+        with self._lock:
+            self.decoded += 1
+        return value
+
+    def __getitem__(self, name: str):
+        return self.tables[name]
+
+    def stats(self) -> Dict:
+        return {
+            'version': self.version,
+            'file': self.path,
+            'mapped': isinstance(self._buffer, mmap.mmap),
+            'bytes': self.size,
+            'tables': len(self.tables),
+            'entries': sum(len(table) for table in self.tables.values()),
+            'lazy_tables': self.lazy_tables,
+            'decoded': self.decoded
+        }
+
+
+def load(source_path: str = DEFAULT_SOURCE, compiled_path: str = DEFAULT_COMPILED) -> KnowledgeBase:
+    """Open the compiled knowledge base, compiling it first when the source is newer.
+
+    Where the compiled file cannot be written (a read-only deployment), the
+    base is compiled into memory instead and is not shared between workers.
+    """
+    try:
+        source_mtime = os.path.getmtime(source_path)
+    except OSError:
+        source_mtime = None
+
+    try:
+        stale = source_mtime is not None and os.path.getmtime(compiled_path) < source_mtime
+    except OSError:
+        stale = True
+
+    if not stale:
+        try:
+            return KnowledgeBase.open(compiled_path)
+        except (OSError, ValueError, struct.error):
+            if source_mtime is None:
+                raise
+
+    try:
+        compile_file(source_path, compiled_path)
+    except OSError:
+        with open(source_path, encoding='utf-8') as f:
+            return KnowledgeBase(compile_tables(json.load(f)))
+    return KnowledgeBase.open(compiled_path)
+
+
+if __name__ == '__main__':
+    source = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SOURCE
+    output = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_COMPILED
+    data = compile_file(source, output)
+    base = KnowledgeBase(data)
+    print(f"Compiled {source} -> {output}: {len(base.tables)} tables, "
+          f"{base.stats()['entries']} entries, {len(data)} bytes")
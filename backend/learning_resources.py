@@ -1,72 +1,100 @@
-from typing import Dict, List
-from datetime import datetime
+from typing import Dict, Iterator, Mapping, Optional
+from types import MappingProxyType
+from intent_matcher import KeywordAutomaton
+from knowledge_base import KnowledgeBase
+from retrieval import BM25Index
+import knowledge
+
+
+class ResourceTables:
+    """One version of the resource tables and every response prerendered from them"""
+    
+    def __init__(self, resources: Mapping, paths: Mapping, tips, retrieval: Optional[BM25Index] = None):
+        self.resources = resources
+        self.paths = paths
+        self.tips = tips
+        self.retrieval = retrieval
+
 
 class LearningResources:
     
-    def __init__(self):
+    def __init__(self, retrieval=None):
         self.chatbot_name = "Alok Pradhan Chatbot"
-        self.resources = self._load_resources()
-    
-    def _load_resources(self) -> Dict:
-        return {
-            'python_basics': {
-                'title': 'Python Basics',
-                'topics': ['variables', 'data types', 'operators', 'conditionals', 'loops'],
-                'difficulty': 'Beginner',
-                'duration': '2-3 hours'
-            },
-            'functions': {
-                'title': 'Functions and Scope',
-                'topics': ['function definition', 'parameters', 'return values', 'scope', 'lambda'],
-                'difficulty': 'Beginner',
-                'duration': '2 hours'
-            },
-            'data_structures': {
-                'title': 'Data Structures',
-                'topics': ['lists', 'tuples', 'dictionaries', 'sets', 'comprehensions'],
-                'difficulty': 'Intermediate',
-                'duration': '3 hours'
-            },
-            'oop': {
-                'title': 'Object-Oriented Programming',
-                'topics': ['classes', 'objects', 'inheritance', 'polymorphism', 'encapsulation'],
-                'difficulty': 'Intermediate',
-                'duration': '4 hours'
-            },
-            'error_handling': {
-                'title': 'Error Handling and Debugging',
-                'topics': ['try-except', 'custom exceptions', 'debugging', 'logging'],
-                'difficulty': 'Intermediate',
-                'duration': '2.5 hours'
-            },
-            'file_io': {
-                'title': 'File I/O and JSON',
-                'topics': ['reading files', 'writing files', 'JSON', 'CSV', 'serialization'],
-                'difficulty': 'Beginner',
-                'duration': '2 hours'
-            },
-            'apis': {
-                'title': 'Working with APIs',
-                'topics': ['HTTP requests', 'REST', 'API design', 'requests library', 'response handling'],
-                'difficulty': 'Intermediate',
-                'duration': '3 hours'
-            },
-            'databases': {
-                'title': 'Databases and SQL',
-                'topics': ['SQL basics', 'CRUD operations', 'relationships', 'joins', 'indexing'],
-                'difficulty': 'Intermediate',
-                'duration': '4 hours'
-            }
-        }
+        # retrieval is an optional BM25Index over the knowledge tables for
+        # paraphrased topics
+        self.reload(retrieval=retrieval)
+    
+    def build(self, base: KnowledgeBase = None, retrieval: BM25Index = None) -> ResourceTables:
+        """Load the resource tables and prerender every response built from them"""
+        base = base or knowledge.TABLES.base
+        tables = ResourceTables(base['learning_resources'], base['learning_paths'], base['learning_tips'],
+                                retrieval)
+        self._render(tables)
+        return tables
+    
+    def install(self, tables: ResourceTables):
+        """Swap in tables from build(); calls already running finish with the old ones"""
+        self._tables = tables
+    
+    def reload(self, base: KnowledgeBase = None, retrieval: BM25Index = None):
+        self.install(self.build(base, retrieval))
+    
+    @property
+    def resources(self) -> Mapping:
+        return self._tables.resources
+    
+    @property
+    def paths(self) -> Mapping:
+        return self._tables.paths
+    
+    @property
+    def tips(self):
+        return self._tables.tips
+    
+    @property
+    def retrieval(self) -> Optional[BM25Index]:
+        return self._tables.retrieval
+    
+    def _render(self, tables: ResourceTables):
+        """Render cards, the catalog, learning paths and tips once per load"""
+        tables.cards = MappingProxyType({
+            key: self._format_resource(resource) for key, resource in tables.resources.items()
+        })
+        tables.available = ', '.join(tables.resources.keys())
+        tables.catalog = ''.join(self._iter_catalog(tables))
+        
+        path_keys = list(tables.paths.keys())
+        tables.path_keys = tuple(path_keys)
+        tables.path_reports = tuple(''.join(self._iter_learning_path(tables, key)) for key in path_keys)
+        tables.available_paths = ', '.join(path_keys)
+        
+        # A goal matches a path when either string contains the other, and the
+        # first path in table order wins. Path names contained in the goal are
+        # found by the automaton; goals contained in a path name are looked up
+        # in a table of every substring of every path name.
+        tables.path_matcher = KeywordAutomaton(path_keys)
+        substrings = {}
+        for index, key in enumerate(path_keys):
+            for start in range(len(key) + 1):
+                for end in range(start, len(key) + 1):
+                    substrings.setdefault(key[start:end], index)
+        tables.path_substrings = MappingProxyType(substrings)
+        
+        tables.tips_report = ''.join(self._iter_tips(tables))
     
     def get_resource(self, topic: str) -> str:
+        tables = self._tables
         topic_lower = topic.lower().replace(' ', '_')
         
-        if topic_lower in self.resources:
-            resource = self.resources[topic_lower]
-            return self._format_resource(resource)
+        card = tables.cards.get(topic_lower)
+        if card is not None:
+            return card
+        
+        document = self._retrieve(tables, topic, 'resource')
+        if document is not None and document.key in tables.cards:
+            return tables.cards[document.key]
         
-        return f"Sorry, I don't have a resource for '{topic}'. Available resources: {', '.join(self.resources.keys())}"
+        return f"Sorry, I don't have a resource for '{topic}'. Available resources: {tables.available}"
     
     def _format_resource(self, resource: Dict) -> str:
         topics = ', '.join(resource['topics'])
@@ -79,64 +107,57 @@ class LearningResources:
 This course covers all essential concepts you need to master {resource['title'].lower()}.
         """.strip()
     
+    def _iter_catalog(self, tables: ResourceTables) -> Iterator[str]:
+        yield f"**{self.chatbot_name} - Available Learning Resources**\n\n"
+        
+        for resource in tables.resources.values():
+            yield f"📚 **{resource['title']}** ({resource['difficulty']})\n"
+            yield f"   ⏱️ {resource['duration']}\n"
+            yield f"   Topics: {', '.join(resource['topics'][:3])}...\n\n"
+    
     def list_all_resources(self) -> str:
-        report = f"**{self.chatbot_name} - Available Learning Resources**\n\n"
+        return self._tables.catalog
+    
+    def _iter_learning_path(self, tables: ResourceTables, path_key: str) -> Iterator[str]:
+        yield f"**{self.chatbot_name} - Learning Path for {path_key.title()}**\n\n"
         
-        for key, resource in self.resources.items():
-            report += f"📚 **{resource['title']}** ({resource['difficulty']})\n"
-            report += f"   ⏱️ {resource['duration']}\n"
-            report += f"   Topics: {', '.join(resource['topics'][:3])}...\n\n"
+        for i, course_key in enumerate(tables.paths[path_key], 1):
+            if course_key in tables.resources:
+                course = tables.resources[course_key]
+                yield f"{i}. **{course['title']}** ({course['duration']})\n"
+    
+    def _match_learning_path(self, tables: ResourceTables, goal_lower: str):
+        contained = tables.path_matcher.first(goal_lower)
+        containing = tables.path_substrings.get(goal_lower)
+        candidates = [index for index in (contained, containing) if index is not None]
+        if candidates:
+            return min(candidates)
         
-        return report
+        document = self._retrieve(tables, goal_lower, 'path')
+        if document is not None and document.key in tables.path_keys:
+            return tables.path_keys.index(document.key)
+        return None
+    
+    def _retrieve(self, tables: ResourceTables, text: str, kind: str):
+        if tables.retrieval is None:
+            return None
+        return tables.retrieval.best(text, (kind,))
     
     def get_learning_path(self, goal: str) -> str:
         """Suggest learning path based on goal"""
-        paths = {
-            'web development': ['python_basics', 'functions', 'data_structures', 'apis', 'databases'],
-            'data science': ['python_basics', 'data_structures', 'error_handling', 'file_io'],
-            'backend': ['python_basics', 'oop', 'apis', 'databases', 'error_handling'],
-            'automation': ['python_basics', 'functions', 'file_io', 'error_handling']
-        }
+        tables = self._tables
+        index = self._match_learning_path(tables, goal.lower())
         
-        goal_lower = goal.lower()
+        if index is None:
+            return f"I don't have a learning path for '{goal}'. Try: {tables.available_paths}"
         
-        # Find matching path
-        matching_path = None
-        for key in paths:
-            if key in goal_lower or goal_lower in key:
-                matching_path = key
-                break
-        
-        if not matching_path:
-            return f"I don't have a learning path for '{goal}'. Try: {', '.join(paths.keys())}"
-        
-        course_list = paths[matching_path]
-        report = f"**{self.chatbot_name} - Learning Path for {matching_path.title()}**\n\n"
-        
-        for i, course_key in enumerate(course_list, 1):
-            if course_key in self.resources:
-                course = self.resources[course_key]
-                report += f"{i}. **{course['title']}** ({course['duration']})\n"
-        
-        return report
+        return tables.path_reports[index]
+    
+    def _iter_tips(self, tables: ResourceTables) -> Iterator[str]:
+        yield f"**{self.chatbot_name} - Tips for Effective Learning**\n\n"
+        for i, tip in enumerate(tables.tips, 1):
+            yield f"{i}. {tip}\n"
     
     def get_tips_for_learning(self) -> str:
         """Get tips for effective learning"""
-        tips = [
-            "Practice coding every day, even if just for 15 minutes",
-            "Build projects to apply what you've learned",
-            "Read other people's code to improve your understanding",
-            "Join coding communities and participate in discussions",
-            "Use version control (Git) from the start",
-            "Write clean, readable code with comments",
-            "Test your code thoroughly before deployment",
-            "Don't just watch tutorials - write code along with them",
-            "Solve coding challenges and problems regularly",
-            "Teach others what you've learned"
-        ]
-        
-        report = f"**{self.chatbot_name} - Tips for Effective Learning**\n\n"
-        for i, tip in enumerate(tips, 1):
-            report += f"{i}. {tip}\n"
-        
-        return report
+        return self._tables.tips_report
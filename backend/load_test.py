@@ -0,0 +1,117 @@
+"""Keep-alive HTTP load generator for comparing the Flask and ASGI servers.
+
+Start the server under test, then point this script at it, e.g.:
+    python app.py                                 # Flask, port 5000
+    uvicorn asgi:app --port 5001                  # ASGI
+    python load_test.py http://localhost:5000/api/chat -c 500 -d 10
+    python load_test.py http://localhost:5001/api/chat -c 500 -d 10
+
+Each of the `-c` connections is a coroutine that sends requests back to back
+over one persistent connection; `--think` adds a pause between requests to
+mimic slow clients holding connections open.
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+
+def build_request(url: str, method: str, payload: dict) -> bytes:
+    parts = urlsplit(url)
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    body = json.dumps(payload).encode() if method == 'POST' else b''
+    head = (
+        f'{method} {path} HTTP/1.1\r\n'
+        f'Host: {parts.netloc}\r\n'
+        'Connection: keep-alive\r\n'
+        'Content-Type: application/json\r\n'
+        f'Content-Length: {len(body)}\r\n\r\n'
+    )
+    return head.encode() + body
+
+
+async def read_response(reader: asyncio.StreamReader) -> int:
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    status = int(status_line.split()[1])
+
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+
+    await reader.readexactly(length)
+    return status
+
+
+async def client(host: str, port: int, request: bytes, deadline: float, think: float,
+                 latencies: list, errors: list):
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors.append(status)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+            errors.append(type(e).__name__)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.05)
+            continue
+        if think:
+            await asyncio.sleep(think)
+
+    if writer is not None:
+        writer.close()
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run(args):
+    parts = urlsplit(args.url)
+    payload = json.loads(args.payload)
+    request = build_request(args.url, args.method, payload)
+    latencies, errors = [], []
+
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(*(
+        client(parts.hostname, parts.port or 80, request, deadline, args.think, latencies, errors)
+        for _ in range(args.concurrency)
+    ))
+
+    latencies.sort()
+    print(f"URL:          {args.url}")
+    print(f"Connections:  {args.concurrency}")
+    print(f"Requests:     {len(latencies)} ({len(errors)} errors)")
+    print(f"Throughput:   {len(latencies) / args.duration:.1f} req/s")
+    print(f"Latency p50:  {percentile(latencies, 0.50) * 1e3:.1f} ms")
+    print(f"Latency p95:  {percentile(latencies, 0.95) * 1e3:.1f} ms")
+    print(f"Latency p99:  {percentile(latencies, 0.99) * 1e3:.1f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('url')
+    parser.add_argument('-c', '--concurrency', type=int, default=100)
+    parser.add_argument('-d', '--duration', type=float, default=10)
+    parser.add_argument('-m', '--method', default='POST', choices=['GET', 'POST'])
+    parser.add_argument('--payload', default='{"message": "Help with KeyError"}')
+    parser.add_argument('--think', type=float, default=0, help='seconds to wait between requests')
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,457 @@
+"""Counters and latency histograms that stay correct across threads and
+worker processes.
+
+Updates take no lock: every thread writes only its own cells, and reads
+add the cells up. With a metrics directory, each process also publishes
+its totals to its own memory-mapped file there, and reads add up the
+files of every process, so /api/stats and /api/metrics describe the
+whole deployment rather than whichever worker answered.
+"""
+import atexit
+import bisect
+import functools
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LABEL_PATTERN = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def parse_sample(key: str) -> Tuple[str, Dict[str, str]]:
+    """Split 'name{a="x"}' into ('name', {'a': 'x'})"""
+    name, _, labels = key.partition('{')
+    return name, {label: value.replace('\\"', '"').replace('\\n', '\n').replace('\\\\', '\\')
+                  for label, value in LABEL_PATTERN.findall(labels)}
+
+
+class ThreadCells:
+    """Value slots per thread; only the owning thread writes its slots"""
+
+    # Cells of finished threads are merged once this many exist
+    FOLD_THRESHOLD = 64
+
+    def __init__(self, size: int):
+        self.size = size
+        self._local = threading.local()
+        self._cells: List[Tuple[threading.Thread, List[float]]] = []
+        self._retired = [0] * size
+        self._lock = threading.Lock()
+
+    def cell(self) -> List[float]:
+        try:
+            return self._local.cell
+        except AttributeError:
+            pass
+        cell = [0] * self.size
+        with self._lock:
+            if len(self._cells) >= self.FOLD_THRESHOLD:
+                self._fold()
+            self._cells.append((threading.current_thread(), cell))
+        self._local.cell = cell
+        return cell
+
+    def _fold(self):
+        # A finished thread writes no more, so its cell can be merged safely
+        live = []
+        for thread, cell in self._cells:
+            if thread.is_alive():
+                live.append((thread, cell))
+            else:
+                for i, value in enumerate(cell):
+                    self._retired[i] += value
+        self._cells = live
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            self._fold()
+            totals = list(self._retired)
+            for _, cell in self._cells:
+                for i, value in enumerate(cell):
+                    totals[i] += value
+        return totals
+
+
+class Metric:
+    """Base for metrics, optionally split into children by label values"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str = '', labelnames: Sequence[str] = (),
+                 _labels: Tuple[Tuple[str, str], ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._labels = _labels
+        self._children: Dict[Tuple[str, ...], 'Metric'] = {}
+        self._lock = threading.Lock()
+        self._cells = ThreadCells(self._size())
+
+    def _size(self) -> int:
+        return 1
+
+    def _child(self, labels: Tuple[Tuple[str, str], ...]) -> 'Metric':
+        return type(self)(self.name, self.help, _labels=labels)
+
+    def labels(self, *values) -> 'Metric':
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f'{self.name} takes labels {self.labelnames}')
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._child(self._labels + tuple(zip(self.labelnames, values)))
+                    self._children[values] = child
+        return child
+
+    def reset(self):
+        self._cells = ThreadCells(self._size())
+        for child in list(self._children.values()):
+            child.reset()
+
+    def samples(self) -> Iterator[Tuple[str, float]]:
+        """Yield (sample key, value) pairs in exposition format"""
+        if self.labelnames:
+            for child in list(self._children.values()):
+                yield from child.samples()
+        else:
+            yield from self._own_samples()
+
+    def _own_samples(self) -> Iterator[Tuple[str, float]]:
+        raise NotImplementedError
+
+    def sample_names(self) -> Tuple[str, ...]:
+        return (self.name,)
+
+
+class Counter(Metric):
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1):
+        self._cells.cell()[0] += amount
+
+    def value(self) -> float:
+        if self.labelnames:
+            return sum(child.value() for child in list(self._children.values()))
+        return self._cells.totals()[0]
+
+    def _own_samples(self):
+        yield self.name + _format_labels(self._labels), self._cells.totals()[0]
+
+
+class Histogram(Metric):
+    """Counts observations into fixed buckets; memory does not grow with traffic"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str = '', labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, _labels=()):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, _labels)
+
+    def _size(self) -> int:
+        # One slot per bucket, one for +Inf and one for the sum
+        return len(self.buckets) + 2
+
+    def _child(self, labels):
+        return Histogram(self.name, self.help, buckets=self.buckets, _labels=labels)
+
+    def observe(self, value: float):
+        cell = self._cells.cell()
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def _own_samples(self):
+        totals = self._cells.totals()
+        count = 0
+        for bound, hits in zip(self.buckets + (math.inf,), totals):
+            count += hits
+            le = '+Inf' if bound == math.inf else repr(float(bound))
+            yield f"{self.name}_bucket{_format_labels(self._labels + (('le', le),))}", count
+        yield self.name + '_sum' + _format_labels(self._labels), totals[-1]
+        yield self.name + '_count' + _format_labels(self._labels), count
+
+    def sample_names(self):
+        return (self.name + '_bucket', self.name + '_sum', self.name + '_count')
+
+
+# Time spent inside a request, by stage. Stages nest: formatting inside
+# problem solving is counted in both.
+STAGE_LATENCY = Histogram('stage_duration_seconds', 'Time spent in each stage of a request',
+                          labelnames=('stage',))
+
+
+def timed(stage: str):
+    """Decorator recording each call's duration in STAGE_LATENCY under `stage`"""
+    histogram = STAGE_LATENCY.labels(stage)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def summarize_histogram(name: str, values: Dict[str, float],
+                        quantiles: Sequence[float] = (0.5, 0.95, 0.99)) -> Dict[str, Dict]:
+    """Count, mean and estimated quantiles in milliseconds per label set.
+
+    Quantiles are interpolated within buckets, as Prometheus'
+    histogram_quantile() does, so they are only as fine as the buckets.
+    """
+    series: Dict[str, Dict] = {}
+    for key, value in values.items():
+        if not key.startswith(name + '_'):
+            continue
+        sample, labels = parse_sample(key)
+        le = labels.pop('le', None)
+        entry = series.setdefault(','.join(labels.values()), {'buckets': [], 'sum': 0.0, 'count': 0})
+        if sample == name + '_bucket':
+            entry['buckets'].append((float(le), value))
+        elif sample == name + '_sum':
+            entry['sum'] = value
+        elif sample == name + '_count':
+            entry['count'] = int(value)
+
+    summary = {}
+    for label, entry in series.items():
+        count = entry['count']
+        if not count:
+            continue
+        buckets = sorted(entry['buckets'])
+        stats = {'requests': count, 'mean_ms': round(entry['sum'] / count * 1e3, 3)}
+        for q in quantiles:
+            stats[f'p{round(q * 100):d}_ms'] = round(_bucket_quantile(q, buckets, count) * 1e3, 3)
+        summary[label] = stats
+    return summary
+
+
+def _bucket_quantile(q: float, buckets: List[Tuple[float, float]], count: int) -> float:
+    rank = q * count
+    lower, below = 0.0, 0.0
+    for bound, cumulative in buckets:
+        if cumulative >= rank:
+            if bound == math.inf:
+                return lower
+            if cumulative == below:
+                return bound
+            return lower + (bound - lower) * (rank - below) / (cumulative - below)
+        lower, below = bound, cumulative
+    return lower
+
+
+class MmapValues:
+    """Single-writer table of key -> float64 in a memory-mapped file.
+
+    Layout: a header holding the number of bytes in use, then entries of
+    (key length, key, padding to 8 bytes, value). An entry is written in
+    full before the header counts it, so readers never see half of one.
+    """
+
+    HEADER = struct.Struct('<I4x')
+    LENGTH = struct.Struct('<I')
+    VALUE = struct.Struct('<d')
+    INITIAL_SIZE = 64 * 1024
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        self._size = self.INITIAL_SIZE
+        os.ftruncate(self._fd, self._size)
+        self._map = mmap.mmap(self._fd, self._size)
+        self._used = self.HEADER.size
+        self.HEADER.pack_into(self._map, 0, self._used)
+        self._offsets: Dict[str, int] = {}
+
+    def write(self, key: str, value: float):
+        offset = self._offsets.get(key)
+        if offset is None:
+            offset = self._append(key)
+        self.VALUE.pack_into(self._map, offset, value)
+
+    def _append(self, key: str) -> int:
+        encoded = key.encode('utf-8')
+        header = self.LENGTH.size + len(encoded)
+        header += -header % 8
+        end = self._used + header + self.VALUE.size
+
+        if end > self._size:
+            while end > self._size:
+                self._size *= 2
+            self._map.close()
+            os.ftruncate(self._fd, self._size)
+            self._map = mmap.mmap(self._fd, self._size)
+
+        start = self._used
+        self.LENGTH.pack_into(self._map, start, len(encoded))
+        self._map[start + self.LENGTH.size:start + self.LENGTH.size + len(encoded)] = encoded
+        offset = start + header
+        self.VALUE.pack_into(self._map, offset, 0.0)
+        self._used = end
+        self.HEADER.pack_into(self._map, 0, self._used)
+        self._offsets[key] = offset
+        return offset
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+
+def read_values(path: str) -> Dict[str, float]:
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < MmapValues.HEADER.size:
+        return {}
+
+    used = min(MmapValues.HEADER.unpack_from(data, 0)[0], len(data))
+    values = {}
+    position = MmapValues.HEADER.size
+    while position + MmapValues.LENGTH.size <= used:
+        length = MmapValues.LENGTH.unpack_from(data, position)[0]
+        key_start = position + MmapValues.LENGTH.size
+        header = MmapValues.LENGTH.size + length
+        header += -header % 8
+        offset = position + header
+        if offset + MmapValues.VALUE.size > used:
+            break
+        values[data[key_start:key_start + length].decode('utf-8')] = MmapValues.VALUE.unpack_from(data, offset)[0]
+        position = offset + MmapValues.VALUE.size
+    return values
+
+
+class MetricsRegistry:
+    """The metrics a process exposes, and their totals across processes.
+
+    Without a directory the totals are this process's own. With one, each
+    process that calls start() publishes to `<directory>/metrics_<pid>.db`
+    every `flush_interval` seconds, at exit and before every read. Files
+    of exited workers are kept so counters do not go backwards; empty the
+    directory when the deployment starts.
+    """
+
+    def __init__(self, directory: Optional[str] = None, flush_interval: float = 1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._metrics: List[Metric] = []
+        self._lock = threading.Lock()
+        self._file: Optional[MmapValues] = None
+        self._pid: Optional[int] = None
+        self._publish_lock = threading.Lock()
+        self._stop = threading.Event()
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            os.register_at_fork(after_in_child=self._after_fork)
+            atexit.register(self._publish_at_exit)
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def start(self):
+        """Begin publishing for the current process; cheap to call on every request"""
+        if self.directory is None or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._file = MmapValues(os.path.join(self.directory, f'metrics_{os.getpid()}.db'))
+            self._pid = os.getpid()
+            self._stop.clear()
+            threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.publish()
+
+    def _after_fork(self):
+        # A forked worker counts its own traffic from zero in its own file
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+        self._file = None
+        self._pid = None
+        self._stop = threading.Event()
+        for metric in self._metrics:
+            metric.reset()
+
+    def _publish_at_exit(self):
+        if self._pid == os.getpid():
+            self.publish()
+            self._stop.set()
+
+    def local(self) -> Dict[str, float]:
+        """This process's samples"""
+        with self._lock:
+            metrics = list(self._metrics)
+        return {key: value for metric in metrics for key, value in metric.samples()}
+
+    def publish(self):
+        # Read and write under one lock so an older snapshot never lands last
+        with self._publish_lock:
+            if self._file is None or self._pid != os.getpid():
+                return
+            for key, value in self.local().items():
+                self._file.write(key, value)
+
+    def processes(self) -> int:
+        if self.directory is None:
+            return 1
+        return sum(1 for name in os.listdir(self.directory) if name.startswith('metrics_'))
+
+    def aggregate(self) -> Dict[str, float]:
+        """Samples summed over every process publishing to the directory"""
+        if self.directory is None or self._pid != os.getpid():
+            return self.local()
+
+        self.publish()
+        totals: Dict[str, float] = {}
+        for name in sorted(os.listdir(self.directory)):
+            if not name.startswith('metrics_'):
+                continue
+            try:
+                values = read_values(os.path.join(self.directory, name))
+            except (OSError, ValueError, struct.error):
+                continue
+            for key, value in values.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def exposition(self, values: Optional[Dict[str, float]] = None) -> str:
+        """Prometheus text format (version 0.0.4)"""
+        values = self.aggregate() if values is None else values
+        with self._lock:
+            metrics = list(self._metrics)
+
+        lines = []
+        for metric in metrics:
+            names = metric.sample_names()
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for key, value in values.items():
+                if key.partition('{')[0] in names:
+                    lines.append(f'{key} {int(value) if float(value).is_integer() else repr(float(value))}')
+        return '\n'.join(lines) + '\n'
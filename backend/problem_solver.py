@@ -1,113 +1,136 @@
-import json
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Dict, Mapping, NamedTuple, Optional
+from response_cache import cached_response
+from intent_matcher import IntentMatcher
+from knowledge_base import KnowledgeBase
+from retrieval import BM25Index
+from solution_index import SolutionIndex, iter_error_solutions
+from metrics import Counter, timed
+import knowledge
+
+
+class SolverTables(NamedTuple):
+    """One version of the solver's tables and the indexes built from them"""
+    solutions: Mapping
+    examples: Mapping
+    index: SolutionIndex
+    domain_matcher: IntentMatcher
+    retrieval: Optional[BM25Index]
+
 
 class ProblemSolver:
     
-    def __init__(self):
+    def __init__(self, cache=None, retrieval=None):
         self.name = "Alok Pradhan Chatbot"
-        self.problems_solved = 0
-        self.solutions = self._load_solutions()
+        self.solved = Counter('problems_solved_total', 'Problems answered by the problem solver')
+        self.cache = cache
+        # retrieval is an optional BM25Index over the knowledge tables for
+        # paraphrased questions
+        self.reload(retrieval=retrieval)
     
-    def _load_solutions(self) -> Dict:
-        return {
-            'python': {
-                'category': 'Python Programming',
-                'problems': {
-                    'error': [
-                        'AttributeError', 'TypeError', 'ValueError', 
-                        'KeyError', 'IndexError', 'NameError'
-                    ],
-                    'solutions': {
-                        'AttributeError': 'This error occurs when trying to access an attribute that doesn\'t exist. Check if the object has that attribute or if you misspelled it.',
-                        'TypeError': 'This error means you\'re performing an operation on incompatible data types. Ensure types match (e.g., int + str).',
-                        'ValueError': 'This error occurs when a function receives an argument of correct type but inappropriate value. Check your input values.',
-                        'KeyError': 'This error occurs when trying to access a dictionary key that doesn\'t exist. Use .get() method instead.',
-                        'IndexError': 'This error occurs when trying to access a list index that doesn\'t exist. Check your list length.',
-                        'NameError': 'This error occurs when using a variable that hasn\'t been defined. Define the variable first.'
-                    }
-                }
-            },
-            'debugging': {
-                'category': 'Debugging Techniques',
-                'tips': [
-                    'Use print() statements to track variable values',
-                    'Use debugger: import pdb; pdb.set_trace()',
-                    'Check for typos in variable names',
-                    'Verify data types are correct',
-                    'Test functions with different inputs',
-                    'Use try-except blocks for error handling'
-                ]
-            },
-            'performance': {
-                'category': 'Performance Optimization',
-                'tips': [
-                    'Use list comprehensions instead of loops',
-                    'Use set for O(1) lookup instead of list',
-                    'Avoid nested loops when possible',
-                    'Cache results with functools.lru_cache',
-                    'Use generators for large datasets',
-                    'Profile code with cProfile module'
-                ]
-            },
-            'web': {
-                'category': 'Web Development Issues',
-                'problems': {
-                    'CORS': 'Cross-Origin Resource Sharing error. Add CORS headers or use Flask-CORS.',
-                    '404': 'Resource not found. Check URL path and API endpoint.',
-                    '500': 'Server error. Check server logs for details.',
-                    'timeout': 'Request timeout. Increase timeout duration or optimize code.'
-                }
-            },
-            'database': {
-                'category': 'Database Issues',
-                'problems': {
-                    'connection': 'Can\'t connect to database. Check credentials, host, and port.',
-                    'syntax': 'SQL syntax error. Check your SQL query for typos.',
-                    'constraint': 'Constraint violation. Check unique/foreign key constraints.',
-                    'transaction': 'Transaction error. Use ROLLBACK and retry.'
-                }
-            }
-        }
+    def build(self, base: KnowledgeBase = None, retrieval: BM25Index = None) -> SolverTables:
+        """Build the solution tables and their indexes without installing them"""
+        base = base or knowledge.TABLES.base
+        solutions = base['solutions']
+        domain_matcher = IntentMatcher(
+            {domain: {'patterns': keywords} for domain, keywords in base['domain_keywords'].items()},
+            default=None
+        )
+        return SolverTables(solutions, base['code_examples'], SolutionIndex(iter_error_solutions(solutions)),
+                            domain_matcher, retrieval)
+    
+    def install(self, tables: SolverTables):
+        """Swap in tables from build(); calls already running finish with the old ones"""
+        self._tables = tables
+        if self.cache is not None:
+            self.cache.invalidate('solution')
+            self.cache.invalidate('code_example')
+    
+    def reload(self, base: KnowledgeBase = None, retrieval: BM25Index = None):
+        """Load the solution tables and rebuild the indexes derived from them"""
+        self.install(self.build(base, retrieval))
+    
+    @property
+    def solutions(self) -> Mapping:
+        return self._tables.solutions
     
+    @property
+    def index(self) -> SolutionIndex:
+        return self._tables.index
+    
+    @property
+    def domain_matcher(self) -> IntentMatcher:
+        return self._tables.domain_matcher
+    
+    @property
+    def retrieval(self) -> Optional[BM25Index]:
+        return self._tables.retrieval
+    
+    @property
+    def problems_solved(self) -> int:
+        return int(self.solved.value())
+    
+    @timed('problem_solving')
     def solve_problem(self, problem: str, domain: str = None) -> str:
         problem_lower = problem.lower().strip()
         
-        if not domain:
-            domain = self._detect_domain(problem_lower)
-        
-        if domain not in self.solutions:
+        if domain and domain not in self.solutions:
             return f"Sorry, I don't have solutions for the '{domain}' domain yet. Try asking about: Python, Debugging, Performance, Web, or Database."
         
-        solution = self._get_solution(problem_lower, domain)
-        self.problems_solved += 1
+        solution = self._get_solution(problem_lower, domain or None)
+        self.solved.inc()
         
         return solution
     
-    def _detect_domain(self, problem: str) -> str:
-        keywords = {
-            'python': ['python', 'error', 'code', 'script', 'function'],
-            'debugging': ['debug', 'bug', 'fix', 'wrong', 'issue'],
-            'performance': ['slow', 'fast', 'optimize', 'performance'],
-            'web': ['api', 'web', 'cors', 'http', 'request'],
-            'database': ['database', 'sql', 'data', 'query']
-        }
+    def _detect_domain(self, problem: str, tables: SolverTables = None) -> str:
+        """The domain the problem's keywords point to, or None"""
+        return (tables or self._tables).domain_matcher.match(problem)
+    
+    @cached_response('solution')
+    def _get_solution(self, problem: str, domain: str = None) -> str:
+        # One version of the tables serves the whole call, even if a reload
+        # swaps in another meanwhile
+        tables = self._tables
+        keyword_domain = domain or self._detect_domain(problem, tables)
+        detected = keyword_domain or 'python'
         
-        for domain, keywords_list in keywords.items():
-            for keyword in keywords_list:
-                if keyword in problem:
-                    return domain
+        # Rank known errors from every domain (or just the requested one),
+        # preferring the domain the problem's keywords point to
+        match = tables.index.best(problem, domain, prefer_domain=detected)
+        if match is not None:
+            return self._format_solution(*match)
         
-        return 'python'
-    
-    def _get_solution(self, problem: str, domain: str) -> str:
-        domain_data = self.solutions[domain]
+        # A paraphrase that names no error: rank solutions by their wording,
+        # and tips too when no keyword gave the domain away
+        if tables.retrieval is not None:
+            kinds = ('solution',) if keyword_domain else ('solution', 'tip')
+            document = tables.retrieval.best(problem, kinds, domain)
+            if document is not None and document.kind == 'solution':
+                return self._format_solution(document.domain, document.key, document.text)
+            if document is not None and document.domain in tables.solutions:
+                return self._describe_domain(document.domain, tables.solutions)
         
+        return self._describe_domain(detected, tables.solutions)
+    
+    @timed('formatting')
+    def _format_solution(self, domain: str, error: str, solution: str) -> str:
         if domain == 'python':
-            for error_type, solution in domain_data['problems']['solutions'].items():
-                if error_type.lower() in problem:
-                    return f"**{error_type} Solution:**\n{solution}"
-            
+            return f"**{error} Solution:**\n{solution}"
+        elif domain == 'web':
+            return f"**{error} Error Solution:**\n{solution}"
+        elif domain == 'database':
+            return f"**{error} Issue Solution:**\n{solution}"
+        
+        return f"**{error}:**\n{solution}"
+    
+    @timed('formatting')
+    def _describe_domain(self, domain: str, solutions: Mapping) -> str:
+        domain_data = solutions.get(domain)
+        
+        if domain_data is None:
+            return "I can't find a solution for that problem."
+        
+        elif domain == 'python':
             return f"I can help with these Python errors: {', '.join(domain_data['problems']['solutions'].keys())}"
         
         elif domain == 'debugging':
@@ -118,33 +141,23 @@ class ProblemSolver:
             tips = '\n'.join([f"• {tip}" for tip in domain_data['tips']])
             return f"**Performance Optimization Tips:**\n{tips}"
         
-        elif domain == 'web':
-            for error, solution in domain_data['problems'].items():
-                if error.lower() in problem:
-                    return f"**{error} Error Solution:**\n{solution}"
-            
-            return f"I can help with: {', '.join(domain_data['problems'].keys())}"
-        
-        elif domain == 'database':
-            for error, solution in domain_data['problems'].items():
-                if error.lower() in problem:
-                    return f"**{error} Issue Solution:**\n{solution}"
-            
+        elif domain in ('web', 'database'):
             return f"I can help with: {', '.join(domain_data['problems'].keys())}"
         
         return "I can't find a solution for that problem."
     
+    @cached_response('code_example')
     def get_code_example(self, topic: str) -> str:
-        examples = {
-            'list_comprehension': "numbers = [1, 2, 3, 4, 5]\nsquared = [x**2 for x in numbers]\nprint(squared)",
-            'try_except': "try:\n    value = int('abc')\nexcept ValueError:\n    print('Invalid input')",
-            'lambda': "square = lambda x: x ** 2\nprint(square(5))",
-            'decorator': "def my_decorator(func):\n    def wrapper(*args, **kwargs):\n        print(f'Calling {func.__name__}')\n        return func(*args, **kwargs)\n    return wrapper"
-        }
+        tables = self._tables
+        examples = tables.examples
         
         if topic.lower() in examples:
             return f"**{topic.title()} Example:**\n```python\n{examples[topic.lower()]}\n```"
         
+        document = tables.retrieval.best(topic, ('example',)) if tables.retrieval is not None else None
+        if document is not None:
+            return f"**{document.title.replace('_', ' ').title()} Example:**\n```python\n{document.text}\n```"
+        
         return f"I don't have an example for '{topic}' yet."
     
     def get_stats(self) -> Dict:
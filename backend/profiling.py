@@ -0,0 +1,229 @@
+"""Opt-in profiling of the slowest requests.
+
+In 'sample' mode a background thread snapshots the stacks of the threads
+serving profiled requests every few milliseconds and writes them as
+collapsed stacks (`frame;frame;frame count`), which flamegraph.pl and
+speedscope read directly. In 'cprofile' mode each request runs under
+cProfile and is written as a pstats file. Only the slowest `slowest`
+requests seen so far are kept on disk.
+"""
+import cProfile
+import functools
+import heapq
+import itertools
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+MODES = ('sample', 'cprofile')
+UNSAFE_FILENAME = re.compile(r'[^A-Za-z0-9_.-]+')
+
+# The profile of the request the current thread (or task) is working for
+current_profile: ContextVar = ContextVar('current_profile', default=None)
+
+
+def carry(func):
+    """Wrap func so the thread that runs it joins the caller's request profile.
+
+    Use it when handing work to a thread pool.
+    """
+    profile = current_profile.get()
+    if profile is None:
+        return func
+    return functools.partial(profile.run, func)
+
+
+class RequestProfile:
+    """Profile of one request; threads doing its work join it with `with profile:`"""
+
+    def __init__(self, profiler: 'RequestProfiler'):
+        self.profiler = profiler
+        self.samples: Counter = Counter()
+        self.threads: Dict[int, int] = {}
+        self.profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._active: Dict[int, cProfile.Profile] = {}
+        self._tokens: Dict = {}
+
+    def enter(self):
+        ident = threading.get_ident()
+        with self._lock:
+            depth = self.threads.get(ident, 0)
+            self.threads[ident] = depth + 1
+        if depth:
+            return
+        self._tokens[ident] = current_profile.set(self)
+        if self.profiler.mode == 'cprofile':
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler already owns this thread
+                return
+            self._active[ident] = profile
+
+    def exit(self):
+        ident = threading.get_ident()
+        with self._lock:
+            self.threads[ident] -= 1
+            if self.threads[ident]:
+                return
+            del self.threads[ident]
+        current_profile.reset(self._tokens.pop(ident))
+        profile = self._active.pop(ident, None)
+        if profile is not None:
+            profile.disable()
+            with self._lock:
+                self.profiles.append(profile)
+
+    def __enter__(self):
+        self.enter()
+        return self
+
+    def __exit__(self, *exc):
+        self.exit()
+
+    def run(self, func, *args):
+        with self:
+            return func(*args)
+
+
+class RequestProfiler:
+    """Profiles requests and keeps the slowest `slowest` of them in `directory`.
+
+    Disabled (and free) when `slowest` is 0.
+    """
+
+    def __init__(self, slowest: int = 0, mode: str = 'sample', directory: str = 'profiles',
+                 interval: float = 0.005):
+        if mode not in MODES:
+            raise ValueError(f"Profiler mode must be one of {', '.join(MODES)}")
+        self.slowest = slowest
+        self.mode = mode
+        self.directory = directory
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._running: List[RequestProfile] = []
+        self._kept: List = []
+        self._sequence = itertools.count()
+        self._sampler_pid: Optional[int] = None
+        self.profiled = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.slowest > 0
+
+    def begin(self, attach: bool = True) -> Optional[RequestProfile]:
+        """Start profiling a request; with `attach` the calling thread joins it"""
+        if not self.enabled:
+            return None
+        profile = RequestProfile(self)
+        if self.mode == 'sample':
+            self._start_sampler()
+            with self._lock:
+                self._running.append(profile)
+        if attach:
+            profile.enter()
+        return profile
+
+    def end(self, profile: Optional[RequestProfile], endpoint: str, seconds: float,
+            detach: bool = True):
+        """Finish a request's profile and keep it if it is among the slowest"""
+        if profile is None:
+            return
+        if detach:
+            profile.exit()
+
+        with self._lock:
+            if profile in self._running:
+                self._running.remove(profile)
+            self.profiled += 1
+            if len(self._kept) >= self.slowest and seconds <= self._kept[0][0]:
+                return
+            path = self._path(endpoint, seconds)
+            entry = (seconds, next(self._sequence), endpoint, path)
+            evicted = None
+            if len(self._kept) >= self.slowest:
+                evicted = heapq.heapreplace(self._kept, entry)
+            else:
+                heapq.heappush(self._kept, entry)
+
+        self._write(profile, path)
+        if evicted is not None:
+            try:
+                os.remove(evicted[3])
+            except OSError:
+                pass
+
+    def _path(self, endpoint: str, seconds: float) -> str:
+        name = UNSAFE_FILENAME.sub('_', endpoint.strip('/')) or 'root'
+        extension = 'folded' if self.mode == 'sample' else 'prof'
+        return os.path.join(self.directory, f"{int(time.time() * 1e3)}_{os.getpid()}_{name}_"
+                                            f"{seconds * 1e3:.1f}ms.{extension}")
+
+    def _write(self, profile: RequestProfile, path: str):
+        os.makedirs(self.directory, exist_ok=True)
+        if self.mode == 'sample':
+            with profile._lock:
+                samples = profile.samples.most_common()
+            with open(path, 'w') as f:
+                for stack, count in samples:
+                    f.write(f"{stack} {count}\n")
+        elif profile.profiles:
+            stats = pstats.Stats(profile.profiles[0])
+            for other in profile.profiles[1:]:
+                stats.add(other)
+            stats.dump_stats(path)
+
+    def _start_sampler(self):
+        # Threads do not survive fork, so each worker starts its own
+        if self._sampler_pid == os.getpid():
+            return
+        with self._lock:
+            if self._sampler_pid == os.getpid():
+                return
+            self._sampler_pid = os.getpid()
+            threading.Thread(target=self._sample_loop, name='profiler', daemon=True).start()
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                running = list(self._running)
+            if not running:
+                continue
+            frames = sys._current_frames()
+            for profile in running:
+                with profile._lock:
+                    for ident in profile.threads:
+                        frame = frames.get(ident)
+                        if frame is not None and ident != own:
+                            profile.samples[_collapse(frame)] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            kept = sorted(self._kept, reverse=True)
+        return {
+            'enabled': self.enabled,
+            'mode': self.mode,
+            'profiled': self.profiled,
+            'slowest': [{'endpoint': endpoint, 'ms': round(seconds * 1e3, 3), 'file': path}
+                        for seconds, _, endpoint, path in kept]
+        }
+
+
+def _collapse(frame) -> str:
+    """One stack in collapsed format, outermost frame first"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
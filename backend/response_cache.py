@@ -0,0 +1,100 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+
+class ResponseCache:
+    """Size-bounded LRU cache for formatted responses, with optional TTL"""
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        # Bumped by invalidate(), so values computed from data that changed
+        # meanwhile are not stored
+        self._generation = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], str]) -> str:
+        now = time.monotonic()
+
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                value, expires = item
+                if expires is None or expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            generation = self._generation
+
+        value = compute()
+        expires = now + self.ttl if self.ttl else None
+
+        with self._lock:
+            if generation != self._generation:
+                return value
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+        return value
+
+    def invalidate(self, namespace: Optional[str] = None):
+        """Drop every entry, or only those whose key starts with `namespace`"""
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == namespace]:
+                    del self._entries[key]
+            self.invalidations += 1
+            self._generation += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+def cached_response(namespace: str, key: Optional[Callable[..., tuple]] = None):
+    """Cache a method's return value in the instance's `cache` attribute.
+
+    Keys are (namespace, *args), or (namespace, *key(*args)) when a key
+    normalizer is given. Instances without a cache call straight through.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args):
+            cache = getattr(self, 'cache', None)
+            if cache is None:
+                return func(self, *args)
+            cache_key = (namespace,) + (key(*args) if key else args)
+            return cache.get_or_compute(cache_key, lambda: func(self, *args))
+        return wrapper
+    return decorator
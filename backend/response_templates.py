@@ -0,0 +1,113 @@
+"""Response templates compiled once and rendered per reply.
+
+Templates use str.format syntax. Compiling splits a template into literal
+text and fields, and folds in the fields whose values never change (the
+bot's name and version), so a template left without fields renders as a
+prebuilt string. The remaining fields are filled in when a reply is
+rendered, from providers: functions such as datetime.now that are called
+only for the fields a template uses, once per render.
+"""
+import re
+from datetime import datetime
+from string import Formatter
+from typing import Any, Callable, Dict, Mapping, Tuple, Union
+
+# Providers every engine has
+PROVIDERS: Dict[str, Callable[[], Any]] = {
+    'now': datetime.now,
+}
+
+_FORMATTER = Formatter()
+_ROOT = re.compile(r'[^.\[]*')
+
+# A field: its name as written (including attributes or indexes), the name
+# of its value, format spec and conversion
+Field = Tuple[str, str, str, str]
+
+
+class Template:
+    """A compiled template: literal text interleaved with fields"""
+
+    __slots__ = ('source', 'parts', 'fields', 'text')
+
+    def __init__(self, source: str, parts: Tuple[Union[str, Field], ...]):
+        self.source = source
+        self.parts = parts
+        self.fields = frozenset(part[1] for part in parts if not isinstance(part, str))
+        # Rendering a template without fields returns this string as is
+        self.text = None if self.fields else ''.join(parts)
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        if self.text is not None:
+            return self.text
+        chunks = []
+        for part in self.parts:
+            if isinstance(part, str):
+                chunks.append(part)
+            else:
+                chunks.append(_format_field(part, values))
+        return ''.join(chunks)
+
+    def __repr__(self) -> str:
+        return f"Template({self.source!r})"
+
+
+def _format_field(field: Field, values: Mapping[str, Any]) -> str:
+    name, root, spec, conversion = field
+    if name == root:
+        value = values[name]
+    else:
+        value, _ = _FORMATTER.get_field(name, (), values)
+    if conversion:
+        value = _FORMATTER.convert_field(value, conversion)
+    return format(value, spec)
+
+
+class TemplateEngine:
+    """Compiles templates against constant values and renders them with
+    values from providers"""
+
+    def __init__(self, constants: Mapping[str, Any] = None,
+                 providers: Mapping[str, Callable[[], Any]] = None):
+        self.constants = dict(constants or {})
+        self.providers = dict(PROVIDERS, **(providers or {}))
+
+    def compile(self, source: str) -> Template:
+        """Compile a template; a field that is neither a constant nor
+        provided raises ValueError here rather than on a reply"""
+        parts = []
+        for literal, name, spec, conversion in _FORMATTER.parse(source):
+            if literal:
+                parts.append(literal)
+            if name is None:
+                continue
+            root = _ROOT.match(name).group()
+            if not root or root.isdigit():
+                raise ValueError(f"Template field {{{name}}} must be named: {source!r}")
+            if '{' in spec:
+                raise ValueError(f"Template field {{{name}}} has a nested field in its format: {source!r}")
+            field = (name, root, spec, conversion)
+            if root in self.constants:
+                parts.append(_format_field(field, self.constants))
+            elif root in self.providers:
+                parts.append(field)
+            else:
+                raise ValueError(f"Unknown template field {{{name}}}: {source!r}")
+
+        # Join neighbouring literals, including folded constants
+        merged = []
+        for part in parts:
+            if isinstance(part, str) and merged and isinstance(merged[-1], str):
+                merged[-1] += part
+            else:
+                merged.append(part)
+        return Template(source, tuple(merged))
+
+    def render(self, template: Template, **values) -> str:
+        """Render a template; `values` override the providers for this call"""
+        if template.text is not None:
+            return template.text
+        for name in template.fields:
+            if name not in values:
+                values[name] = self.providers[name]()
+        return template.render(values)
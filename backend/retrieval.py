@@ -0,0 +1,168 @@
+"""BM25 retrieval over the knowledge tables.
+
+Every solution, tip, code example, learning resource and learning path is
+a document. BM25 only needs a term's frequency in a document, the
+document's length and how many documents contain the term, all known when
+the index is built. So each posting stores the term's finished score
+contribution, and a query just sums the postings of its terms. Query
+terms missing from the index are replaced by the closest indexed term, so
+'atribute error' still finds AttributeError.
+"""
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import knowledge
+from knowledge_base import KnowledgeBase
+from solution_index import CAMEL_CASE_PATTERN, iter_error_solutions
+from spelling import SymSpell
+
+WORD_PATTERN = re.compile(r'[A-Za-z0-9]+')
+
+# Words that carry no meaning on their own; BM25 would weight them low
+# anyway, but they still add noise to the scores of short documents
+STOPWORDS = frozenset("""
+    a an and are as at be by can do does for from get got how i in is it its
+    me my of on or so that the this to use used using what when where which
+    why with you your
+""".split())
+
+K1 = 1.2
+B = 0.75
+# Words in a document's title count as if they appeared this many times
+TITLE_WEIGHT = 3
+# Lowest score accepted as an answer. One rare word shared with a short
+# document scores about 3.5 on the shipped tables: enough when the caller
+# already knows what kind of entry it wants, not for open questions.
+MIN_SCORE = 3.0
+MIN_OPEN_SCORE = 4.0
+
+
+class Document(NamedTuple):
+    kind: str                # 'solution', 'tip', 'example', 'resource' or 'path'
+    key: str                 # the key of the entry in its knowledge table
+    domain: Optional[str]
+    title: str
+    text: str
+
+
+def analyze(text: str) -> List[str]:
+    """Lowercase terms of a text, without stopwords.
+
+    CamelCase and snake_case names are split into their words, and a plural
+    's' is dropped, so 'attribute errors' finds AttributeError.
+    """
+    terms = []
+    for word in WORD_PATTERN.findall(text.replace('_', ' ')):
+        if word[-1] == 's' and word[:-1].isupper():
+            # Plural acronym: APIs
+            parts = [word[:-1]]
+        else:
+            parts = CAMEL_CASE_PATTERN.findall(word) or [word]
+        for part in parts:
+            term = part.lower()
+            if len(term) > 3 and term.endswith('s') and not term.endswith('ss'):
+                term = term[:-1]
+            if len(term) > 1 and term not in STOPWORDS:
+                terms.append(term)
+    return terms
+
+
+class BM25Index:
+    """Sparse term index ranking documents with Okapi BM25"""
+
+    def __init__(self, documents: Iterable[Document], k1: float = K1, b: float = B):
+        self.documents: Tuple[Document, ...] = tuple(documents)
+        frequencies = [Counter(analyze(doc.title) * TITLE_WEIGHT + analyze(doc.text))
+                       for doc in self.documents]
+        lengths = [sum(counts.values()) for counts in frequencies]
+        average = sum(lengths) / len(lengths) if lengths else 1.0
+
+        document_counts = Counter(term for counts in frequencies for term in counts)
+        total = len(self.documents)
+        postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for doc_id, counts in enumerate(frequencies):
+            norm = k1 * (1 - b + b * lengths[doc_id] / average)
+            for term, tf in counts.items():
+                df = document_counts[term]
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                postings[term].append((doc_id, idf * tf * (k1 + 1) / (tf + norm)))
+
+        self._postings = {term: tuple(entries) for term, entries in postings.items()}
+        # Terms found in more documents win ties between equally close corrections
+        self._spelling = SymSpell(term for term, _ in document_counts.most_common())
+
+    def query_terms(self, query: str) -> Set[str]:
+        """Terms of the query, each misspelled one replaced by its correction"""
+        terms = set()
+        for term in analyze(query):
+            if term not in self._postings:
+                term = self._spelling.lookup(term)
+            if term is not None:
+                terms.add(term)
+        return terms
+
+    def stats(self) -> Dict:
+        kinds = Counter(doc.kind for doc in self.documents)
+        return {'documents': len(self.documents), 'terms': len(self._postings), 'kinds': dict(kinds)}
+
+    def search(self, query: str, kinds: Optional[Iterable[str]] = None, domain: Optional[str] = None,
+               limit: int = 5) -> List[Tuple[float, Document]]:
+        """Top `limit` documents for the query, optionally of some kinds or one domain"""
+        scores: Dict[int, float] = {}
+        for term in self.query_terms(query):
+            for doc_id, weight in self._postings.get(term, ()):
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+
+        if kinds is not None or domain is not None:
+            kinds = None if kinds is None else frozenset(kinds)
+            documents = self.documents
+            scores = {doc_id: score for doc_id, score in scores.items()
+                      if (kinds is None or documents[doc_id].kind in kinds)
+                      and (domain is None or documents[doc_id].domain == domain)}
+
+        # Ties go to the document that appears first in the knowledge tables
+        ranked = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(score, self.documents[doc_id]) for doc_id, score in ranked]
+
+    def best(self, query: str, kinds: Optional[Iterable[str]] = None, domain: Optional[str] = None,
+             min_score: Optional[float] = None) -> Optional[Document]:
+        """The top document, or None when nothing matches well enough"""
+        if min_score is None:
+            min_score = MIN_OPEN_SCORE if kinds is None else MIN_SCORE
+        results = self.search(query, kinds, domain, limit=1)
+        if results and results[0][0] >= min_score:
+            return results[0][1]
+        return None
+
+
+def iter_documents(base: KnowledgeBase = None) -> Iterator[Document]:
+    """Every entry of the knowledge tables as a document"""
+    base = base or knowledge.TABLES.base
+    solutions, examples = base['solutions'], base['code_examples']
+    resources, paths, learning_tips = base['learning_resources'], base['learning_paths'], base['learning_tips']
+    for domain, error, solution in iter_error_solutions(solutions):
+        yield Document('solution', error, domain, error, solution)
+
+    for domain, domain_data in solutions.items():
+        for i, tip in enumerate(domain_data.get('tips', ())):
+            yield Document('tip', f"{domain}:{i}", domain, domain_data['category'], tip)
+    for i, tip in enumerate(learning_tips):
+        yield Document('tip', f"learning:{i}", 'learning', 'learning tips', tip)
+
+    for topic, code in examples.items():
+        yield Document('example', topic, None, topic, code)
+
+    for key, resource in resources.items():
+        yield Document('resource', key, None, resource['title'],
+                       f"{key} {', '.join(resource['topics'])} {resource['difficulty']}")
+
+    for goal, courses in paths.items():
+        titles = [resources[course]['title'] for course in courses if course in resources]
+        yield Document('path', goal, None, goal, ', '.join(titles))
+
+
+def build_knowledge_index(base: KnowledgeBase = None) -> BM25Index:
+    return BM25Index(iter_documents(base))
@@ -0,0 +1,71 @@
+from typing import Callable, FrozenSet, Iterable, List, Optional
+
+from intent_matcher import KeywordAutomaton
+from metrics import timed
+
+# A handler receives the raw input and the set of keywords found in it, and
+# returns a response or None to let lower-priority routes try
+Handler = Callable[[str, FrozenSet[str]], Optional[str]]
+
+
+class Route:
+
+    def __init__(self, name: str, triggers: Iterable[str], handler: Handler,
+                 priority: int, keywords: Iterable[str] = ()):
+        self.name = name
+        self.triggers = frozenset(t.lower() for t in triggers)
+        self.keywords = frozenset(k.lower() for k in keywords)
+        self.handler = handler
+        self.priority = priority
+
+
+class Router:
+    """Keyword routing table scanned once per message"""
+
+    def __init__(self):
+        self._routes: List[Route] = []
+        self._automaton: Optional[KeywordAutomaton] = None
+
+    def register(self, name: str, triggers: Iterable[str], handler: Handler,
+                 priority: int = 100, keywords: Iterable[str] = ()) -> Route:
+        """Register a handler.
+
+        The handler is called when any trigger occurs in the input. A route
+        without triggers is a catch-all. `keywords` lists extra phrases the
+        handler inspects, so they are detected in the same pass.
+        """
+        route = Route(name, triggers, handler, priority, keywords)
+        self._routes.append(route)
+        # sort() is stable, so routes with equal priority keep registration order
+        self._routes.sort(key=lambda r: r.priority)
+        self._automaton = None
+        return route
+
+    @property
+    def routes(self) -> List[Route]:
+        return list(self._routes)
+
+    def _compile(self) -> KeywordAutomaton:
+        keywords = set()
+        for route in self._routes:
+            keywords |= route.triggers | route.keywords
+        self._automaton = KeywordAutomaton(sorted(keywords))
+        return self._automaton
+
+    @timed('intent')
+    def match(self, user_input: str) -> FrozenSet[str]:
+        """Every trigger and keyword that occurs in the input"""
+        automaton = self._automaton or self._compile()
+        return automaton.matches(user_input.lower())
+
+    def dispatch(self, user_input: str) -> Optional[str]:
+        hits = self.match(user_input)
+
+        for route in self._routes:
+            if route.triggers and route.triggers.isdisjoint(hits):
+                continue
+            response = route.handler(user_input, hits)
+            if response is not None:
+                return response
+
+        return None
@@ -0,0 +1,173 @@
+"""Shared knowledge services.
+
+One Services container is built per process and handed to every consumer
+(the Flask and ASGI routes and the Chatbot), so each knowledge component
+and the retrieval index over the knowledge tables are built once and the
+counters cover all traffic.
+
+reload() rebuilds every component's tables and indexes from the current
+knowledge files while requests keep being served from the old ones, then
+swaps them in. Each component replaces a single reference, so a request
+sees either the old tables or the new ones, never a mix. With a
+reload_interval, watch() polls the files and reloads when they change.
+
+When a server imports the app before forking workers (gunicorn --preload),
+call freeze() once everything is built: the objects created so far move
+to the garbage collector's permanent generation, so collections in the
+workers do not write to their pages and the memory stays shared.
+"""
+import gc
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import knowledge
+import knowledge_base
+from chatbot_utils import ChatbotUtils
+from code_analyzer import CodeAnalyzer
+from learning_resources import LearningResources
+from problem_solver import ProblemSolver
+from response_cache import ResponseCache
+from retrieval import BM25Index, build_knowledge_index
+
+logger = logging.getLogger(__name__)
+
+
+class Services:
+    """Builds each knowledge component once; pass prebuilt ones to configure them"""
+
+    def __init__(self, response_cache: Optional[ResponseCache] = None,
+                 problem_solver: Optional[ProblemSolver] = None,
+                 code_analyzer: Optional[CodeAnalyzer] = None,
+                 learning_resources: Optional[LearningResources] = None,
+                 retrieval: Optional[BM25Index] = None, reload_interval: float = 0):
+        self.response_cache = response_cache
+        self.knowledge = knowledge.TABLES.base
+        self.retrieval = retrieval or build_knowledge_index(self.knowledge)
+        self.problem_solver = problem_solver or ProblemSolver(cache=response_cache, retrieval=self.retrieval)
+        self.code_analyzer = code_analyzer or CodeAnalyzer()
+        self.learning_resources = learning_resources or LearningResources(retrieval=self.retrieval)
+        self.utils = ChatbotUtils()
+        self.frozen = 0
+
+        # Components rebuilt on reload; each has build() and install()
+        self.components: List = [self.problem_solver, self.learning_resources]
+        self.reload_interval = reload_interval
+        self.reloads = 0
+        self.loaded_at = datetime.now().isoformat()
+        self._reload_lock = threading.Lock()
+        self._files = self._file_times()
+        self._watcher_pid: Optional[int] = None
+
+    def attach(self, component):
+        """Rebuild `component`'s tables on every reload"""
+        self.components.append(component)
+
+    def reload(self, base: Optional[knowledge_base.KnowledgeBase] = None) -> bool:
+        """Swap in the tables of the current knowledge files; False if their content is unchanged"""
+        with self._reload_lock:
+            before = self._file_times()
+            try:
+                base = base or knowledge_base.load(knowledge.SOURCE, knowledge.COMPILED)
+            finally:
+                # Loading recompiles the compiled file, which is not a change to
+                # react to; a source edit made during the load is seen next poll
+                after = self._file_times()
+                self._files = after if after[0] == before[0] else before
+            if base.version == self.knowledge.version:
+                return False
+
+            # Build everything first; the running tables keep serving meanwhile
+            retrieval = build_knowledge_index(base)
+            built = [(component, component.build(base, retrieval)) for component in self.components]
+
+            knowledge.install(base)
+            self.knowledge = base
+            self.retrieval = retrieval
+            for component, tables in built:
+                component.install(tables)
+            self.reloads += 1
+            self.loaded_at = datetime.now().isoformat()
+            return True
+
+    def _file_times(self) -> Tuple:
+        times = []
+        for path in (knowledge.SOURCE, knowledge.COMPILED):
+            try:
+                times.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                times.append(None)
+        return tuple(times)
+
+    def watch(self):
+        """Start polling the knowledge files in this process; cheap to call on every request"""
+        if not self.reload_interval or self._watcher_pid == os.getpid():
+            return
+        with self._reload_lock:
+            # Threads do not survive fork, so each worker starts its own
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+            threading.Thread(target=self._watch_loop, name='knowledge-watcher', daemon=True).start()
+
+    def _watch_loop(self):
+        while True:
+            time.sleep(self.reload_interval)
+            if self._file_times() == self._files:
+                continue
+            try:
+                if self.reload():
+                    logger.info('Reloaded knowledge base version %s', self.knowledge.version)
+            except Exception:
+                # A broken edit keeps the current tables until the next change
+                logger.exception('Knowledge reload failed, keeping version %s', self.knowledge.version)
+
+    def knowledge_stats(self) -> Dict:
+        return dict(self.knowledge.stats(), reloads=self.reloads, loaded_at=self.loaded_at,
+                    reload_interval=self.reload_interval)
+
+    def freeze(self):
+        """Exclude everything allocated so far from future garbage collections"""
+        gc.freeze()
+        self.frozen = gc.get_freeze_count()
+
+
+def process_memory() -> Dict:
+    """Memory of the current process in kB.
+
+    `private` is memory no other process maps (what one more worker
+    costs); `pss` splits shared pages evenly between the processes
+    sharing them. Both come from Linux /proc; elsewhere only the peak RSS
+    is known.
+    """
+    report = {'pid': os.getpid()}
+    fields = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(':'):
+                    fields[parts[0][:-1]] = int(parts[1])
+    except (OSError, ValueError):
+        fields = {}
+
+    if fields:
+        report['rss_kb'] = fields.get('Rss', 0)
+        report['pss_kb'] = fields.get('Pss', 0)
+        report['private_kb'] = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+        report['shared_kb'] = fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)
+    else:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kB elsewhere
+        report['max_rss_kb'] = peak // 1024 if sys.platform == 'darwin' else peak
+    return report
+
+
+def format_memory(report: Dict) -> str:
+    parts = [f"{key[:-3]}={value / 1024:.1f}MB" for key, value in report.items() if key.endswith('_kb')]
+    return f"worker {report['pid']} memory: {', '.join(parts)}"
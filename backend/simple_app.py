@@ -1,12 +1,17 @@
+import os
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from simple_chatbot import SimpleChatbot
+from history_store import HistoryStore
 
 app = Flask(__name__)
 CORS(app)
 
 chatbot = SimpleChatbot()
-conversation_history = []
+conversation_history = HistoryStore(
+    max_entries=int(os.environ.get('HISTORY_MAX_ENTRIES', 1000)),
+    max_bytes=int(os.environ.get('HISTORY_MAX_BYTES', 1024 * 1024))
+)
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
@@ -76,13 +81,12 @@ def get_definition():
 def get_history():
     return jsonify({
         'status': 'success',
-        'history': conversation_history[-50:]
+        'history': conversation_history.recent(50)
     }), 200
 
 @app.route('/api/clear', methods=['POST'])
 def clear_history():
-    global conversation_history
-    conversation_history = []
+    conversation_history.clear()
     return jsonify({'status': 'success', 'message': 'History cleared'}), 200
 
 if __name__ == '__main__':
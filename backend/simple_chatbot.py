@@ -1,6 +1,62 @@
 import random
 import math
-from datetime import datetime
+import knowledge
+from response_templates import TemplateEngine
+
+HELP_MENU = """
+╔══════════════════════════════════════════════════════════╗
+║     {name} - Help Menu
+║     Created by {author}
+╚══════════════════════════════════════════════════════════╝
+
+📚 AVAILABLE FEATURES:
+
+1️⃣ JOKES & FUN
+   - "Tell me a joke"
+   - "Make me laugh"
+   - "Funny"
+
+2️⃣ MATHEMATICS
+   - Addition: "5 + 3"
+   - Subtraction: "10 - 2"
+   - Multiplication: "5 * 4"
+   - Division: "20 / 4"
+   - Square: "square 9"
+   - Square Root: "sqrt 16"
+
+3️⃣ DICTIONARY & DEFINITIONS
+   - "definition of python"
+   - "what is algorithm"
+   - "meaning of api"
+   - "what does database mean"
+
+4️⃣ TIME & DATE
+   - "what time is it"
+   - "what's the date"
+   - "current time"
+   - "today"
+
+5️⃣ INFORMATION
+   - "who are you"
+   - "what can you do"
+   - "help"
+   - "features"
+
+6️⃣ GREETINGS
+   - "hello" / "hi"
+   - "goodbye" / "bye"
+   - "good morning"
+
+💡 EXAMPLE CONVERSATIONS:
+   • User: "Tell me a joke" → Bot tells a programming joke
+   • User: "5 + 3" → Bot: "Result: 8"
+   • User: "definition of python" → Bot: Shows definition
+   • User: "square 7" → Bot: "Square of 7 is 49"
+   • User: "what time is it" → Bot: Shows current time
+
+Need help? Just type "help" anytime!
+        """
+
 
 class SimpleChatbot:
     def __init__(self):
@@ -8,6 +64,17 @@ class SimpleChatbot:
         self.version = "1.0"
         self.author = "Alok Pradhan"
         self.created = "December 9, 2024"
+        # Fixed replies are compiled once; {now:...} is filled in per reply
+        self.templates = TemplateEngine({'name': self.name, 'version': self.version,
+                                         'author': self.author, 'created': self.created})
+        self.replies = {
+            'greeting': self.templates.compile("Hello! I'm {name}. How can I help you today?"),
+            'time': self.templates.compile("Current time: {now:%H:%M:%S}"),
+            'date': self.templates.compile("Today is: {now:%A, %B %d, %Y}"),
+            'about': self.templates.compile("I'm {name} v{version}\nCreated by {author}\nDate: {created}\n"
+                                            "A professional AI assistant by Alok Pradhan"),
+            'help': self.templates.compile(HELP_MENU)
+        }
     
     def get_response(self, user_input):
         user_input_lower = user_input.lower().strip()
@@ -16,7 +83,7 @@ class SimpleChatbot:
             return "Please say something!"
         
         if any(word in user_input_lower for word in ['hello', 'hi', 'hey', 'greetings']):
-            return f"Hello! I'm {self.name}. How can I help you today?"
+            return self.templates.render(self.replies['greeting'])
         
         if any(word in user_input_lower for word in ['bye', 'goodbye', 'see you', 'farewell']):
             return "Goodbye! Have a great day!"
@@ -31,13 +98,13 @@ class SimpleChatbot:
             return self.handle_dictionary(user_input)
         
         if 'time' in user_input_lower or 'what time' in user_input_lower:
-            return f"Current time: {datetime.now().strftime('%H:%M:%S')}"
+            return self.templates.render(self.replies['time'])
         
         if 'date' in user_input_lower or 'today' in user_input_lower:
-            return f"Today is: {datetime.now().strftime('%A, %B %d, %Y')}"
+            return self.templates.render(self.replies['date'])
         
         if any(word in user_input_lower for word in ['name', 'who are you', 'your name', 'creator', 'author']):
-            return f"I'm {self.name} v{self.version}\nCreated by {self.author}\nDate: {self.created}\nA professional AI assistant by Alok Pradhan"
+            return self.templates.render(self.replies['about'])
         
         if 'help' in user_input_lower or 'what can you do' in user_input_lower:
             return self.get_help()
@@ -45,17 +112,7 @@ class SimpleChatbot:
         return self.get_default_response()
     
     def tell_joke(self):
-        jokes = [
-            "Why did the programmer quit his job? Because he didn't get arrays!",
-            "Why do programmers prefer dark mode? Because light attracts bugs!",
-            "How many programmers does it take to change a light bulb? None, that's a hardware problem!",
-            "Why did Python go to the gym? To get more fit!",
-            "What do you call a programmer from Finland? Nerdic!",
-            "Why do Java developers wear glasses? Because they don't C#!",
-            "How many MySQL developers does it take to change a light bulb? None, that's a database problem!",
-            "What's the object-oriented way to become wealthy? Inheritance!"
-        ]
-        return random.choice(jokes)
+        return random.choice(knowledge.TABLES.jokes)
     
     def handle_math(self, user_input):
         try:
@@ -115,28 +172,8 @@ class SimpleChatbot:
             return False
     
     def handle_dictionary(self, user_input):
-        dictionary = {
-            'python': 'A high-level programming language known for its simplicity.',
-            'algorithm': 'A step-by-step procedure for solving a problem.',
-            'variable': 'A named location in memory that stores a value.',
-            'function': 'A reusable block of code that performs a specific task.',
-            'loop': 'A control structure that repeats a block of code.',
-            'data': 'Information or facts collected for analysis.',
-            'database': 'An organized collection of structured data.',
-            'api': 'Application Programming Interface - a way for software to communicate.',
-            'bug': 'An error or flaw in a program.',
-            'debug': 'The process of finding and fixing errors in code.',
-            'array': 'A collection of elements stored in a single variable.',
-            'dictionary': 'A collection of key-value pairs.',
-            'string': 'A sequence of characters.',
-            'integer': 'A whole number without decimal points.',
-            'boolean': 'A data type with only two values: True or False.',
-            'cloud': 'Remote servers accessed over the internet.',
-            'server': 'A computer that provides resources or services to other computers.',
-            'client': 'A computer or software that requests services from a server.',
-            'cache': 'Fast storage used to reduce access time to data.',
-            'encryption': 'The process of converting data into a code to prevent unauthorized access.'
-        }
+        tables = knowledge.TABLES
+        dictionary = tables.dictionary
         
         word_to_find = None
         for word in user_input.lower().split():
@@ -147,71 +184,10 @@ class SimpleChatbot:
         if word_to_find:
             return f"**{word_to_find.capitalize()}**: {dictionary[word_to_find]}"
         
-        available = ', '.join(list(dictionary.keys())[:10]) + '...'
-        return f"Available words: {available}\nTry asking 'definition of python' or 'what is algorithm'"
+        return f"Available words: {tables.dictionary_sample}\nTry asking 'definition of python' or 'what is algorithm'"
     
     def get_help(self):
-        return f"""
-╔══════════════════════════════════════════════════════════╗
-║     {self.name} - Help Menu
-║     Created by {self.author}
-╚══════════════════════════════════════════════════════════╝
-
-📚 AVAILABLE FEATURES:
-
-1️⃣ JOKES & FUN
-   - "Tell me a joke"
-   - "Make me laugh"
-   - "Funny"
-
-2️⃣ MATHEMATICS
-   - Addition: "5 + 3"
-   - Subtraction: "10 - 2"
-   - Multiplication: "5 * 4"
-   - Division: "20 / 4"
-   - Square: "square 9"
-   - Square Root: "sqrt 16"
-
-3️⃣ DICTIONARY & DEFINITIONS
-   - "definition of python"
-   - "what is algorithm"
-   - "meaning of api"
-   - "what does database mean"
-
-4️⃣ TIME & DATE
-   - "what time is it"
-   - "what's the date"
-   - "current time"
-   - "today"
-
-5️⃣ INFORMATION
-   - "who are you"
-   - "what can you do"
-   - "help"
-   - "features"
-
-6️⃣ GREETINGS
-   - "hello" / "hi"
-   - "goodbye" / "bye"
-   - "good morning"
-
-💡 EXAMPLE CONVERSATIONS:
-   • User: "Tell me a joke" → Bot tells a programming joke
-   • User: "5 + 3" → Bot: "Result: 8"
-   • User: "definition of python" → Bot: Shows definition
-   • User: "square 7" → Bot: "Square of 7 is 49"
-   • User: "what time is it" → Bot: Shows current time
-
-Need help? Just type "help" anytime!
-        """
+        return self.templates.render(self.replies['help'])
     
     def get_default_response(self):
-        responses = [
-            "That's interesting! Tell me more.",
-            "I see. Could you elaborate?",
-            "Interesting! Do you need help with anything?",
-            "I'm here to help! Ask me about math, jokes, or definitions.",
-            "Can you rephrase that? Or try asking me a joke!",
-            "Got it! Do you want help with math or a joke?"
-        ]
-        return random.choice(responses)
+        return random.choice(knowledge.TABLES.small_talk)
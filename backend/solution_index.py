@@ -0,0 +1,125 @@
+import math
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9_]+')
+CAMEL_CASE_PATTERN = re.compile(r'[A-Z]?[a-z0-9]+|[A-Z]+(?![a-z])')
+
+# A problem that names the error outranks one that only shares words with
+# the explanation
+NAME_WEIGHT = 10.0
+TEXT_WEIGHT = 1.0
+# Bonus for entries in the domain the problem's keywords point to
+DOMAIN_WEIGHT = 5.0
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def iter_error_solutions(solutions) -> Iterator[Tuple[str, str, str]]:
+    """Yield (domain, error name, solution) for every known error in a solutions table"""
+    for domain, domain_data in solutions.items():
+        problems = domain_data.get('problems')
+        if not problems:
+            continue
+        table = problems['solutions'] if 'solutions' in problems else problems
+        for error, solution in table.items():
+            yield domain, error, solution
+
+
+def query_tokens(text: str) -> set:
+    """Tokens of a user problem, with a plural 's' also tried without it"""
+    tokens = set()
+    for token in tokenize(text):
+        tokens.add(token)
+        if len(token) > 3 and token.endswith('s'):
+            tokens.add(token[:-1])
+    return tokens
+
+
+class SolutionIndex:
+    """Token-level inverted index over error names and their solutions"""
+
+    def __init__(self, entries: Iterable[Tuple[str, str, str]]):
+        # entries are (domain, error name, solution text)
+        self.entries: List[Tuple[str, str, str]] = list(entries)
+        self._name_postings: Dict[str, List[int]] = defaultdict(list)
+        self._part_postings: Dict[str, List[int]] = defaultdict(list)
+        self._part_counts: List[int] = []
+        self._text_postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+
+        for entry_id, (domain, name, solution) in enumerate(self.entries):
+            for token in set(tokenize(name)):
+                self._name_postings[token].append(entry_id)
+
+            # 'AttributeError' is also found as 'attribute error', but only
+            # when every part is present, so a bare 'error' matches nothing
+            parts = {token for part in CAMEL_CASE_PATTERN.findall(name) for token in tokenize(part)}
+            self._part_counts.append(len(parts) if len(parts) > 1 else 0)
+            if len(parts) > 1:
+                for token in parts:
+                    self._part_postings[token].append(entry_id)
+
+            for token in set(tokenize(solution)):
+                self._text_postings[token][entry_id] = TEXT_WEIGHT
+
+        # Rare explanation words say more about a match than common ones
+        total = max(len(self.entries), 1)
+        for token, postings in self._text_postings.items():
+            idf = math.log(1 + total / len(postings))
+            for entry_id in postings:
+                postings[entry_id] *= idf
+
+        self._name_postings = dict(self._name_postings)
+        self._part_postings = dict(self._part_postings)
+        self._text_postings = dict(self._text_postings)
+
+    def search(self, problem: str, domain: Optional[str] = None, limit: int = 5,
+               prefer_domain: Optional[str] = None) -> List[Tuple[float, Tuple[str, str, str]]]:
+        """Rank entries whose name is mentioned in the problem.
+
+        Only entries with a name hit are candidates. `domain` restricts the
+        search to one domain; otherwise entries in `prefer_domain` and those
+        sharing explanation words with the problem rank higher.
+        """
+        tokens = query_tokens(problem)
+        scores: Dict[int, float] = {}
+        matched_parts: Dict[int, int] = {}
+
+        for token in tokens:
+            for entry_id in self._name_postings.get(token, ()):
+                scores[entry_id] = NAME_WEIGHT
+            for entry_id in self._part_postings.get(token, ()):
+                matched_parts[entry_id] = matched_parts.get(entry_id, 0) + 1
+
+        for entry_id, count in matched_parts.items():
+            if count == self._part_counts[entry_id]:
+                scores[entry_id] = NAME_WEIGHT
+
+        if domain is not None:
+            scores = {entry_id: score for entry_id, score in scores.items()
+                      if self.entries[entry_id][0] == domain}
+
+        if not scores:
+            return []
+
+        for token in tokens:
+            for entry_id, weight in self._text_postings.get(token, {}).items():
+                if entry_id in scores:
+                    scores[entry_id] += weight
+
+        if prefer_domain is not None:
+            for entry_id in scores:
+                if self.entries[entry_id][0] == prefer_domain:
+                    scores[entry_id] += DOMAIN_WEIGHT
+
+        # Ties go to the entry that appears first in the knowledge tables
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [(score, self.entries[entry_id]) for entry_id, score in ranked]
+
+    def best(self, problem: str, domain: Optional[str] = None,
+             prefer_domain: Optional[str] = None) -> Optional[Tuple[str, str, str]]:
+        results = self.search(problem, domain, limit=1, prefer_domain=prefer_domain)
+        return results[0][1] if results else None
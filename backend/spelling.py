@@ -0,0 +1,100 @@
+"""Typo-tolerant word lookup with a SymSpell deletion index.
+
+Two words within edit distance n share a variant made by deleting at most
+n characters from each. The index maps every such variant of every known
+word to the words it came from, so a lookup generates the few variants of
+the query word and verifies only the words they lead to, instead of
+comparing the query with the whole vocabulary.
+"""
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Set
+
+MAX_DISTANCE = 2
+# Longer words are never corrected: a lookup generates a number of variants
+# quadratic in the word's length and verifies each candidate in linear time
+MAX_WORD_LENGTH = 30
+
+
+def allowed_distance(word: str) -> int:
+    """Typos tolerated in a word: none in short words, where one edit
+    usually makes another real word, and more in longer ones"""
+    if len(word) < 4:
+        return 0
+    if len(word) < 8:
+        return 1
+    return 2
+
+
+def deletes(word: str, distance: int) -> Set[str]:
+    """Every variant of word with up to `distance` characters deleted"""
+    variants = {word}
+    for count in range(1, min(distance, len(word)) + 1):
+        for positions in combinations(range(len(word)), count):
+            variants.add(''.join(char for i, char in enumerate(word) if i not in positions))
+    return variants
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (a swap of neighbours is one edit),
+    or limit + 1 once it is known to exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SymSpell:
+    """Finds the known word closest to a possibly misspelled one"""
+
+    def __init__(self, words: Iterable[str], max_distance: int = MAX_DISTANCE):
+        self.max_distance = max_distance
+        # Earlier words win ties, so callers can list common words first
+        self.words: List[str] = list(dict.fromkeys(words))
+        self._known = frozenset(self.words)
+        self._longest = max(map(len, self.words), default=0)
+        index: Dict[str, List[int]] = {}
+        for word_id, word in enumerate(self.words):
+            for variant in deletes(word, max_distance):
+                index.setdefault(variant, []).append(word_id)
+        self._index = {variant: tuple(word_ids) for variant, word_ids in index.items()}
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._known
+
+    def lookup(self, word: str, max_distance: Optional[int] = None) -> Optional[str]:
+        """The closest known word within max_distance edits, or None"""
+        if word in self._known:
+            return word
+        if max_distance is None:
+            max_distance = allowed_distance(word)
+        max_distance = min(max_distance, self.max_distance)
+        if max_distance == 0:
+            return None
+        # No known word is within max_distance of a word this long
+        if len(word) > min(self._longest + max_distance, MAX_WORD_LENGTH):
+            return None
+
+        best = None
+        best_distance = max_distance + 1
+        checked = set()
+        for variant in deletes(word, max_distance):
+            for word_id in self._index.get(variant, ()):
+                if word_id in checked:
+                    continue
+                checked.add(word_id)
+                distance = edit_distance(word, self.words[word_id], max_distance)
+                if distance < best_distance or (distance == best_distance and best is not None
+                                                and word_id < best):
+                    best, best_distance = word_id, distance
+        return self.words[best] if best is not None else None
@@ -0,0 +1,37 @@
+from analysis_engine import MAX_CATEGORY_ISSUES, MAX_REPORT_ISSUES, AnalysisEngine, count_issues, empty_issues
+from analysis_rules import RULES
+from incremental_analysis import IncrementalAnalyzer
+
+# ast.parse raises RecursionError on the first and MemoryError on the second
+DEEPLY_NESTED = ['1+' * 200000 + '1', '-' * 100000 + '1']
+
+
+def test_deeply_nested_code_is_a_syntax_error():
+    engine = AnalysisEngine(RULES)
+    for code in DEEPLY_NESTED:
+        issues = engine.analyze(code)
+        assert issues['syntax_errors'] == ['Line 1, col 1: Code is nested too deeply to parse']
+
+
+def test_deeply_nested_document_is_a_syntax_error():
+    documents = IncrementalAnalyzer(AnalysisEngine(RULES))
+    for code in DEEPLY_NESTED:
+        result = documents.update('doc', code)
+        assert result['issues']['syntax_errors'] == ['Line 1, col 1: Code is nested too deeply to parse']
+        assert result['blocks'] == {'total': 1, 'reanalyzed': 1}
+
+
+def test_findings_are_capped_per_category_and_report():
+    engine = AnalysisEngine(RULES)
+    issues = engine.analyze('(' * 200000)
+    assert len(issues['syntax_errors']) == MAX_CATEGORY_ISSUES
+    assert issues['suppressed'] == {'syntax_errors': 200000 - MAX_CATEGORY_ISSUES}
+    assert count_issues(issues)['syntax_errors'] == 200000
+
+    # Three categories just under their cap overflow the report
+    lines = ['x = 1; y = 2', 'eval(x)', 'list(x)'] * (MAX_CATEGORY_ISSUES - 1)
+    issues = engine.analyze('\n'.join(lines))
+    assert sum(len(issues[category]) for category in empty_issues()) == MAX_REPORT_ISSUES
+    assert sum(count_issues(issues).values()) == 3 * (MAX_CATEGORY_ISSUES - 1)
+
+    assert 'suppressed' not in engine.analyze('x = 1; y = 2\n')
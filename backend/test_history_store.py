@@ -0,0 +1,98 @@
+import history_store
+from history_store import HistoryStore, SessionHistoryStore, SQLiteHistoryStore
+
+
+def entry(text: str) -> dict:
+    return {'user': text, 'bot': text, 'timestamp': '2024-12-09T00:00:00'}
+
+
+def test_store_evicts_oldest_by_count_and_bytes():
+    store = HistoryStore(max_entries=3, max_bytes=10 ** 6)
+    for i in range(5):
+        store.append(dict(entry(str(i)), id=i))
+    assert [item['id'] for item in store.recent(10)] == [2, 3, 4]
+
+    size = HistoryStore._entry_size(entry('x'))
+    store = HistoryStore(max_entries=100, max_bytes=2 * size)
+    for i in range(5):
+        store.append(entry('x'))
+    assert len(store) == 2
+    assert store.bytes <= 2 * size
+
+
+def test_sessions_are_evicted_when_idle(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(history_store.time, 'monotonic', lambda: now[0])
+    sessions = SessionHistoryStore(idle_ttl=60)
+    sessions.append('a', entry('a'))
+    now[0] += 30
+    sessions.append('b', entry('b'))
+    now[0] += 45
+    # 'a' has been idle for 75s, 'b' for 45s
+    assert sessions.recent('a', 10) == []
+    assert [item['user'] for item in sessions.recent('b', 10)] == ['b']
+    assert sessions.stats()['evicted_sessions'] == 1
+
+
+def test_least_recently_used_session_is_evicted_first():
+    sessions = SessionHistoryStore(max_sessions=2)
+    sessions.append('a', entry('a'))
+    sessions.append('b', entry('b'))
+    sessions.recent('a', 10)
+    sessions.append('c', entry('c'))
+    assert sessions.count('a') == 1
+    assert sessions.count('b') == 0
+    assert sessions.count('c') == 1
+
+
+def test_sessions_are_evicted_over_the_byte_limit():
+    size = HistoryStore._entry_size(dict(entry('x'), id=1))
+    sessions = SessionHistoryStore(max_bytes=3 * size)
+    for session_id in 'abcde':
+        sessions.append(session_id, entry('x'))
+    assert len(sessions) == 3
+    assert sessions.stats()['bytes'] <= 3 * size
+    assert sessions.count('a') == 0 and sessions.count('e') == 1
+
+    sessions.clear('e')
+    assert sessions.stats()['bytes'] == 2 * size
+
+
+def test_each_session_keeps_its_last_entries():
+    sessions = SessionHistoryStore(max_entries_per_session=2)
+    for text in ['1', '2', '3']:
+        sessions.append('a', entry(text))
+    sessions.append('b', entry('other'))
+    assert [item['user'] for item in sessions.recent('a', 10)] == ['2', '3']
+
+
+def test_sqlite_pages_backwards_by_id(tmp_path):
+    store = SQLiteHistoryStore(str(tmp_path / 'history.db'), flush_interval=0.001)
+    try:
+        for i in range(7):
+            store.append('a', entry(str(i)))
+            store.append('b', entry('other'))
+        store.flush()
+        assert store.count('a') == 7
+
+        pages = []
+        before_id = None
+        while True:
+            page = store.recent('a', 3, before_id)
+            pages.append([item['user'] for item in page])
+            if len(page) < 3:
+                break
+            before_id = page[0]['id']
+        # Newest page first; the last page is short
+        assert pages == [['4', '5', '6'], ['1', '2', '3'], ['0']]
+        assert store.recent('a', 3, page[0]['id']) == []
+
+        assert store.recent('a', 0) == []
+        assert store.recent('a', -1) == []
+
+        store.clear('a')
+        store.flush()
+        assert store.count('a') == 0
+        assert store.count('b') == 7
+    finally:
+        store.close()
@@ -0,0 +1,85 @@
+import difflib
+
+import pytest
+
+from analysis_engine import AnalysisEngine
+from analysis_rules import RULES
+from incremental_analysis import IncrementalAnalyzer, apply_diff
+
+BEFORE = '''import os
+
+
+def load(path):
+    data = eval(open(path).read())
+    return data
+
+
+class Store:
+    def keys(self, items):
+        for a in items:
+            for b in items:
+                print(a, b)
+
+
+def save(path, data):
+    open(path, 'w').write(str(data))
+'''
+
+AFTER = '''import os
+
+
+def main():
+    save(os.environ['OUT'], list(load(os.environ['IN'])))
+
+
+def load(path):
+    data = eval(open(path).read())
+    return data
+
+
+class Store:
+    def keys(self, items):
+        for a in items:
+            for b in items:
+                print(a, b); print(b)
+
+
+def save(path, data):
+    open(path, 'w').write(str(data))
+'''
+
+
+def unified_diff(before: str, after: str) -> str:
+    return '\n'.join(difflib.unified_diff(before.split('\n'), after.split('\n'), lineterm=''))
+
+
+def test_apply_diff_reproduces_the_new_text():
+    assert apply_diff(BEFORE, unified_diff(BEFORE, AFTER)) == AFTER
+    assert apply_diff(AFTER, unified_diff(AFTER, BEFORE)) == BEFORE
+    assert apply_diff(BEFORE, '') == BEFORE
+
+
+def test_apply_diff_rejects_a_diff_against_other_text():
+    with pytest.raises(ValueError):
+        apply_diff(AFTER, unified_diff(BEFORE, AFTER))
+
+
+def test_diff_update_matches_a_full_reanalysis():
+    engine = AnalysisEngine(RULES)
+    documents = IncrementalAnalyzer(engine)
+    documents.update('doc', BEFORE)
+    result = documents.update('doc', diff=unified_diff(BEFORE, AFTER))
+
+    fresh = IncrementalAnalyzer(AnalysisEngine(RULES)).update('doc', AFTER)
+    assert result['issues'] == fresh['issues']
+    assert result['suggestions'] == fresh['suggestions']
+    assert result['issues'] == engine.analyze(AFTER)
+    # Only the edited class and the new function are analyzed again; the
+    # findings of blocks that moved down are reused at their new lines
+    assert result['blocks'] == {'total': 5, 'reanalyzed': 2}
+
+
+def test_diff_to_an_unknown_document_raises():
+    documents = IncrementalAnalyzer(AnalysisEngine(RULES))
+    with pytest.raises(KeyError):
+        documents.update('missing', diff=unified_diff(BEFORE, AFTER))
@@ -0,0 +1,93 @@
+import json
+import os
+from types import MappingProxyType
+
+import pytest
+
+from knowledge_base import KnowledgeBase, LazyList, LazyMapping, compile_file, compile_tables, load
+
+TABLES = {
+    'solutions': {'python': {'title': 'Python', 'tips': ['Read the traceback']}, 'web': {'title': 'Web'}},
+    'jokes': ['one', 'two', 'three']
+}
+
+
+def write_source(path, tables):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(tables, f)
+
+
+def test_tables_survive_compilation_frozen():
+    base = KnowledgeBase(compile_tables(TABLES))
+    assert base.lazy_tables == 0
+    assert isinstance(base['solutions'], MappingProxyType)
+    assert base['solutions']['python'] == {'title': 'Python', 'tips': ('Read the traceback',)}
+    assert base['jokes'] == ('one', 'two', 'three')
+    with pytest.raises(TypeError):
+        base['solutions']['python']['title'] = 'changed'
+
+
+def test_large_tables_are_decoded_on_first_access():
+    base = KnowledgeBase(compile_tables(TABLES), eager_bytes=0)
+    assert base.lazy_tables == 2
+    assert isinstance(base['solutions'], LazyMapping) and isinstance(base['jokes'], LazyList)
+    assert base.decoded == 0
+
+    assert base['jokes'][1] == 'two'
+    assert base['jokes'][1] == 'two'
+    assert base.decoded == 1
+    assert list(base['solutions']) == ['python', 'web']
+    assert dict(base['solutions'])['web'] == {'title': 'Web'}
+    assert list(base['jokes']) == ['one', 'two', 'three']
+
+
+def test_version_identifies_the_content():
+    first = KnowledgeBase(compile_tables(TABLES)).version
+    assert KnowledgeBase(compile_tables(json.loads(json.dumps(TABLES)))).version == first
+    assert KnowledgeBase(compile_tables(dict(TABLES, jokes=['one']))).version != first
+
+
+def test_invalid_input_is_rejected():
+    with pytest.raises(ValueError):
+        compile_tables({'name': 'not a table'})
+    with pytest.raises(ValueError):
+        KnowledgeBase(b'\0' * 64)
+
+
+def test_load_compiles_only_when_the_source_is_newer(tmp_path):
+    source, compiled = str(tmp_path / 'knowledge.json'), str(tmp_path / 'knowledge.kb')
+    write_source(source, TABLES)
+
+    base = load(source, compiled)
+    assert os.path.exists(compiled)
+    assert base.stats()['mapped']
+    compiled_mtime = os.stat(compiled).st_mtime_ns
+    assert load(source, compiled).version == base.version
+    assert os.stat(compiled).st_mtime_ns == compiled_mtime
+
+    write_source(source, dict(TABLES, jokes=['four']))
+    os.utime(source, ns=(compiled_mtime + 10 ** 9, compiled_mtime + 10 ** 9))
+    reloaded = load(source, compiled)
+    assert reloaded.version != base.version
+    assert reloaded['jokes'] == ('four',)
+    # The tables already open keep reading the file they mapped
+    assert base['jokes'] == ('one', 'two', 'three')
+
+
+def test_load_falls_back_to_memory_when_the_output_is_not_writable(tmp_path):
+    source = str(tmp_path / 'knowledge.json')
+    write_source(source, TABLES)
+    base = load(source, str(tmp_path / 'missing' / 'knowledge.kb'))
+    assert not base.stats()['mapped']
+    assert base['jokes'] == ('one', 'two', 'three')
+
+
+def test_compile_file_writes_the_compiled_tables(tmp_path):
+    source, compiled = str(tmp_path / 'knowledge.json'), str(tmp_path / 'knowledge.kb')
+    write_source(source, TABLES)
+    data = compile_file(source, compiled)
+    with open(compiled, 'rb') as f:
+        assert f.read() == data
+    assert KnowledgeBase.open(compiled).version == KnowledgeBase(data).version
+    # No temporary file is left behind
+    assert sorted(os.listdir(tmp_path)) == ['knowledge.json', 'knowledge.kb']
@@ -0,0 +1,73 @@
+import multiprocessing
+import threading
+
+from metrics import Counter, Histogram, MetricsRegistry, ThreadCells, summarize_histogram
+
+
+def make_registry(directory=None):
+    registry = MetricsRegistry(directory=directory, flush_interval=60)
+    requests = registry.register(Counter('requests_total', 'Requests', labelnames=('status',)))
+    latency = registry.register(Histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0)))
+    return registry, requests, latency
+
+
+def test_counts_from_many_threads_add_up():
+    registry, requests, latency = make_registry()
+
+    def work():
+        for _ in range(1000):
+            requests.labels('200').inc()
+            latency.observe(0.05)
+
+    # More threads than FOLD_THRESHOLD, so finished threads' cells are merged
+    for _ in range(ThreadCells.FOLD_THRESHOLD // 8 + 2):
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    total = (ThreadCells.FOLD_THRESHOLD // 8 + 2) * 8 * 1000
+    values = registry.local()
+    assert values['requests_total{status="200"}'] == total
+    assert values['latency_seconds_bucket{le="0.1"}'] == total
+    assert values['latency_seconds_count'] == total
+
+
+def _child(registry, requests, latency, count):
+    registry.start()
+    for _ in range(count):
+        requests.labels('200').inc()
+        latency.observe(0.5)
+    registry.publish()
+
+
+def test_totals_are_summed_over_processes(tmp_path):
+    registry, requests, latency = make_registry(str(tmp_path))
+    registry.start()
+    requests.labels('500').inc(2)
+    latency.observe(0.05)
+
+    context = multiprocessing.get_context('fork')
+    children = [context.Process(target=_child, args=(registry, requests, latency, count))
+                for count in (3, 4)]
+    for child in children:
+        child.start()
+    for child in children:
+        child.join()
+        assert child.exitcode == 0
+
+    # Forked children count from zero, so the parent's samples are not doubled
+    assert registry.local()['requests_total{status="500"}'] == 2
+    assert registry.processes() == 3
+    totals = registry.aggregate()
+    assert totals['requests_total{status="200"}'] == 7
+    assert totals['requests_total{status="500"}'] == 2
+    assert totals['latency_seconds_bucket{le="0.1"}'] == 1
+    assert totals['latency_seconds_bucket{le="1.0"}'] == 8
+    assert totals['latency_seconds_count'] == 8
+
+    summary = summarize_histogram('latency_seconds', totals)
+    assert summary['']['requests'] == 8
+    assert summary['']['mean_ms'] == round((0.05 + 7 * 0.5) / 8 * 1e3, 3)
+    assert 'requests_total{status="200"} 7' in registry.exposition(totals)
@@ -0,0 +1,78 @@
+import response_cache
+from response_cache import ResponseCache, cached_response
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, 'monotonic', lambda: now[0])
+    cache = ResponseCache(ttl=10)
+    calls = []
+
+    def compute():
+        calls.append(now[0])
+        return f'value {len(calls)}'
+
+    assert cache.get_or_compute(('ns', 1), compute) == 'value 1'
+    now[0] += 9
+    assert cache.get_or_compute(('ns', 1), compute) == 'value 1'
+    now[0] += 2
+    assert cache.get_or_compute(('ns', 1), compute) == 'value 2'
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['expirations']) == (1, 2, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.get_or_compute(('ns', 'a'), lambda: 'a')
+    cache.get_or_compute(('ns', 'b'), lambda: 'b')
+    cache.get_or_compute(('ns', 'a'), lambda: 'unused')
+    cache.get_or_compute(('ns', 'c'), lambda: 'c')
+    assert cache.get_or_compute(('ns', 'a'), lambda: 'recomputed') == 'a'
+    assert cache.get_or_compute(('ns', 'b'), lambda: 'recomputed') == 'recomputed'
+    assert cache.stats()['evictions'] == 2
+
+
+def test_invalidate_drops_a_namespace():
+    cache = ResponseCache()
+    cache.get_or_compute(('solution', 'x'), lambda: 'old')
+    cache.get_or_compute(('example', 'x'), lambda: 'kept')
+    cache.invalidate('solution')
+    assert cache.get_or_compute(('solution', 'x'), lambda: 'new') == 'new'
+    assert cache.get_or_compute(('example', 'x'), lambda: 'unused') == 'kept'
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_value_computed_across_an_invalidation_is_not_stored():
+    cache = ResponseCache()
+
+    def compute():
+        # The data changes while this value is being computed
+        cache.invalidate()
+        return 'stale'
+
+    assert cache.get_or_compute(('ns', 1), compute) == 'stale'
+    assert cache.get_or_compute(('ns', 1), lambda: 'fresh') == 'fresh'
+    assert cache.get_or_compute(('ns', 1), lambda: 'unused') == 'fresh'
+
+
+def test_cached_response_keys_by_namespace_and_arguments():
+    class Solver:
+        def __init__(self, cache):
+            self.cache = cache
+            self.calls = 0
+
+        @cached_response('answer', key=lambda text: (text.lower(),))
+        def answer(self, text):
+            self.calls += 1
+            return text.upper()
+
+    solver = Solver(ResponseCache())
+    assert solver.answer('Hello') == 'HELLO'
+    assert solver.answer('hello') == 'HELLO'
+    assert solver.calls == 1
+
+    uncached = Solver(None)
+    uncached.answer('hello')
+    uncached.answer('hello')
+    assert uncached.calls == 2
@@ -0,0 +1,43 @@
+from router import Router
+
+
+def handler(name, answer=True):
+    def handle(user_input, hits):
+        return f'{name}: {sorted(hits)}' if answer else None
+    return handle
+
+
+def test_lowest_priority_number_wins():
+    router = Router()
+    router.register('menu', ['help'], handler('menu'), priority=70)
+    router.register('problem', ['help with', 'error'], handler('problem'), priority=10)
+    assert router.dispatch('Help with this ERROR') == "problem: ['error', 'help', 'help with']"
+    assert router.dispatch('help') == "menu: ['help']"
+
+
+def test_equal_priorities_keep_registration_order():
+    router = Router()
+    router.register('first', ['code'], handler('first'), priority=5)
+    router.register('second', ['code'], handler('second'), priority=5)
+    router.register('early', ['code'], handler('early'), priority=1)
+    assert [route.name for route in router.routes] == ['early', 'first', 'second']
+    assert router.dispatch('code').startswith('early')
+
+
+def test_declined_input_falls_through_to_the_catch_all():
+    router = Router()
+    router.register('declines', ['tips'], handler('declines', answer=False), priority=10)
+    router.register('fallback', [], handler('fallback'), priority=1000)
+    assert router.dispatch('any tips?') == "fallback: ['tips']"
+    assert router.dispatch('nothing matches') == 'fallback: []'
+
+
+def test_keywords_are_matched_without_triggering():
+    router = Router()
+    router.register('learning', ['learn'], handler('learning'), priority=10, keywords=['path for'])
+    assert router.dispatch('a path for me') is None
+    assert router.dispatch('learn a path for me') == "learning: ['learn', 'path for']"
+
+    # Routes registered later are matched too
+    router.register('example', ['example'], handler('example'), priority=5)
+    assert router.dispatch('learn by example') == "example: ['example', 'learn']"
@@ -0,0 +1,50 @@
+import json
+import os
+import shutil
+
+import knowledge
+from response_cache import ResponseCache
+from services import Services
+
+
+def edit_source(path, edit):
+    with open(path, encoding='utf-8') as f:
+        tables = json.load(f)
+    edit(tables)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(tables, f)
+    # Newer than the compiled file even on filesystems with coarse timestamps
+    mtime = os.stat(path).st_mtime_ns + 2 * 10 ** 9
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_reload_swaps_in_edited_tables(tmp_path, monkeypatch):
+    source, compiled = str(tmp_path / 'knowledge.json'), str(tmp_path / 'knowledge.kb')
+    shutil.copy(knowledge.SOURCE, source)
+    monkeypatch.setattr(knowledge, 'SOURCE', source)
+    monkeypatch.setattr(knowledge, 'COMPILED', compiled)
+    # install() replaces the module's snapshot; restore it afterwards
+    monkeypatch.setattr(knowledge, 'TABLES', knowledge.TABLES)
+
+    cache = ResponseCache()
+    services = Services(response_cache=cache)
+    version = services.knowledge.version
+    # Same content as the shipped tables, so nothing to swap in
+    assert services.reload() is False
+    assert services._file_times() == services._files
+
+    cache.get_or_compute(('solution', 'python'), lambda: 'cached answer')
+    edit_source(source, lambda tables: tables['solutions']['python'].update(category='Edited'))
+    assert services._file_times() != services._files
+    assert services.reload() is True
+
+    tables = knowledge.TABLES
+    assert tables.base is services.knowledge
+    assert tables.base.version != version
+    assert tables.solutions['python']['category'] == 'Edited'
+    assert services.problem_solver.solutions['python']['category'] == 'Edited'
+    assert len(cache) == 0
+    assert services.reloads == 1
+    # Recompiling knowledge.kb is not an edit the watcher should react to
+    assert services._file_times() == services._files
+    assert services.reload() is False
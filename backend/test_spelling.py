@@ -0,0 +1,38 @@
+import time
+
+from spelling import MAX_WORD_LENGTH, SymSpell, edit_distance
+
+WORDS = ['python', 'function', 'variable', 'encapsulation', 'exception', 'class']
+
+
+def test_corrections():
+    spelling = SymSpell(WORDS)
+    assert spelling.lookup('python') == 'python'
+    assert spelling.lookup('pyhton') == 'python'
+    assert spelling.lookup('fnction') == 'function'
+    assert spelling.lookup('encapsulaton') == 'encapsulation'
+    assert spelling.lookup('varaibel') == 'variable'
+    # Short words are never corrected, and no word is closer than two edits
+    assert spelling.lookup('cls') is None
+    assert spelling.lookup('exceptionxyz') is None
+
+
+def test_earlier_words_win_ties():
+    assert SymSpell(['cart', 'card']).lookup('carx') == 'cart'
+    assert SymSpell(['card', 'cart']).lookup('carx') == 'card'
+
+
+def test_edit_distance():
+    assert edit_distance('abcd', 'abdc', 2) == 1
+    assert edit_distance('kitten', 'sitting', 3) == 3
+    assert edit_distance('kitten', 'sitting', 2) == 3
+
+
+def test_long_words_are_not_corrected():
+    spelling = SymSpell(WORDS + ['a' * (MAX_WORD_LENGTH + 5)])
+    for word in ['z' * 400, 'z' * 2000, 'a' * (MAX_WORD_LENGTH + 4)]:
+        start = time.perf_counter()
+        assert spelling.lookup(word) is None
+        assert time.perf_counter() - start < 0.1
+    # Longer than any known word by more than max_distance
+    assert SymSpell(WORDS).lookup('encapsulationxyz') is None
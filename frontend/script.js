@@ -1,6 +1,20 @@
 // API Configuration
 const API_BASE_URL = 'http://localhost:5000/api';
 
+// Session ID keeps this tab's chat history separate from other users
+function getSessionId() {
+    let sessionId = sessionStorage.getItem('chatSessionId');
+    if (!sessionId) {
+        sessionId = window.crypto && crypto.randomUUID
+            ? crypto.randomUUID()
+            : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+        sessionStorage.setItem('chatSessionId', sessionId);
+    }
+    return sessionId;
+}
+
+const SESSION_ID = getSessionId();
+
 // DOM Elements
 const messagesContainer = document.getElementById('messagesContainer');
 const userInput = document.getElementById('userInput');
@@ -83,7 +97,7 @@ async function sendMessage(message) {
                 'Content-Type': 'application/json',
                 'Accept': 'application/json'
             },
-            body: JSON.stringify({ message: message.trim() })
+            body: JSON.stringify({ message: message.trim(), session_id: SESSION_ID })
         });
 
         if (!response.ok) {
@@ -103,6 +117,60 @@ async function sendMessage(message) {
     }
 }
 
+function parseSseEvent(rawEvent) {
+    let type = 'message';
+    let data = '';
+    rawEvent.split('\n').forEach(line => {
+        if (line.startsWith('event:')) {
+            type = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+            data += line.slice(5).trim();
+        }
+    });
+    return { type, data: data ? JSON.parse(data) : {} };
+}
+
+// Streams the bot response over Server-Sent Events, calling onChunk as text arrives
+async function streamMessage(message, onChunk) {
+    const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream'
+        },
+        body: JSON.stringify({ message: message.trim(), session_id: SESSION_ID })
+    });
+
+    if (!response.ok || !response.body) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            break;
+        }
+
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const event = parseSseEvent(buffer.slice(0, boundary));
+            buffer = buffer.slice(boundary + 2);
+
+            if (event.type === 'chunk') {
+                onChunk(event.data.text);
+            } else if (event.type === 'error') {
+                throw new Error(event.data.message || 'Failed to get response');
+            }
+        }
+    }
+}
+
 async function loadSuggestions() {
     try {
         const response = await fetch(`${API_BASE_URL}/suggestions`);
@@ -137,7 +205,8 @@ async function clearChatHistory() {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
-            }
+            },
+            body: JSON.stringify({ session_id: SESSION_ID })
         });
 
         const data = await response.json();
@@ -190,14 +259,36 @@ chatForm.addEventListener('submit', async (e) => {
     showLoadingIndicator();
     userInput.disabled = true;
     
+    // Render the bot response as it streams in
+    const botMessage = createMessageElement('', false);
+    const botContent = botMessage.querySelector('.message-content');
+    let streamStarted = false;
+    
     try {
-        // Get bot response
-        const botResponse = await sendMessage(message);
-        hideLoadingIndicator();
-        addMessage(botResponse, false);
+        await streamMessage(message, (chunk) => {
+            if (!streamStarted) {
+                hideLoadingIndicator();
+                messagesContainer.appendChild(botMessage);
+                streamStarted = true;
+            }
+            botContent.textContent += chunk;
+            scrollToBottom();
+        });
+        
+        if (!streamStarted) {
+            hideLoadingIndicator();
+            addMessage('Sorry, something went wrong. Please try again.', false);
+        }
     } catch (error) {
-        hideLoadingIndicator();
-        addMessage('Sorry, something went wrong. Please try again.', false);
+        console.error('Streaming error:', error);
+        if (streamStarted) {
+            botContent.textContent += '\n\n⚠️ The response was interrupted.';
+        } else {
+            // Fall back to the regular JSON endpoint
+            const botResponse = await sendMessage(message);
+            hideLoadingIndicator();
+            addMessage(botResponse, false);
+        }
     } finally {
         userInput.disabled = false;
         userInput.focus();